@@ -0,0 +1,170 @@
+'''Benchmarks for the hot paths of xraywindow.
+
+Each benchmark is a setup function decorated with `@benchmark`; it does any preparation and
+returns the zero-argument callable to be timed. Run them with `python -m benchmarks.run` from
+the repository root (the bundled `data/` directory is found relative to it).'''
+import numpy as np
+
+from xraywindow.population import OPT_ENERGIES
+
+BENCHMARKS = {}
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+def ap3_window():
+    '''The AP3 reference window from example.get_ap3_df.'''
+    from xraywindow.material   import import_materials
+    from xraywindow.mechanical import MechanicalWindow, BeamLayer, RectangularMembraneLayer
+
+    materials = import_materials()
+    mech_win  = MechanicalWindow()
+    mech_win.add_layer(BeamLayer("Primary", materials["silicon"], 190e-6, 60e-6, 10.2e-3, 380e-6))
+    mech_win.add_layer(RectangularMembraneLayer("Tertiary", materials["polymer"], 190e-6, 300e-9))
+    mech_win.add_layer(RectangularMembraneLayer("Light Block", materials["aluminum"], thickness=30e-9))
+    mech_win.add_layer(RectangularMembraneLayer("Gas Barrier", materials["boron"], thickness=20e-9))
+    return mech_win
+
+# Data loading
+
+@benchmark
+def import_materials():
+    from xraywindow.material import import_materials, _load_materials_yml
+
+    def run():
+        _load_materials_yml.cache_clear()
+        return import_materials()
+    return run
+
+@benchmark
+def xray_data_csv():
+    from xraywindow.xray_data import XRayData
+    return lambda: XRayData("silicon")
+
+@benchmark
+def xray_data_registry():
+    from xraywindow.registry import get_xray_data
+    get_xray_data("silicon")
+    return lambda: get_xray_data("silicon")
+
+# Transmission
+
+def _edited(window, call):
+    '''`call(window)` after nudging the thickness of the window's last layer, so that every
+    call computes a new result and none can be served from a cache.'''
+    layer     = window.layers[-1]
+    thickness = layer.thickness
+    step      = [0]
+
+    def run():
+        step[0] += 1
+        layer.thickness = thickness * (1 + 1e-6 * (step[0] % 2))
+        return call(window)
+    return run
+
+@benchmark
+def transmission_default_grid():
+    return _edited(ap3_window().to_xray_window(), lambda window: window.transmission())
+
+@benchmark
+def transmission_opt_energies():
+    return _edited(ap3_window().to_xray_window(), lambda window: window.transmission(OPT_ENERGIES))
+
+@benchmark
+def transmission_edit_one_layer():
+    # A window tracking edits re-evaluates only the nudged layer
+    window = ap3_window().to_xray_window().track_edits()
+    window.transmission()
+    return _edited(window, lambda window: window.transmission())
+
+@benchmark
+def to_xray_window_and_transmission():
+    mech_win = ap3_window()
+    return lambda: mech_win.to_xray_window().transmission(OPT_ENERGIES)
+
+@benchmark
+def spectrum_df():
+    return _edited(ap3_window().to_xray_window(), lambda window: window.spectrum().df())
+
+@benchmark
+def spectrum_adaptive_grid():
+    window = ap3_window().to_xray_window()
+    window.spectrum(tol=1e-3)  # Build the cached grid
+    return lambda: window.spectrum(tol=1e-3).integrate(100, 1000)
+
+@benchmark
+def spectra_kept_100_float32():
+    # Peak memory is that of 100 retained spectra sharing one energy grid
+    windows = [_edited(ap3_window().to_xray_window(), lambda window: window.spectrum(dtype=np.float32)) for _ in range(100)]
+    return lambda: [spectrum() for spectrum in windows]
+
+@benchmark
+def spectrum_integrate():
+    spectrum = ap3_window().to_xray_window().spectrum()
+    return lambda: spectrum.integrate(100, 1000)
+
+# Mechanics
+
+@benchmark
+def mechanical_scalar():
+    from xraywindow.material   import import_materials
+    from xraywindow.mechanical import BeamLayer, RectangularMembraneLayer
+
+    materials = import_materials()
+
+    def run():
+        beam = BeamLayer("Primary", materials["silicon"], 190e-6, 60e-6, 10.2e-3, 380e-6)
+        beam.calc_max_deflection()
+        beam.calc_max_spacing()
+        film = RectangularMembraneLayer("Membrane", materials["polymer"], width=190e-6)
+        film.thickness = film.calc_min_thickness()
+        film.calc_stress()
+        film.calc_max_width()
+        return beam.failure() or film.failure()
+    return run
+
+@benchmark
+def mechanical_arrays_1e6():
+    from xraywindow.material   import import_materials
+    from xraywindow.mechanical import BeamLayerArray, RectangularMembraneLayerArray
+
+    materials = import_materials()
+    spacing   = np.linspace(100e-6, 2000e-6, 1_000_000)
+
+    def run():
+        ribs = BeamLayerArray("Primary", materials["silicon"], spacing, 60e-6, 10.2e-3, 380e-6)
+        ribs.calc_max_deflection()
+        film = RectangularMembraneLayerArray("Membrane", materials["polymer"], width=spacing)
+        film.thickness = film.calc_min_thickness()
+        film.calc_stress()
+        return ribs.failure() | film.failure()
+    return run
+
+# Optimization (fixed seed, reduced iterations)
+
+def _object_search(objective, bounds):
+    from scipy.optimize import differential_evolution, Bounds
+    return lambda: differential_evolution(objective, Bounds(*bounds), seed=0, maxiter=5, polish=False)
+
+@benchmark
+def search_two_layer_objects():
+    import example
+    return _object_search(example.trans_two_layer_polymer, ([100e-6], [2000e-6]))
+
+@benchmark
+def search_three_layer_objects():
+    import example
+    return _object_search(example.trans_three_layer_polymer, ([100e-6, 1e-6, 5e-6], [2000e-6, 200e-6, 30e-6]))
+
+@benchmark
+def search_two_layer_batched():
+    from xraywindow.optimize import example_designs, optimize
+    design = example_designs()["two_layer_polymer"]
+    return lambda: optimize(design, workers=1, seed=0, maxiter=5, polish=False)
+
+@benchmark
+def search_three_layer_batched():
+    from xraywindow.optimize import example_designs, optimize
+    design = example_designs()["three_layer_polymer"]
+    return lambda: optimize(design, workers=1, seed=0, maxiter=5, polish=False)
@@ -0,0 +1,99 @@
+'''Run the xraywindow benchmarks and compare them with a stored baseline.
+
+    python -m benchmarks.run                    # run all, compare with benchmarks/baseline.json
+    python -m benchmarks.run -k transmission    # only benchmarks whose name contains "transmission"
+    python -m benchmarks.run --save             # store this run as the new baseline
+
+Each benchmark is timed over several repeats (the best time is kept, as it is the least
+disturbed by other load) and its peak traced memory is recorded in a separate run. The run
+fails with exit status 1 if any benchmark is slower, or uses more memory, than the baseline
+by more than the given factors.'''
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+
+from benchmarks.benchmarks import BENCHMARKS
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def measure(setup, min_time=0.2, repeat=5):
+    '''Return the best time per call (s) and the peak traced memory of one call (bytes).'''
+    func = setup()
+    func()  # Warm up caches and lazy imports
+
+    # Calls per repeat so that each repeat lasts about `min_time`
+    start = time.perf_counter()
+    func()
+    number = max(1, int(min_time / max(time.perf_counter() - start, 1e-9)))
+
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+def compare(results, baseline, time_factor, memory_factor):
+    '''Return the names of benchmarks that regressed against `baseline`.'''
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["time"] > base["time"] * time_factor or result["peak_memory"] > base["peak_memory"] * memory_factor:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="select", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--time-factor", type=float, default=1.5, help="allowed slowdown before flagging")
+    parser.add_argument("--memory-factor", type=float, default=1.25, help="allowed memory growth before flagging")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    print(f"{'benchmark':36s} {'time':>12s} {'baseline':>12s} {'peak mem':>12s}")
+    for name, setup in BENCHMARKS.items():
+        if args.select not in name:
+            continue
+        t, peak = measure(setup)
+        results[name] = {"time": t, "peak_memory": peak}
+
+        base = baseline.get(name, {}).get("time")
+        base = f"{base*1e3:9.3f} ms" if base is not None else ""
+        print(f"{name:36s} {t*1e3:9.3f} ms {base:>12s} {peak/2**20:8.2f} MiB")
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+            f.write("\n")
+        return 0
+
+    regressions = compare(results, baseline, args.time_factor, args.memory_factor)
+    for name in regressions:
+        print(f"REGRESSION: {name}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
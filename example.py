@@ -1,9 +1,11 @@
 import matplotlib.pyplot as plt
-from scipy.optimize        import differential_evolution, Bounds
 from xraywindow.plotting   import plot_transmission
 from xraywindow.xray_data  import XRayData
 from xraywindow.mechanical import MechanicalWindow, BeamLayer, RectangularMembraneLayer
 from xraywindow.material   import import_materials
+from xraywindow.optimize   import example_designs, optimize
+from xraywindow.population import OPT_ENERGIES
+from xraywindow.cache      import ResultCache
 
 
 materials = import_materials()
@@ -14,7 +16,7 @@ boron     = materials["boron"]
 SiN       = materials["SiNx"]
 
 # Energies for which transmission will be optimized
-opt_energies = [54.3, 108.5, 183.3, 277, 392.4, 524.9, 676.8, 1041, 1740]
+opt_energies = OPT_ENERGIES
 
 def light_block(window):
     """Visible light blocking and charge dissipation layer."""
@@ -35,8 +37,13 @@ def common_layers(window):
     
     return window
 
-def get_ap3_df():
-    """Create AP3 model and return Pandas dataframe."""
+def get_ap3_df(results=None):
+    """Create AP3 model and return Pandas dataframe. Spectra evaluated in earlier runs are
+    reused from `results` (by default the ResultCache in ~/.cache/xraywindow)."""
+    if results is None:
+        with ResultCache() as results:
+            return get_ap3_df(results)
+
     prim_spacing = 190e-6
     prim_width   = 60e-6
     prim_length  = 10.2e-3
@@ -56,7 +63,7 @@ def get_ap3_df():
     mech_win.add_layer(light_block)
     mech_win.add_layer(gas_barrier)
     
-    return mech_win.to_xray_window().spectrum().df()
+    return results.spectrum(mech_win).df()
 
 def make_three_layer_window(
     p,
@@ -194,88 +201,70 @@ def trans_three_layer_si3n4(p):
     return -win.to_xray_window().spectrum().integrate(energies=opt_energies)
 
 
-# Polymer-based window like AP3
-lb   = [100e-6]
-ub   = [2000e-6]
-bnds = Bounds(lb, ub)
-
-two_layer_polymer = differential_evolution(trans_two_layer_polymer, bnds)
-
-# Polymer-based window like AP3, but with extra support layer
-lb   = [100e-6, 1e-6, 5e-6]
-ub   = [2000e-6, 200e-6, 30e-6]
-bnds = Bounds(lb, ub)
-
-three_layer_polymer = differential_evolution(trans_three_layer_polymer, bnds)
-
-# Two layer Si3N4-based window
-lb   = [100e-6]
-ub   = [2000e-6]
-bnds = Bounds(lb, ub)
-
-two_layer_si3n4 = differential_evolution(trans_two_layer_si3n4, bnds)
-
-# Three layer Si3N4-based window
-lb   = [100e-6, 1e-6, 5e-6]
-ub   = [2000e-6, 200e-6, 30e-6]
-bnds = Bounds(lb, ub)
-
-three_layer_si3n4 = differential_evolution(trans_three_layer_si3n4, bnds)
-
-print(two_layer_polymer)
-print(three_layer_polymer)
-print(two_layer_polymer)
-print(three_layer_polymer)
-
-
-light_gas_only_xray_win       = common_layers(MechanicalWindow()).to_xray_window("light/gas barrier")
-two_layer_polymer_xray_win    = make_two_layer_window(two_layer_polymer.x).to_xray_window("2-layer polymer")
-#two_layer_polymer_54_xray_win = make_two_layer_window(two_layer_polymer_54.x).to_xray_window("2-layer polymer (54 eV)")
-three_layer_polymer_xray_win  = make_three_layer_window(three_layer_polymer.x).to_xray_window("3-layer polymer")
-two_layer_si3n4_xray_win      = make_two_layer_window(two_layer_si3n4.x, tert_mat=SiN, use_gas=False).to_xray_window("2-layer Si3N4")
-three_layer_si3n4_xray_win    = make_three_layer_window(three_layer_si3n4.x, tert_mat=SiN, use_gas=False).to_xray_window("3-layer Si3N4")
-
-ap3_sin = make_two_layer_window([200e-6], tert_mat=SiN, use_gas=False).to_xray_window("AP3 SiN")
-
-print(light_gas_only_xray_win)
-print(two_layer_polymer_xray_win)
-#print(two_layer_polymer_54_xray_win)
-print(three_layer_polymer_xray_win)
-print(two_layer_si3n4_xray_win)
-print(three_layer_si3n4_xray_win)
-print(ap3_sin)
-
-ap3_df = get_ap3_df()
-
-plt.close("all")
-
-fig, ax = plt.subplots(figsize=(8,3))
-ax = plot_transmission(
-    data = [
-        ap3_df, 
-        two_layer_polymer_xray_win.spectrum().df(),
-#        two_layer_polymer_54_xray_win.spectrum().df(),
-        three_layer_polymer_xray_win.spectrum().df(), 
-        two_layer_si3n4_xray_win.spectrum().df(), 
-        three_layer_si3n4_xray_win.spectrum().df(),
-        ap3_sin.spectrum().df()
-    ], 
-    labels = [
-        "AP3", 
-        "2-layer polymer", 
-#        "2-layer polymer (54 eV)", 
-        "3-layer polymer", 
-        "2-layer Si$_3$N$_4$", 
-        "3-layer Si$_3$N$_4$",
-        "AP3 SiN"
-    ],  
-    use_log    = True,
-    add_lines  = True,
-    min_energy = 10,
-    max_energy = 10000,
-    ax         = ax
-)
-
-plt.show()
-
-print("Polymer x-ray data ", polymer.xray_data)
\ No newline at end of file
+if __name__ == "__main__":
+    # Run the four searches on all cores. Each design mirrors one of the `trans_*` objectives above
+    # but evaluates whole generations at once (see xraywindow.optimize).
+    designs = example_designs(materials)
+
+    two_layer_polymer   = optimize(designs["two_layer_polymer"])    # Polymer-based window like AP3
+    three_layer_polymer = optimize(designs["three_layer_polymer"])  # ... with extra support layer
+    two_layer_si3n4     = optimize(designs["two_layer_si3n4"])      # Two layer Si3N4-based window
+    three_layer_si3n4   = optimize(designs["three_layer_si3n4"])    # Three layer Si3N4-based window
+
+    print(two_layer_polymer)
+    print(three_layer_polymer)
+    print(two_layer_polymer)
+    print(three_layer_polymer)
+
+
+    light_gas_only_xray_win       = common_layers(MechanicalWindow()).to_xray_window("light/gas barrier")
+    two_layer_polymer_xray_win    = make_two_layer_window(two_layer_polymer.x).to_xray_window("2-layer polymer")
+    #two_layer_polymer_54_xray_win = make_two_layer_window(two_layer_polymer_54.x).to_xray_window("2-layer polymer (54 eV)")
+    three_layer_polymer_xray_win  = make_three_layer_window(three_layer_polymer.x).to_xray_window("3-layer polymer")
+    two_layer_si3n4_xray_win      = make_two_layer_window(two_layer_si3n4.x, tert_mat=SiN, use_gas=False).to_xray_window("2-layer Si3N4")
+    three_layer_si3n4_xray_win    = make_three_layer_window(three_layer_si3n4.x, tert_mat=SiN, use_gas=False).to_xray_window("3-layer Si3N4")
+
+    ap3_sin = make_two_layer_window([200e-6], tert_mat=SiN, use_gas=False).to_xray_window("AP3 SiN")
+
+    print(light_gas_only_xray_win)
+    print(two_layer_polymer_xray_win)
+    #print(two_layer_polymer_54_xray_win)
+    print(three_layer_polymer_xray_win)
+    print(two_layer_si3n4_xray_win)
+    print(three_layer_si3n4_xray_win)
+    print(ap3_sin)
+
+    ap3_df = get_ap3_df()
+
+    plt.close("all")
+
+    fig, ax = plt.subplots(figsize=(8,3))
+    ax = plot_transmission(
+        data = [
+            ap3_df, 
+            two_layer_polymer_xray_win.spectrum().df(),
+    #        two_layer_polymer_54_xray_win.spectrum().df(),
+            three_layer_polymer_xray_win.spectrum().df(), 
+            two_layer_si3n4_xray_win.spectrum().df(), 
+            three_layer_si3n4_xray_win.spectrum().df(),
+            ap3_sin.spectrum().df()
+        ], 
+        labels = [
+            "AP3", 
+            "2-layer polymer", 
+    #        "2-layer polymer (54 eV)", 
+            "3-layer polymer", 
+            "2-layer Si$_3$N$_4$", 
+            "3-layer Si$_3$N$_4$",
+            "AP3 SiN"
+        ],  
+        use_log    = True,
+        add_lines  = True,
+        min_energy = 10,
+        max_energy = 10000,
+        ax         = ax
+    )
+
+    plt.show()
+
+    print("Polymer x-ray data ", polymer.xray_data)
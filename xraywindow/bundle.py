@@ -0,0 +1,123 @@
+'''Compiled, memory-mapped bundle of the x-ray material tables.
+
+`compile_bundle()` packs every material table in `data/xray` and the properties in
+`materials.yml` into two .npy arrays plus a JSON index. At runtime the arrays are opened with
+`mmap_mode="r"`, so worker processes share the same pages and never parse a .csv. The
+registry uses a bundle automatically when one is present next to the .csv files and was
+compiled from their current versions.
+
+Run `python -m xraywindow.bundle` to (re)compile the default data directory.'''
+import os
+import glob
+import json
+import functools
+import numpy as np
+
+from xraywindow.xray_data import XRayData, import_xray_data_csv
+
+BUNDLE_DIRNAME = "bundle"
+INDEX_FILENAME = "index.json"
+
+def default_bundle_dir(xray_data_dir=None):
+    if xray_data_dir is None:
+        xray_data_dir = os.path.join("data", "xray")
+    return os.path.join(xray_data_dir, BUNDLE_DIRNAME)
+
+def compile_bundle(xray_data_dir=None, material_data_dir=None, material_filename="materials.yml", bundle_dir=None):
+    '''Pack all material tables and properties into `bundle_dir` and return its path.
+    Files without the Energy/Transmission/Density/Thickness columns are skipped.'''
+    import yaml
+
+    if xray_data_dir is None:
+        xray_data_dir = os.path.join("data", "xray")
+    if material_data_dir is None:
+        material_data_dir = os.path.join("data")
+    if bundle_dir is None:
+        bundle_dir = default_bundle_dir(xray_data_dir)
+
+    energies, transmissions, index = [], [], {}
+    offset = 0
+    for filename in sorted(glob.glob(os.path.join(xray_data_dir, "*.csv"))):
+        name = os.path.splitext(os.path.basename(filename))[0]
+        try:
+            e, t, thickness, density = import_xray_data_csv(name, xray_data_dir)
+        except KeyError:
+            continue
+
+        energies.append(np.asarray(e, dtype=float))
+        transmissions.append(np.asarray(t, dtype=float))
+        index[name] = {
+            "offset":          offset,
+            "length":          len(e),
+            "thickness":       float(thickness),
+            "density":         float(density),
+            "source_mtime_ns": os.stat(filename).st_mtime_ns,
+        }
+        offset += len(e)
+
+    properties = []
+    material_file = os.path.join(material_data_dir, material_filename)
+    if os.path.exists(material_file):
+        with open(material_file, encoding="utf-8") as f:
+            properties = [{k: v for k, v in mat.items() if k != "notes"} for mat in yaml.load(f, yaml.SafeLoader)]
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    np.save(os.path.join(bundle_dir, "energy.npy"), np.concatenate(energies) if energies else np.zeros(0))
+    np.save(os.path.join(bundle_dir, "transmission.npy"), np.concatenate(transmissions) if transmissions else np.zeros(0))
+    with open(os.path.join(bundle_dir, INDEX_FILENAME), "w", encoding="utf-8") as f:
+        json.dump({"materials": index, "properties": properties}, f, indent=1)
+
+    return bundle_dir
+
+class MaterialBundle:
+    '''A compiled bundle opened with memory-mapped arrays.'''
+    def __init__(self, bundle_dir):
+        self.bundle_dir = bundle_dir
+
+        with open(os.path.join(bundle_dir, INDEX_FILENAME), encoding="utf-8") as f:
+            index = json.load(f)
+        self.index      = index["materials"]
+        self.properties = index["properties"]
+
+        self.energy       = np.load(os.path.join(bundle_dir, "energy.npy"), mmap_mode="r")
+        self.transmission = np.load(os.path.join(bundle_dir, "transmission.npy"), mmap_mode="r")
+
+    def __contains__(self, material_name):
+        return material_name in self.index
+
+    def is_current(self, material_name, csv_filename):
+        '''True if the bundled table was compiled from the current version of `csv_filename`.'''
+        entry = self.index.get(material_name)
+        return entry is not None and entry["source_mtime_ns"] == os.stat(csv_filename).st_mtime_ns
+
+    def xray_data(self, material_name):
+        '''XRayData whose tables are views into the memory-mapped bundle.'''
+        entry = self.index[material_name]
+        rows  = slice(entry["offset"], entry["offset"] + entry["length"])
+        return XRayData.from_arrays(material_name, self.energy[rows], self.transmission[rows], entry["thickness"], entry["density"])
+
+    def materials(self):
+        '''Material objects for every entry in the bundled materials.yml.'''
+        from xraywindow.material import material_from_properties
+
+        return {mat['name']: material_from_properties(mat) for mat in self.properties}
+
+def load_bundle(bundle_dir=None):
+    '''Open the bundle in `bundle_dir`, or return None if there is none. Opened bundles are
+    shared within a process until the index changes.'''
+    if bundle_dir is None:
+        bundle_dir = default_bundle_dir()
+
+    index_file = os.path.join(bundle_dir, INDEX_FILENAME)
+    if not os.path.exists(index_file):
+        return None
+    return _open_bundle(os.path.realpath(bundle_dir), os.stat(index_file).st_mtime_ns)
+
+@functools.lru_cache(maxsize=8)
+def _open_bundle(bundle_dir, mtime):
+    return MaterialBundle(bundle_dir)
+
+if __name__ == "__main__":
+    import sys
+
+    print(compile_bundle(*sys.argv[1:3]))
@@ -0,0 +1,176 @@
+'''Persistent, content-addressed cache of window evaluations.
+
+Windows describe themselves canonically with `design()`: layer types, materials (with the
+version of their x-ray data), dimensions and pressure, but not names or plot settings.
+`design_key()` hashes that description together with MODEL_VERSION, the version of the
+physics that turns designs into results. Results are stored under the key together with
+what was computed and on which energies. A repeated evaluation, in this run or a later one,
+is then a lookup:
+
+    cache = ResultCache()                        # ~/.cache/xraywindow/results.sqlite
+    spectrum = cache.spectrum(window)            # XRayWindow or MechanicalWindow
+    fom      = cache.fom(window, OPT_ENERGIES)
+
+The cache is a local SQLite file. Once it holds more than `max_bytes` of results, the least
+recently used entries are dropped.'''
+import os
+import io
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+# Bump whenever a change to the transmission or mechanical models changes results, so that
+# results cached by older code are never reused
+MODEL_VERSION = 1
+
+def design_key(design):
+    '''Hash of a design description (nested dicts, lists, strings and numbers), independent
+    of key order, under the current MODEL_VERSION.'''
+    text = json.dumps({"model": MODEL_VERSION, "design": design}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+def default_cache_path():
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_dir, "xraywindow", "results.sqlite")
+
+def _to_bytes(array):
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+def _from_bytes(data):
+    array = np.load(io.BytesIO(data), allow_pickle=False)
+    array.flags.writeable = False
+    return array
+
+class ResultCache:
+    '''Arrays stored in a SQLite file under string keys, evicted least recently used first
+    once they take more than `max_bytes`. Safe to share between threads, and between
+    processes using the same file.'''
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.path      = default_cache_path() if path is None else os.fspath(path)
+        self.max_bytes = max_bytes
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db   = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL, nbytes INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+        self.hits   = 0
+        self.misses = 0
+
+    def get(self, key):
+        '''The array stored under `key` (read-only), or None.'''
+        with self._lock, self._db:
+            row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return _from_bytes(row[0])
+
+    def put(self, key, value):
+        '''Store `value` (an array or number) under `key` and evict old entries if needed.'''
+        data = _to_bytes(value)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, nbytes, accessed) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            self._evict(keep=key)
+
+    def _evict(self, keep):
+        # Caller holds the lock, inside a transaction. The newest entry always stays.
+        total = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        drop = []
+        for key, nbytes in self._db.execute("SELECT key, nbytes FROM results WHERE key != ? ORDER BY accessed", (keep,)):
+            if total <= self.max_bytes:
+                break
+            drop.append((key,))
+            total -= nbytes
+        self._db.executemany("DELETE FROM results WHERE key = ?", drop)
+
+    def cached(self, key, compute):
+        '''The value under `key`, or `compute()` stored there first.'''
+        value = self.get(key)
+        if value is None:
+            value = np.asarray(compute())
+            self.put(key, value)
+        return value
+
+    def result_key(self, window, kind, energy, weights=None):
+        '''Key for result `kind` of `window` (anything with `design_key()`) on `energy`.'''
+        h = hashlib.sha256(f"{window.design_key()}:{kind}:".encode())
+        h.update(np.ascontiguousarray(energy, dtype=float).tobytes())
+        if weights is not None:
+            h.update(b":")
+            h.update(np.ascontiguousarray(weights, dtype=float).tobytes())
+        return h.hexdigest()[:32]
+
+    def transmission(self, window, energy=range(10, 10000)):
+        '''Transmission of an XRayWindow or MechanicalWindow at `energy`.'''
+        energy = np.atleast_1d(np.asarray(energy, dtype=float))
+        return self.cached(self.result_key(window, "transmission", energy), lambda: _xray_window(window).transmission(energy))
+
+    def spectrum(self, window, energy=range(10, 10000), dtype=float):
+        '''XRaySpectrum of an XRayWindow or MechanicalWindow (see XRayWindow.spectrum).'''
+        from xraywindow.engine       import energy_grid
+        from xraywindow.transmission import XRaySpectrum
+
+        energy = energy_grid(energy)
+        return XRaySpectrum(energy, self.transmission(window, energy), dtype=dtype)
+
+    def fom(self, window, energy, weights=None):
+        '''Figure of merit `weights @ T(energy)` (summed transmission by default).'''
+        energy = np.atleast_1d(np.asarray(energy, dtype=float))
+
+        def compute():
+            trans = _xray_window(window).transmission(energy)
+            return trans.sum() if weights is None else trans @ np.asarray(weights, dtype=float)
+
+        return float(self.cached(self.result_key(window, "fom", energy, weights), compute))
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self):
+        '''Return hit/miss counts (this object) and the size of the cache file's contents.'''
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self), "nbytes": self.nbytes}
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM results")
+        self.hits = self.misses = 0
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _xray_window(window):
+    return window.to_xray_window() if hasattr(window, "to_xray_window") else window
@@ -0,0 +1,145 @@
+'''Materials synthesized from existing x-ray tables: mixtures by mass fraction and
+density-scaled variants.
+
+The mass attenuation coefficient mu/rho of a mixture is the mass-fraction weighted sum of
+those of its components, and scales the linear attenuation coefficient with density:
+
+    mu(E) = rho * sum_i w_i * mu_i(E) / rho_i
+
+    b4c    = mixture({"boron": 0.7826, "graphene": 0.2174}, density=2520, name="B4C")
+    porous = scaled("polymer", 0.7 * 1430, name="porous polymer")
+    sinx   = mixture({"silicon": 0.3, "Si3N4": 0.7}, density=3200)
+
+Components are XRayData objects or material names (fetched through the registry). Nothing
+is read from disk beyond the component tables: a compound's attenuation on an energy grid
+is combined from its components' cached attenuation on that grid, and its own table (on the
+components' shared energy grid) is only built when something asks for it. Compounds are
+cached per name and composition, so sweeping over compositions with generated names reuses
+them.
+
+materials.yml can declare a material as a recipe with an `xray` entry, for materials that
+have no table of their own. The compound takes the entry's `density`:
+
+    - name: B4C
+      ...
+      density: 2.52
+      xray:
+        components: {boron: 0.7826, graphene: 0.2174}'''
+import hashlib
+import functools
+import numpy as np
+
+from xraywindow.xray_data   import XRayData, grid_key, shared_grid
+from xraywindow.interpolate import LogInterpolator
+from xraywindow.registry    import get_xray_data
+
+# Thickness (m) at which compound tables are expressed, as in most files in data/xray
+REFERENCE_THICKNESS = 1e-7
+
+# Mass fractions may add up to 1 within this tolerance
+FRACTION_TOLERANCE = 1e-3
+
+class CompoundXRayData(XRayData):
+    '''XRayData of a mixture of other XRayData by mass fraction, at `density` (kg/m^3).
+    `components` is a sequence of (XRayData, mass fraction) pairs.'''
+    def __init__(self, material_name, components, density, thickness=REFERENCE_THICKNESS):
+        if not components:
+            raise ValueError("A compound needs at least one component.")
+
+        total = sum(w for _, w in components)
+        if any(w < 0 for _, w in components) or abs(total - 1) > FRACTION_TOLERANCE:
+            raise ValueError(f"Mass fractions of '{material_name}' must be non-negative and add up to 1, not {total:g}.")
+
+        self._init_state(material_name, thickness, float(density))
+        self.components = tuple((xd, w / total) for xd, w in components)
+
+        # mu = sum(scale_i * mu_i)
+        self._scales = [self.density * w / xd.density for xd, w in self.components]
+        self._table  = None
+
+    def _content_hash(self):
+        h = hashlib.blake2b(digest_size=8)
+        for xd, w in self.components:
+            h.update(f"{xd.version}:{w!r};".encode())
+        h.update(f"{self.density!r}:{self.thickness!r}".encode())
+        return h.hexdigest()
+
+    def _mu(self, energy, cached=False):
+        mu = (xd.attenuation(energy) if cached else -xd.interp_trans.log(energy) / xd.thickness for xd, _ in self.components)
+        return sum(scale * m for scale, m in zip(self._scales, mu))
+
+    def attenuation(self, energy):
+        '''Linear attenuation coefficient (1/m) at each of `energy`, combined from the
+        components' cached attenuation on the same grid.'''
+        energy = np.asarray(energy, dtype=float)
+        return self._cached_attenuation(energy, lambda: self._mu(energy, cached=True))
+
+    def transmission(self, energy, thickness):
+        '''Transmission at `energy` through `thickness`, from the components directly.'''
+        return np.exp(-thickness * self._mu(energy))
+
+    def _build_table(self):
+        # On the components' energy grid, where all their tables are defined
+        grids = [xd.energies for xd, _ in self.components]
+        if all(grid_key(g) == grid_key(grids[0]) for g in grids[1:]):
+            energies = shared_grid(grids[0])
+        else:
+            lo, hi   = max(g[0] for g in grids), min(g[-1] for g in grids)
+            energies = np.unique(np.concatenate(grids))
+            energies = energies[(energies >= lo) & (energies <= hi)]
+
+        transmissions = np.exp(-self.thickness * self._mu(energies))
+        self._table   = energies, transmissions, LogInterpolator(energies, transmissions)
+
+    @property
+    def energies(self):
+        if self._table is None:
+            self._build_table()
+        return self._table[0]
+
+    @property
+    def transmissions(self):
+        if self._table is None:
+            self._build_table()
+        return self._table[1]
+
+    @property
+    def interp_trans(self):
+        if self._table is None:
+            self._build_table()
+        return self._table[2]
+
+    @property
+    def nbytes(self):
+        '''Memory held by the compound's own table (if built) and cached attenuation grids.'''
+        table = 0 if self._table is None else self._table[1].nbytes
+        return table + sum(mu.nbytes for mu in self._attenuation_cache.values())
+
+def _component(material):
+    return material if isinstance(material, XRayData) else get_xray_data(material)
+
+def mixture(components, density, name=None, thickness=REFERENCE_THICKNESS):
+    '''Compound of `components` (a dict of material name or XRayData to mass fraction) at
+    `density` (kg/m^3). Compounds are cached per name and composition; without a `name`, one
+    is generated from the composition.'''
+    parts = tuple((_component(m), float(w)) for m, w in components.items())
+    if name is None:
+        name = " + ".join(f"{w:g} {xd.material_name}" for xd, w in parts) + f" @ {density:g}"
+    return _compound(name, parts, float(density), float(thickness))
+
+def scaled(material, density, name=None, thickness=REFERENCE_THICKNESS):
+    '''`material` (a name or XRayData) at a different `density` (kg/m^3), e.g. a porous film.'''
+    xray_data = _component(material)
+    if name is None:
+        name = f"{xray_data.material_name} @ {density:g}"
+    return mixture({xray_data: 1.0}, density, name, thickness)
+
+def from_recipe(name, recipe):
+    '''Compound described by a materials.yml `xray` entry: `components` (material name to
+    mass fraction) and `density` (kg/m^3, filled in from the entry's own density by
+    material_from_properties).'''
+    return mixture(recipe["components"], recipe["density"], name, recipe.get("thickness", REFERENCE_THICKNESS))
+
+@functools.lru_cache(maxsize=1024)
+def _compound(name, parts, density, thickness):
+    return CompoundXRayData(name, parts, density, thickness)
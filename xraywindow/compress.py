@@ -0,0 +1,167 @@
+'''Compressed x-ray tables: an index of absorption edges plus piecewise log-log segments.
+
+Between absorption edges, the attenuation coefficient of a material falls off close to a
+power law of energy. A few straight segments in log(mu) against log(E) then follow the
+whole 5010-row table. The segments are found by the same Douglas-Peucker simplification as
+the adaptive grids (see xraywindow.grid). The error criterion keeps the transmission
+within `tol` of the original table, at every table energy and for any thickness. The edges
+(jumps in mu from one table point to the next) are found first. Each edge interval, and any
+other step too steep for a log-log segment, is kept exactly and is interpolated linearly, as
+in the original table.
+
+    compact = CompressedXRayData.compress(XRayData("silicon"), tol=1e-3)
+    compact.transmission(277, 100e-9)
+    energies, transmissions, thickness, density = compact.to_table()
+
+A CompressedXRayData can stand in for XRayData anywhere: the engine, windows, adaptive grids
+and the registry (XRayDataRegistry(compress_tol=...)).'''
+import numpy as np
+
+from xraywindow.xray_data   import XRayData, shared_grid
+from xraywindow.grid        import simplify
+
+# Smallest jump in ln(mu) between neighbouring table points that counts as an edge
+EDGE_JUMP = 0.25
+
+def find_edges(mu, jump=EDGE_JUMP):
+    '''Indices p of the first table point above each absorption edge: mu rises by more than
+    a factor of exp(`jump`) from point p-1 to point p.'''
+    return np.flatnonzero(np.diff(np.log(mu)) > jump) + 1
+
+def find_steps(mu, jump):
+    '''Indices p where ln(mu) changes by more than `jump`, up or down, from point p-1 to p.'''
+    return np.flatnonzero(np.abs(np.diff(np.log(mu))) > jump) + 1
+
+class EdgeIndexedAttenuation:
+    '''Transmission at a reference thickness whose attenuation coefficient is interpolated
+    log-log between knots, and linearly in energy across steps (the knot intervals ending at
+    the knot indices in `steps`), as in the original table. It offers the same `x`, `y`,
+    `log()` and `__call__` as LogInterpolator, but holds only the knots.'''
+    def __init__(self, energies, mu, thickness, steps):
+        if len(energies) < 2:
+            raise ValueError("At least two points are needed to interpolate.")
+
+        # Knots are held as logarithms, the form the interpolation works in
+        self.log_x     = np.log(np.asarray(energies, dtype=float))
+        self.log_mu    = np.log(np.asarray(mu, dtype=float))
+        self.thickness = thickness
+
+        # Whether segment i, from knot i to i+1, is a step
+        self._linear = np.zeros(len(self.log_x) - 1, dtype=bool)
+        self._linear[np.asarray(steps, dtype=np.intp) - 1] = True
+
+    @property
+    def x(self):
+        return np.exp(self.log_x)
+
+    @property
+    def mu(self):
+        return np.exp(self.log_mu)
+
+    @property
+    def y(self):
+        return np.exp(-self.thickness * self.mu)
+
+    @property
+    def nbytes(self):
+        return self.log_x.nbytes + self.log_mu.nbytes + self._linear.nbytes
+
+    def attenuation(self, energy):
+        '''Attenuation coefficient (1/m) at each of `energy`.'''
+        log_e = np.log(np.asarray(energy, dtype=float))
+        if np.any(log_e < self.log_x[0]):
+            raise ValueError("A value in x_new is below the interpolation range.")
+        if np.any(log_e > self.log_x[-1]):
+            raise ValueError("A value in x_new is above the interpolation range.")
+
+        mu = np.exp(np.interp(log_e, self.log_x, self.log_mu))
+
+        i    = np.clip(np.searchsorted(self.log_x, log_e, side="right") - 1, 0, len(self.log_x) - 2)
+        step = self._linear[i]
+        if np.any(step):
+            i        = i[step]
+            x0, x1   = np.exp(self.log_x[i]), np.exp(self.log_x[i + 1])
+            frac     = (np.exp(log_e[step]) - x0) / (x1 - x0)
+            mu[step] = np.exp(self.log_mu[i]) * (1 - frac) + np.exp(self.log_mu[i + 1]) * frac
+        return mu
+
+    def log(self, energy):
+        return -self.thickness * self.attenuation(energy)
+
+    def __call__(self, energy):
+        return np.exp(self.log(energy))
+
+class CompressedXRayData(XRayData):
+    '''XRayData held as an EdgeIndexedAttenuation instead of the full table. `energies` and
+    `transmissions` are the knots and `table_energies` the (shared) grid of the original table;
+    `to_table()` rebuilds the table, exactly in energy and to within the compression tolerance
+    in transmission.'''
+    def __init__(self, material_name, energies, mu, thickness, density, edges, steps, table_energies):
+        self._init_state(material_name, thickness, density)
+        self.edges          = np.asarray(edges, dtype=np.intp)
+        self.interp_trans   = EdgeIndexedAttenuation(energies, mu, thickness, steps)
+        self.table_energies = table_energies
+
+    @classmethod
+    def compress(cls, xray_data, tol=1e-3, edge_jump=EDGE_JUMP):
+        '''Compress an XRayData so that its transmission stays within `tol` of the table at
+        every table energy, for any thickness.'''
+        energies = np.asarray(xray_data.energies, dtype=float)
+        mu       = -xray_data.interp_trans.log(energies) / xray_data.thickness
+        mu       = np.maximum(mu, np.finfo(float).tiny)
+
+        # An error of d in mu changes T = exp(-t mu) by at most d / (e mu), at t = 1/mu. Half of
+        # `tol` goes to the fit at the table points, half to the shape between them: log-log
+        # and linear interpolation across a step of D in ln(mu) differ by up to D^2/8 in
+        # relative terms, so steeper steps are kept as they are and interpolated linearly.
+        allowed = np.e * tol / 2
+        steep   = find_steps(mu, np.sqrt(8 * allowed))
+        edges   = find_edges(mu, edge_jump)
+
+        # Simplify each stretch between steep steps on its own, so both ends of every step stay knots
+        bounds = np.concatenate([[0], steep, [len(energies)]])
+        keep   = []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            if hi - lo == 1:
+                keep.append([lo])
+                continue
+            keep.append(lo + simplify(np.log(energies[lo:hi]), np.log(mu[lo:hi]), np.log1p(allowed)))
+        keep = np.concatenate(keep)
+
+        return cls(
+            xray_data.material_name, energies[keep], mu[keep], xray_data.thickness, xray_data.density,
+            np.searchsorted(keep, edges), np.searchsorted(keep, steep), shared_grid(energies),
+        )
+
+    @property
+    def energies(self):
+        return self.interp_trans.x
+
+    @property
+    def transmissions(self):
+        return self.interp_trans.y
+
+    @property
+    def nbytes(self):
+        '''Memory held by the knots and cached attenuation grids. The table energy grid is
+        shared between materials and not counted.'''
+        return self.interp_trans.nbytes + sum(mu.nbytes for mu in self._attenuation_cache.values())
+
+    @property
+    def edge_energies(self):
+        '''Energy (eV) of the first table point above each absorption edge.'''
+        return self.energies[self.edges]
+
+    def to_table(self):
+        '''The original table as (energies, transmissions, thickness, density), in the form
+        returned by import_xray_data_csv.'''
+        energies = self.table_energies.copy()
+        return energies, self.interp_trans(energies), self.thickness, self.density
+
+    def to_csv(self, filename):
+        '''Write the rebuilt table in the layout of the files in data/xray.'''
+        energies, transmissions, thickness, density = self.to_table()
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(",Energy,Transmission,Density,Thickness\n")
+            for i, (e, t) in enumerate(zip(energies.tolist(), transmissions.tolist())):
+                f.write(f"{i},{e!r},{t:.5g},{float(density)!r},{float(thickness)!r}\n")
@@ -0,0 +1,102 @@
+import functools
+import numpy as np
+
+from xraywindow.instrument import instrumented
+
+DEFAULT_ENERGY = np.arange(10, 10000, dtype=float)  # eV, same points as range(10, 10000)
+
+def energy_grid(energy):
+    '''Energy points as a float array. Equal ranges always give the same read-only array, so
+    everything built on e.g. range(10, 10000) shares one grid.'''
+    if isinstance(energy, range):
+        return _range_grid(energy.start, energy.stop, energy.step)
+    return np.asarray(energy, dtype=float)
+
+@functools.lru_cache(maxsize=32)
+def _range_grid(start, stop, step):
+    grid = np.arange(start, stop, step, dtype=float)
+    grid.flags.writeable = False
+    return grid
+
+class AttenuationEngine:
+    '''Evaluates transmission through whole stacks of layers on one shared energy grid.
+
+    Each layer's material is held as its attenuation coefficient (1/m) on the grid, so the
+    absorption of a stack is a single matrix product, `thickness @ mu`, followed by one `exp`.
+    Layers with open area cannot be summed in log space and are mixed in afterwards, one
+    layer at a time.'''
+    def __init__(self, xray_data, energy=DEFAULT_ENERGY):
+        self.energy    = np.asarray(energy, dtype=float)
+        self.xray_data = list(xray_data)
+
+        if self.xray_data:
+            self.mu = np.vstack([xd.attenuation(self.energy) for xd in self.xray_data])
+        else:
+            self.mu = np.zeros((0, len(self.energy)))
+
+    @classmethod
+    def from_window(cls, window, energy=DEFAULT_ENERGY):
+        '''Build an engine with one row per layer of an XRayWindow.'''
+        return cls([layer.xray_data for layer in window.layers], energy)
+
+    @property
+    def n_layers(self):
+        return self.mu.shape[0]
+
+    @instrumented
+    def transmission(self, thickness, open_area=0):
+        '''Transmission through one or many stacks.
+
+        `thickness` (m) has shape (n_layers,) for a single stack or (n_stacks, n_layers) for
+        many; `open_area` is a fraction from 0 to 1 and broadcasts against `thickness`. Returns
+        an array of shape (n_energy,) or (n_stacks, n_energy) respectively.'''
+        thickness = np.asarray(thickness, dtype=float)
+        open_area = np.broadcast_to(np.asarray(open_area, dtype=float), thickness.shape)
+
+        if thickness.shape[-1:] != (self.n_layers,):
+            raise ValueError(f"Expected {self.n_layers} layer thicknesses, got shape {thickness.shape}.")
+
+        # Layers with open area anywhere in the batch are handled separately
+        mixed  = np.any(open_area.reshape(-1, self.n_layers) != 0, axis=0)
+        closed = np.where(mixed, 0.0, thickness)
+
+        total = np.exp(-(closed @ self.mu))
+
+        for i in np.flatnonzero(mixed):
+            oa     = open_area[..., i, None]
+            total *= (1 - oa) * np.exp(-thickness[..., i, None] * self.mu[i]) + oa
+
+        return total
+
+    @instrumented
+    def transmission_and_jacobian(self, thickness, open_area=0):
+        '''Transmission together with its derivatives with respect to each layer's thickness
+        and open area.
+
+        Returns `(trans, d_thickness, d_open_area)` where `trans` is shaped as in
+        `transmission()` and both derivative arrays have an extra layer axis before the
+        energy axis, i.e. (n_layers, n_energy) or (n_stacks, n_layers, n_energy).'''
+        thickness = np.asarray(thickness, dtype=float)
+        open_area = np.broadcast_to(np.asarray(open_area, dtype=float), thickness.shape)
+
+        if thickness.shape[-1:] != (self.n_layers,):
+            raise ValueError(f"Expected {self.n_layers} layer thicknesses, got shape {thickness.shape}.")
+
+        t  = thickness[..., None]
+        oa = open_area[..., None]
+
+        solid = np.exp(-t * self.mu)        # (..., n_layers, n_energy)
+        layer = (1 - oa) * solid + oa
+
+        # Product of every layer except one, from prefix and suffix products (no division by
+        # layers that transmit nothing)
+        ones   = np.ones_like(layer[..., :1, :])
+        prefix = np.cumprod(np.concatenate([ones, layer[..., :-1, :]], axis=-2), axis=-2)
+        suffix = np.flip(np.cumprod(np.flip(np.concatenate([layer[..., 1:, :], ones], axis=-2), axis=-2), axis=-2), axis=-2)
+        others = prefix * suffix
+
+        trans       = others[..., 0, :] * layer[..., 0, :] if self.n_layers else np.ones(thickness.shape[:-1] + (len(self.energy),))
+        d_thickness = -others * (1 - oa) * self.mu * solid
+        d_open_area = others * (1 - solid)
+
+        return trans, d_thickness, d_open_area
@@ -0,0 +1,102 @@
+import numpy as np
+
+from xraywindow.mechanical import BeamLayerArray, RectangularMembraneLayerArray
+
+# Keep derived dimensions a hair inside their limits so rounding never tips them into failure
+LIMIT_MARGIN = 1e-9
+
+class FeasibleDesignSpace:
+    '''Reduced parametrisation of a StackDesign that keeps each rib level within its own
+    stress limit wherever that is possible within its bounds.
+
+    Free rib widths are removed from the search. A narrower rib only raises its own level's
+    open area, and nothing else depends on it, so each free width is set to the narrowest
+    width its level's stress allows, or to its lower bound. Each spacing is searched from its
+    lower bound up to the largest spacing the level can carry (calc_max_spacing at its widest
+    allowed rib). The membrane thickness is already derived by the StackDesign.
+
+    Parameters are one number from 0 to 1 per rib level, placing each spacing within its
+    reduced range. Like StackDesign, the space can be called as a vectorized scipy objective
+    and can be pickled.
+
+    Points can still be infeasible: a level whose bounds leave no spacing it can carry (see
+    active_constraints), or a membrane that fails the StackDesign's own checks. evaluate()
+    still returns the StackDesign's feasibility mask for that reason.'''
+    def __init__(self, design):
+        self.design = design
+
+    @property
+    def n_params(self):
+        return len(self.design.beams)
+
+    @property
+    def param_names(self):
+        return [f"{beam.name} spacing" for beam in self.design.beams]
+
+    @property
+    def bounds(self):
+        return [0.0] * self.n_params, [1.0] * self.n_params
+
+    def _solve(self, u, report=False):
+        '''Map unit parameters to full design parameters and, if `report`, record what limits
+        each one.'''
+        u = np.atleast_2d(np.asarray(u, dtype=float))
+        if u.shape[1] != self.n_params:
+            raise ValueError(f"Expected {self.n_params} parameters per candidate, got {u.shape[1]}.")
+
+        design  = self.design
+        columns = []
+        active  = {}
+        length  = design.beams[0].length
+        for k, beam in enumerate(design.beams):
+            s_lo, s_hi = beam.spacing_bounds
+            w_lo, w_hi = (beam.width, beam.width) if beam.width is not None else beam.width_bounds
+
+            # Largest spacing the level can carry with its widest allowed ribs
+            widest = BeamLayerArray(beam.name, beam.material, s_lo, w_hi, length, beam.height, design.pressure)
+            s_max  = np.broadcast_to(np.minimum(widest.calc_max_spacing() * (1 - LIMIT_MARGIN), s_hi), (len(u),))
+            s      = s_lo + u[:, k] * np.maximum(s_max - s_lo, 0)
+            columns.append(s)
+
+            if report:
+                spacing_active = np.full(len(u), "", dtype=object)
+                spacing_active[(u[:, k] >= 1) & (s_max < s_hi)]  = "stress"
+                spacing_active[(u[:, k] >= 1) & (s_max >= s_hi)] = "upper bound"
+                spacing_active[u[:, k] <= 0]                     = "lower bound"
+                spacing_active[s_max < s_lo]                     = "infeasible"
+                active[f"{beam.name} spacing"] = spacing_active
+
+            if beam.width is None:
+                ribs  = BeamLayerArray(beam.name, beam.material, s, w_hi, length, beam.height, design.pressure)
+                w_min = ribs.calc_min_width() * (1 + LIMIT_MARGIN)
+                columns.append(np.clip(w_min, w_lo, w_hi))
+
+                if report:
+                    active[f"{beam.name} width"] = np.where(w_min > w_lo, "stress", "lower bound").astype(object)
+            length = s
+
+        if report:
+            membrane = RectangularMembraneLayerArray(design.membrane.name, design.membrane.material, width=length, pressure=design.pressure)
+            t_min    = membrane.calc_min_thickness()
+            active[f"{design.membrane.name} thickness"] = np.where(t_min > design.membrane.material.min_thickness, "stress", "min thickness").astype(object)
+
+        return np.stack(columns, axis=1), active
+
+    def to_params(self, u):
+        '''Full StackDesign parameters, (n_candidates, design.n_params), for unit parameters `u`.'''
+        return self._solve(u)[0]
+
+    def active_constraints(self, u):
+        '''For each derived or searched quantity, which constraint sets it in each candidate:
+        "stress", "lower bound", "upper bound", "min thickness", "infeasible" or "" (interior).'''
+        return self._solve(u, report=True)[1]
+
+    def evaluate(self, u):
+        '''Figure of merit and feasibility mask, as StackDesign.evaluate.'''
+        return self.design.evaluate(self.to_params(u))
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        fom, feasible = self.evaluate(x.T if x.ndim == 2 else x[None, :])
+        score = np.where(feasible, -fom, 0.0)
+        return score if x.ndim == 2 else score[0]
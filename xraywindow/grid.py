@@ -0,0 +1,101 @@
+'''Adaptive energy grids with a bounded interpolation error.
+
+The 1 eV default grid spends most of its points on smooth stretches of the spectrum. An
+adaptive grid keeps points only where the materials' attenuation needs them: close
+together around absorption edges and far apart elsewhere.
+
+A grid is chosen from the attenuation coefficients mu(E) of the materials alone, so one grid
+serves every window built from the same materials, whatever their thicknesses. For a layer
+of thickness t, T = exp(-t mu). Interpolating T between grid points, either log-linearly
+(LogInterpolator, XRayWindow.transmission of a spectrum) or linearly (integration,
+plotting), is then in error by at most `tol` in absolute transmission for any t:
+
+  - log-linear: an error of d in mu gives at most d / (e mu), reached at t = 1/mu;
+  - linear: a segment over which mu changes by a fraction r sags from the chord by at most
+    r^2 / (2 e^2), reached at t = 2/mu.
+
+The tolerance is split evenly between the materials, because the errors of the layers in a
+stack add (at most).'''
+import numpy as np
+
+# Adaptive grids kept, most recently used last. Keyed by material name and data version, so
+# the cache holds no reference to the tables themselves.
+MAX_CACHED_GRIDS = 64
+_GRIDS           = {}
+
+def simplify(x, y, tol, max_ratio=np.inf):
+    '''Douglas-Peucker simplification of several curves sampled on `x` at once.
+
+    Returns the indices of the points to keep so that linear interpolation of every row of
+    `y` between kept points is within `tol` (broadcast against `y`) of every dropped point,
+    and, for positive curves, so that no row changes by more than a factor of `max_ratio`
+    along a segment. The first and last points are always kept.'''
+    x   = np.asarray(x, dtype=float)
+    y   = np.atleast_2d(np.asarray(y, dtype=float))
+    tol = np.broadcast_to(tol, y.shape)
+    n   = len(x)
+
+    keep        = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    segments    = [(0, n - 1)]
+    while segments:
+        i, j = segments.pop()
+        if j - i < 2:
+            continue
+
+        inner = slice(i + 1, j)
+        frac  = (x[inner] - x[i]) / (x[j] - x[i])
+        chord = y[:, i, None] * (1 - frac) + y[:, j, None] * frac
+        error = (np.abs(chord - y[:, inner]) / tol[:, inner]).max(axis=0)
+
+        k = np.argmax(error)
+        if error[k] <= 1:
+            span = y[:, i:j + 1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = span.max(axis=1) / span.min(axis=1)
+            if not np.any(ratio > max_ratio):
+                continue
+            k = (j - i) // 2 - 1  # Too steep to span in one step: halve it
+
+        m       = i + 1 + k
+        keep[m] = True
+        segments.extend([(i, m), (m, j)])
+
+    return np.flatnonzero(keep)
+
+def adaptive_grid(xray_data, tol=1e-3, min_energy=10, max_energy=9999):
+    '''Energy grid (eV, read-only) from `min_energy` to `max_energy` on which the transmission
+    of any stack of the given materials (XRayData objects) interpolates to within about
+    `tol`. Grids are cached per set of materials, so repeated windows reuse them.'''
+    unique = sorted({id(xd): xd for xd in xray_data}.values(), key=lambda xd: xd.material_name)
+    if not unique:
+        raise ValueError("An adaptive grid needs at least one material.")
+
+    key  = (tuple((xd.material_name, xd.version) for xd in unique), float(tol), float(min_energy), float(max_energy))
+    grid = _GRIDS.pop(key, None)
+    if grid is None:
+        grid = _adaptive_grid(unique, *key[1:])
+    _GRIDS[key] = grid
+    while len(_GRIDS) > MAX_CACHED_GRIDS:
+        del _GRIDS[next(iter(_GRIDS))]
+    return grid
+
+def _adaptive_grid(xray_data, tol, min_energy, max_energy):
+    if not min_energy < max_energy:
+        raise ValueError("min_energy must be below max_energy.")
+
+    # Every point of every table, where the piecewise mu can bend
+    native = np.unique(np.concatenate([xd.energies for xd in xray_data]))
+    x      = np.concatenate([[min_energy], native[(native > min_energy) & (native < max_energy)], [max_energy]])
+    mu     = np.stack([-xd.interp_trans.log(x) / xd.thickness for xd in xray_data])
+
+    share = tol / len(xray_data)
+    keep  = simplify(
+        x, mu,
+        tol       = np.e * share * np.maximum(mu, np.finfo(float).tiny),
+        max_ratio = 1 + np.e * np.sqrt(2 * share),
+    )
+
+    grid = x[keep]
+    grid.flags.writeable = False
+    return grid
@@ -0,0 +1,99 @@
+'''Opt-in counters and timers for the library's hot paths.
+
+    from xraywindow import instrument
+
+    with instrument.profile() as prof:
+        run_my_optimization()
+    print(prof.summary())
+    prof.to_json("run.json")
+
+Instrumented functions record a call count and the inclusive time spent in them (a call to
+XRayWindow.spectrum includes the transmission work it triggers). While no profile is active
+an instrumented call costs one extra function call and a context variable lookup.
+
+A profile records the thread that opened it, including asyncio tasks created inside the
+`with` block. Work in other threads, and in worker processes (optimize's pools,
+plotting.render_many), is not counted.'''
+import json
+import time
+import functools
+import contextvars
+from collections import defaultdict
+from contextlib  import contextmanager
+
+# Profiles active in the current context (thread or asyncio task), innermost last
+_ACTIVE = contextvars.ContextVar("xraywindow_profiles", default=())
+
+class Profile:
+    '''Call counts and inclusive times (s) gathered while the profile was active.'''
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.times = defaultdict(float)
+
+    def record(self, name, elapsed=0.0, n=1):
+        self.calls[name] += n
+        self.times[name] += elapsed
+
+    def to_dict(self):
+        return {name: {"calls": self.calls[name], "time": self.times[name]} for name in sorted(self.calls)}
+
+    def to_json(self, filename):
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def diff(self, other):
+        '''Change in calls and time from `other` (a Profile or a dict from to_dict/to_json)
+        to this profile, for every name in either.'''
+        mine   = self.to_dict()
+        theirs = other.to_dict() if isinstance(other, Profile) else other
+        empty  = {"calls": 0, "time": 0.0}
+
+        return {
+            name: {k: mine.get(name, empty)[k] - theirs.get(name, empty)[k] for k in ("calls", "time")}
+            for name in sorted(set(mine) | set(theirs))
+        }
+
+    def summary(self):
+        lines = [f"{'name':48s} {'calls':>10s} {'total (ms)':>12s} {'per call (us)':>14s}"]
+        for name in sorted(self.calls, key=lambda n: -self.times[n]):
+            calls, total = self.calls[name], self.times[name]
+            lines.append(f"{name:48s} {calls:10d} {total*1e3:12.3f} {total/calls*1e6:14.2f}")
+        return "\n".join(lines)
+
+@contextmanager
+def profile():
+    '''Collect counters and timers for everything run inside the `with` block, in this
+    thread.'''
+    prof  = Profile()
+    token = _ACTIVE.set(_ACTIVE.get() + (prof,))
+    try:
+        yield prof
+    finally:
+        _ACTIVE.reset(token)
+
+def enabled():
+    return bool(_ACTIVE.get())
+
+def count(name, n=1):
+    '''Count an event (without timing) in every active profile.'''
+    for prof in _ACTIVE.get():
+        prof.record(name, n=n)
+
+def instrumented(func):
+    '''Decorator that counts and times calls to `func` under its qualified name.'''
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        active = _ACTIVE.get()
+        if not active:
+            return func(*args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            for prof in active:
+                prof.record(name, elapsed)
+    return wrapper
@@ -0,0 +1,80 @@
+import numpy as np
+
+from xraywindow.instrument import instrumented
+
+# Give up on the O(1) bin table (and fall back to a binary search) if the grid is so uneven
+# that the table would need more than this many bins per grid point.
+MAX_BINS_PER_POINT = 8
+
+class LogInterpolator:
+    '''Piecewise log-linear interpolation of a positive table such as transmission.
+
+    Interpolating ln(y) rather than y follows the exponential shape of attenuation between
+    table points, and reproduces the table exactly at its own points. Segment lookup uses a
+    uniform bin table: because no bin is wider than the narrowest grid step, an energy's bin
+    gives its segment directly, give or take one step, so no search is needed.
+
+    Construction only stores references to `x` and `y`; slopes and the bin table are built on
+    the first query.'''
+    def __init__(self, x, y):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+
+        if len(self.x) < 2:
+            raise ValueError("At least two points are needed to interpolate.")
+
+        self._slope     = None
+        self._bin_index = None
+
+    def _prepare(self):
+        x, y  = self.x, self.y
+        dx    = np.diff(x)
+        log_y = np.log(np.maximum(y, np.finfo(float).tiny))
+
+        self._log_y = log_y
+        self._slope = np.append(np.diff(log_y) / dx, 0.0)  # Last entry only serves x[-1] itself
+
+        n_bins = int(np.ceil((x[-1] - x[0]) / dx.min()))
+        if n_bins <= MAX_BINS_PER_POINT * len(x):
+            self._bin_width = (x[-1] - x[0]) / n_bins
+            starts          = x[0] + np.arange(n_bins) * self._bin_width
+            self._bin_index = np.clip(np.searchsorted(x, starts, side="right") - 1, 0, len(x) - 2)
+
+    def segment(self, energy):
+        '''Index i of the segment x[i] <= energy < x[i+1] for each energy (the last point
+        gets its own index). NaN energies get index 0, so they interpolate to NaN.'''
+        if self._slope is None:
+            self._prepare()
+
+        x = self.x
+
+        nan = np.isnan(energy)
+        if nan.any():
+            energy = np.where(nan, x[0], energy)
+
+        if np.any(energy < x[0]):
+            raise ValueError("A value in x_new is below the interpolation range.")
+        if np.any(energy > x[-1]):
+            raise ValueError("A value in x_new is above the interpolation range.")
+
+        if self._bin_index is None:
+            return np.searchsorted(x, energy, side="right") - 1
+
+        b = np.minimum(((energy - x[0]) / self._bin_width).astype(np.intp), len(self._bin_index) - 1)
+        i = self._bin_index[b]
+        i = i - ((i > 0) & (energy < x[i]))  # Rounding in the bin calculation
+        return i + (energy >= x[i + 1])
+
+    @instrumented
+    def log(self, energy):
+        '''Interpolated ln(y) (NaN at NaN energies).'''
+        energy = np.asarray(energy, dtype=float)
+        i      = self.segment(energy)
+        return self._log_y[i] + self._slope[i] * (energy - self.x[i])
+
+    @instrumented
+    def __call__(self, energy):
+        '''Interpolated y (NaN at NaN energies).'''
+        energy = np.asarray(energy, dtype=float)
+        i      = self.segment(energy)
+        return self.y[i] * np.exp(self._slope[i] * (energy - self.x[i]))
@@ -1,26 +1,38 @@
 import os
-import yaml
+import functools
 
-from xraywindow.xray_data import XRayData
+from xraywindow.registry import get_xray_data
+from xraywindow.compound import from_recipe
 
 class Material:
-    '''Contains material properties for a given material.'''
-    def __init__(self, name, modulus, stress, poisson, min_thickness=0):
+    '''Contains material properties for a given material. With an `xray_recipe` (see
+    xraywindow.compound), the x-ray data is synthesized from other materials' tables.'''
+    def __init__(self, name, modulus, stress, poisson, min_thickness=0, xray_recipe=None):
         self.name          = name
         self.modulus       = modulus
         self.stress        = stress
         self.poisson       = poisson
         self.min_thickness = min_thickness
+        self.xray_recipe   = xray_recipe
         
         # X-ray data
         self.xray_data = None
         
+    def __getstate__(self):
+        # X-ray tables are shared through the registry rather than pickled
+        state = self.__dict__.copy()
+        state["xray_data"] = None
+        return state
+        
     def biaxial_modulus(self):
         return self.modulus / (1 - self.poisson)
     
     def get_xray_data(self):
         if self.xray_data is None: 
-            self.xray_data = XRayData(self.name)
+            if self.xray_recipe is not None:
+                self.xray_data = from_recipe(self.name, self.xray_recipe)
+            else:
+                self.xray_data = get_xray_data(self.name)
         return self.xray_data
 
 def import_materials(material_data_dir = None, material_filename = "materials.yml"):
@@ -29,12 +41,26 @@ def import_materials(material_data_dir = None, material_filename = "materials.ym
     if material_data_dir is None:
         material_data_dir = os.path.join("data")
 
-    filename  = os.path.join(material_data_dir, material_filename)
+    filename  = os.path.realpath(os.path.join(material_data_dir, material_filename))
     materials = {}
 
-    with open(filename, encoding="utf-8") as f:
-        yml = yaml.load(f, yaml.SafeLoader)
-        for mat in yml:
-            materials[mat['name']] = Material(mat['name'], mat['youngs_modulus'], mat['ultimate_stress'], mat['poisson_ratio'], mat['min_thickness'])
+    for mat in _load_materials_yml(filename, os.stat(filename).st_mtime_ns):
+        materials[mat['name']] = material_from_properties(mat)
     
     return materials
+
+def material_from_properties(mat):
+    '''Material from one entry of materials.yml. An `xray` recipe takes the entry's own
+    density, which materials.yml gives in g/cm^3.'''
+    recipe = mat.get('xray')
+    if recipe is not None:
+        recipe = dict(recipe, density=mat['density'] * 1000)
+    return Material(mat['name'], mat['youngs_modulus'], mat['ultimate_stress'], mat['poisson_ratio'], mat['min_thickness'], recipe)
+
+@functools.lru_cache(maxsize=16)
+def _load_materials_yml(filename, mtime):
+    '''Parse a materials file once per modification time.'''
+    import yaml
+
+    with open(filename, encoding="utf-8") as f:
+        return tuple(yaml.load(f, yaml.SafeLoader))
@@ -1,12 +1,15 @@
 import numpy as np
 from xraywindow.transmission import XRayWindow, XRayWindowLayer
-from math import sqrt
+from xraywindow.instrument   import instrumented
+from xraywindow.cache        import design_key
 
 ATM_PRESSURE  = 101.3e3         # Pa
 TEST_PRESSURE = 2*ATM_PRESSURE
 
 class MechanicalWindowLayer:
     '''Defines mechanical support layer of x-ray detector window.'''
+    __slots__ = ("max_stress", "fail_stress", "modulus", "poisson", "material", "name")
+
     def __init__(self, material, name):
         self.max_stress  = np.nan
         self.fail_stress = material.stress
@@ -20,6 +23,7 @@ class MechanicalWindowLayer:
         semantically named properties (e.g. thicknes or height).'''
         return 0
     
+    @instrumented
     def calc_stress(self):
         '''Should set and return self.max_stress'''
         return 0
@@ -35,6 +39,22 @@ class MechanicalWindowLayer:
             raise ValueError("self.max_stress not set. Be sure to include all necessary parameters.")
         return self.max_stress > self.fail_stress
     
+    # Attributes that, with the material, define the layer (see `design()`)
+    _design_fields = ()
+
+    def design(self):
+        '''Canonical description of the layer: its type, material (with the layer's own
+        material properties and the x-ray data version) and dimensions.'''
+        return {
+            "type":        type(self).__name__,
+            "material":    self.material.name,
+            "data":        self.material.get_xray_data().version,
+            "fail_stress": float(self.fail_stress),
+            "modulus":     float(self.modulus),
+            "poisson":     float(self.poisson),
+            **{field: float(getattr(self, field)) for field in self._design_fields},
+        }
+
     def to_xray_window_layer(self):
         return XRayWindowLayer(
             self.name, 
@@ -48,6 +68,10 @@ class MechanicalWindowLayer:
     
 class BeamLayer(MechanicalWindowLayer):
     '''A support structure layer consiting of an Euler-Bernoulli fixed-fixed beam.'''
+    __slots__ = ("spacing", "width", "length", "height", "pressure", "slenderness", "max_deflection")
+
+    _design_fields = ("spacing", "width", "length", "height", "pressure")
+
     def __init__(self, name, material, spacing=np.nan, width=np.nan, length=np.nan, height=np.nan, pressure = TEST_PRESSURE):
         MechanicalWindowLayer.__init__(self, material=material, name=name)
         
@@ -64,6 +88,7 @@ class BeamLayer(MechanicalWindowLayer):
     def xray_thickness(self):
         return self.height
     
+    @instrumented
     def calc_stress(self):
         '''
         $\sigma_max = Mc/I$
@@ -82,6 +107,22 @@ class BeamLayer(MechanicalWindowLayer):
         self.max_stress = dist_load * (self.length**2)/(2.0*self.width*self.height**2)
         return self.max_stress
     
+    def stress_and_gradient(self):
+        '''Return the maximum stress and a dict of its derivatives with respect to spacing,
+        width, length and height.'''
+        sigma = self.calc_stress()
+        s     = self.spacing
+        w     = self.width
+        
+        grad = {
+            "spacing": sigma / (s + w),
+            "width":   -sigma * s / (w * (s + w)),
+            "length":  2 * sigma / self.length,
+            "height":  -2 * sigma / self.height,
+        }
+        return sigma, grad
+    
+    @instrumented
     def calc_max_deflection(self):
         dist_load           = (self.spacing + self.width) * self.pressure
         self.max_deflection = dist_load * self.length**4/(32 * self.modulus * self.width * self.height**3)
@@ -90,27 +131,46 @@ class BeamLayer(MechanicalWindowLayer):
     def open_area(self):
         return self.spacing / (self.spacing + self.width)
     
+    def open_area_gradient(self):
+        '''Derivatives of the open area with respect to spacing and width.'''
+        total = (self.spacing + self.width)**2
+        return {"spacing": self.width / total, "width": -self.spacing / total}
+    
     def slenderness_ratio(self):
-        '''This was a test and is not correct/useful.'''
+        '''This was a test and is not correct/useful. Also stored in self.slenderness.'''
         I = self.width*self.height**3/12
         A = self.width*self.height
-        r = sqrt(I/A)   # radius of gyration: TO DO-> Does width not matter? Why?
-        self.slenderness_ratio = self.length/r
+        r = np.sqrt(I/A)   # radius of gyration: TO DO-> Does width not matter? Why?
+        self.slenderness = self.length/r
         
-        return self.slenderness_ratio
+        return self.slenderness
     
+    @instrumented
     def calc_max_spacing(self):
-        '''Calculate the maximum spacing.'''
+        '''Calculate the maximum spacing, i.e. the spacing at which max_stress equals fail_stress.'''
         s = self.fail_stress
         w = self.width
         h = self.height
         p = self.pressure
         L = self.length
         
-        spacing = 2*s*w*h**2/(p*L**2)
+        spacing = 2*s*w*h**2/(p*L**2) - w
         
         return spacing
     
+    @instrumented
+    def calc_min_width(self):
+        '''Calculate the minimum rib width that carries the load at the current spacing.
+        Returns inf if no width will do (the ribs are too long or too thin).'''
+        s = self.fail_stress
+        h = self.height
+        p = self.pressure
+        L = self.length
+        
+        k = p*L**2/(2*h**2)   # Stress per unit (spacing + width)/width
+        
+        return np.where(s > k, self.spacing*k/np.where(s > k, s - k, 1), np.inf)[()]
+    
     def __repr__(self):
         msg  = f"{self.name}: BeamLayer | OA {self.open_area()*100:4.1f}%\n"
         msg += f"  Spacing:  \t{self.spacing * 1e6:7.1f} µm\n"
@@ -124,6 +184,10 @@ class BeamLayer(MechanicalWindowLayer):
 class RectangularMembraneLayer(MechanicalWindowLayer):
     '''A support structure layer consiting of a rectangular membrane. Assumes length is more than
     six times the width (i.e. an infitely long membrane).'''
+    __slots__ = ("width", "thickness", "pressure")
+
+    _design_fields = ("width", "thickness", "pressure")
+
     def __init__(self, name, material, width=np.nan, thickness=np.nan, pressure = TEST_PRESSURE):
         MechanicalWindowLayer.__init__(self, material=material, name=name)
         
@@ -136,6 +200,7 @@ class RectangularMembraneLayer(MechanicalWindowLayer):
     def xray_thickness(self):
         return self.thickness
         
+    @instrumented
     def calc_stress(self):
         E = self.modulus
         v = self.poisson
@@ -146,9 +211,20 @@ class RectangularMembraneLayer(MechanicalWindowLayer):
         self.max_stress = (E * p**2 * a**2 /(6.0 * t**2 * (1 - v**2)))**(1/3.0)
         return self.max_stress
     
+    def stress_and_gradient(self):
+        '''Return the maximum stress and a dict of its derivatives with respect to width and
+        thickness. Stress goes as (width/thickness)^(2/3).'''
+        sigma = self.calc_stress()
+        grad  = {
+            "width":     2 * sigma / (3 * self.width),
+            "thickness": -2 * sigma / (3 * self.thickness),
+        }
+        return sigma, grad
+    
     def open_area(self):
         return 0
     
+    @instrumented
     def calc_max_width(self):
         '''Calculate the maximum width a long rectangular membrane can be and still
         withstand the specified pressure.'''
@@ -158,13 +234,14 @@ class RectangularMembraneLayer(MechanicalWindowLayer):
         t = self.thickness
         p = self.pressure
 
-        w = 2 * 2.4495 * t / p * sqrt(((1-v**2) * s**3) / E)
+        w = 2 * 2.4495 * t / p * np.sqrt(((1-v**2) * s**3) / E)
         
         if np.isnan(w):
             raise ValueError("Missing parameter, possibly self.thickness.")
             
         return w
     
+    @instrumented
     def calc_min_thickness(self):
         '''Calculate the minimum required thickness for a rectangular membrane to 
         withstand the given pressure.'''
@@ -174,7 +251,7 @@ class RectangularMembraneLayer(MechanicalWindowLayer):
         p = self.pressure
         a = self.width / 2.0
 
-        t = p * a / 2.4495 * sqrt(E / ((1-v**2) * s**3))
+        t = p * a / 2.4495 * np.sqrt(E / ((1-v**2) * s**3))
         
         if np.isnan(t):
             raise ValueError("Missing parameter, possibly self.width.")
@@ -184,6 +261,12 @@ class RectangularMembraneLayer(MechanicalWindowLayer):
             
         return t
     
+    def min_thickness_and_gradient(self):
+        '''Return the minimum thickness and its derivative with respect to width, which is
+        zero where the material's own minimum thickness applies.'''
+        t = self.calc_min_thickness()
+        return t, t / self.width * (t > self.material.min_thickness)
+    
     def __repr__(self):
         msg  = f"{self.name}: RectangularMembraneLayer | OA {self.open_area()*100:4.1f}%\n"
         msg += f"  Width:     \t{self.width     * 1e6:7.1f} µm\n"
@@ -192,6 +275,146 @@ class RectangularMembraneLayer(MechanicalWindowLayer):
         
         return msg
 
+def _columns(*values):
+    '''Broadcast scalars and arrays against each other into equal-length float columns.'''
+    return [np.array(v, dtype=float) for v in np.broadcast_arrays(*(np.atleast_1d(v) for v in values))]
+
+class BeamLayerArray(BeamLayer):
+    '''Struct-of-arrays form of BeamLayer. Each dimension is a NumPy column and each row is
+    one design, so stresses, limits and failure masks for many designs come out of a single
+    vectorized pass. Material properties (fail_stress, modulus, poisson) may be replaced by
+    per-row arrays; call calc_stress() again afterwards.'''
+    __slots__ = ()
+
+    def __init__(self, name, material, spacing, width, length, height, pressure = TEST_PRESSURE):
+        MechanicalWindowLayer.__init__(self, material=material, name=name)
+
+        self.spacing, self.width, self.length, self.height, self.pressure = _columns(spacing, width, length, height, pressure)
+
+        self.slenderness_ratio()
+
+        self.calc_stress()
+
+    def __len__(self):
+        return len(self.spacing)
+
+    def failure(self):
+        '''Boolean mask of failed designs. Rows with a NaN stress count as failed.'''
+        return ~(self.max_stress <= self.fail_stress)
+
+    def layer(self, i):
+        '''Return row `i` as a BeamLayer.'''
+        return BeamLayer(self.name, self.material, self.spacing[i], self.width[i], self.length[i], self.height[i], self.pressure[i])
+
+    def __repr__(self):
+        return f"{self.name}: BeamLayerArray | {len(self)} designs | Material: {self.material.name}\n"
+
+class RectangularMembraneLayerArray(RectangularMembraneLayer):
+    '''Struct-of-arrays form of RectangularMembraneLayer; see BeamLayerArray.'''
+    __slots__ = ()
+
+    def __init__(self, name, material, width=np.nan, thickness=np.nan, pressure = TEST_PRESSURE):
+        MechanicalWindowLayer.__init__(self, material=material, name=name)
+
+        self.width, self.thickness, self.pressure = _columns(width, thickness, pressure)
+
+        self.calc_stress()
+
+    def __len__(self):
+        return len(self.width)
+
+    def open_area(self):
+        return np.zeros(len(self))
+
+    def failure(self):
+        '''Boolean mask of failed designs. Rows with a NaN stress count as failed.'''
+        return ~(self.max_stress <= self.fail_stress)
+
+    @instrumented
+    def calc_max_width(self):
+        '''Maximum membrane width for each row. Rows with missing parameters give NaN.'''
+        E = self.modulus
+        s = self.fail_stress
+        v = self.poisson
+        t = self.thickness
+        p = self.pressure
+
+        return 2 * 2.4495 * t / p * np.sqrt(((1-v**2) * s**3) / E)
+
+    @instrumented
+    def calc_min_thickness(self):
+        '''Minimum thickness for each row, never less than the material minimum. Rows with
+        missing parameters give NaN.'''
+        E = self.modulus
+        s = self.fail_stress
+        v = self.poisson
+        p = self.pressure
+        a = self.width / 2.0
+
+        t = p * a / 2.4495 * np.sqrt(E / ((1-v**2) * s**3))
+
+        return np.maximum(t, self.material.min_thickness)
+
+    def layer(self, i):
+        '''Return row `i` as a RectangularMembraneLayer.'''
+        return RectangularMembraneLayer(self.name, self.material, self.width[i], self.thickness[i], self.pressure[i])
+
+    def __repr__(self):
+        return f"{self.name}: RectangularMembraneLayerArray | {len(self)} designs | Material: {self.material.name}\n"
+
+# Layer attributes that array layers can take per row, besides `material`
+BEAM_ATTRIBUTES     = ("spacing", "width", "length", "height", "pressure")
+MEMBRANE_ATTRIBUTES = ("width", "thickness", "pressure")
+MATERIAL_PROPERTIES = ("fail_stress", "modulus", "poisson")
+
+def layer_attributes(layer):
+    '''Attributes of a BeamLayer or RectangularMembraneLayer that can be given per row.'''
+    if isinstance(layer, BeamLayer):
+        return BEAM_ATTRIBUTES + MATERIAL_PROPERTIES
+    if isinstance(layer, RectangularMembraneLayer):
+        return MEMBRANE_ATTRIBUTES + MATERIAL_PROPERTIES
+    raise ValueError(f"Cannot vectorize a {type(layer).__name__} ('{layer.name}').")
+
+def layer_arrays(layers, columns, materials=None, derive_thickness=None):
+    '''Array forms of the layers of a MechanicalWindow. Attributes are taken from `columns`, a
+    dict of per-row arrays keyed by (layer index, attribute), where it has them, and from the
+    layers otherwise. Membranes named in `derive_thickness` get their minimum thickness times
+    the given margin.'''
+    derive_thickness = derive_thickness or {}
+
+    arrays = []
+    for i, layer in enumerate(layers):
+        material = layer.material if materials is None else materials[i]
+
+        def column(attr):
+            v = columns.get((i, attr))
+            return getattr(layer, attr) if v is None else v
+
+        if isinstance(layer, BeamLayer):
+            array = BeamLayerArray(layer.name, material, *(column(attr) for attr in BEAM_ATTRIBUTES))
+        else:
+            array = RectangularMembraneLayerArray(layer.name, material, *(column(attr) for attr in MEMBRANE_ATTRIBUTES))
+
+        properties = [p for p in MATERIAL_PROPERTIES if (i, p) in columns]
+        for p in properties:
+            setattr(array, p, columns[i, p])
+        if layer.name in derive_thickness:
+            array.thickness = array.calc_min_thickness() * derive_thickness[layer.name]
+        if properties or layer.name in derive_thickness:
+            array.calc_stress()
+
+        arrays.append(array)
+    return arrays
+
+def checked_layers(layers, driven=()):
+    '''Whether each layer counts towards feasibility. Membranes with no width are
+    free-standing films whose stress is undefined, unless `driven` (a set of (layer name,
+    attribute) pairs) gives them a width.'''
+    return [
+        not isinstance(layer, RectangularMembraneLayer) or not np.isnan(layer.width) or (layer.name, "width") in driven
+        for layer in layers
+    ]
+
 class MechanicalWindow:
     '''Defines entire mechanical support structure of x-ray detector window.'''
     def __init__(self):
@@ -200,6 +423,15 @@ class MechanicalWindow:
     def add_layer(self, layer:MechanicalWindowLayer):
         self.layers.append(layer)
         
+    def design(self):
+        '''Canonical description of the window, independent of layer names.'''
+        return {"type": "MechanicalWindow", "layers": [layer.design() for layer in self.layers]}
+
+    def design_key(self):
+        '''Hash of `design()`: equal for windows that are physically the same.'''
+        return design_key(self.design())
+
+    @instrumented
     def to_xray_window(self, name=""):
         window = XRayWindow()
         window.name = name
@@ -213,4 +445,4 @@ class MechanicalWindow:
         for L in self.layers:
             msg += str(L) + "\n"
             
-        return msg
\ No newline at end of file
+        return msg
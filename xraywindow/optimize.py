@@ -0,0 +1,195 @@
+'''Design searches over StackDesign templates.
+
+`optimize()` runs scipy's differential evolution on a StackDesign. Each generation is split
+into one chunk per process, and every chunk is evaluated vectorized in a worker that keeps its
+own copy of the design. Designs pickle without their x-ray tables. Workers fetch the tables
+from the registry, which memory-maps a compiled bundle when there is one, so the tables are
+shared between processes rather than copied.
+
+`optimize_reduced()` searches a reduced space that keeps the ribs within their stress limits,
+with dependent rib widths derived from the closed-form limits (see xraywindow.feasibility).
+
+`minimize_gradient()` uses the exact gradients and stress constraints of a StackDesign
+instead, which needs far fewer evaluations on these smooth, low-dimensional problems.
+
+`example_designs()` gives the four searches from example.py as templates.'''
+import os
+import multiprocessing
+import numpy as np
+
+from xraywindow.material    import import_materials
+from xraywindow.feasibility import FeasibleDesignSpace, LIMIT_MARGIN
+from xraywindow.population  import StackDesign, BeamSpec, MembraneSpec, CoatingSpec, OPT_ENERGIES
+
+_WORKER_DESIGN = None
+
+def _init_worker(design):
+    global _WORKER_DESIGN
+    _WORKER_DESIGN = design
+
+def _evaluate_chunk(x):
+    return _WORKER_DESIGN(x.T)
+
+class ParallelEvaluator:
+    '''Map-like callable for `differential_evolution(workers=...)` that evaluates each
+    generation in vectorized chunks across a process pool. Use it as a context manager.'''
+    def __init__(self, design, processes=None):
+        self.design    = design
+        self.processes = processes or os.cpu_count()
+        self._pool     = None
+
+    def __enter__(self):
+        self._pool = multiprocessing.get_context().Pool(self.processes, initializer=_init_worker, initargs=(self.design,))
+        return self
+
+    def __exit__(self, *exc):
+        self._pool.close()
+        self._pool.join()
+        self._pool = None
+
+    def __call__(self, func, iterable):
+        # `func` is scipy's per-candidate wrapper around the design; the chunks call the
+        # design directly instead so each worker evaluates its share in one pass.
+        x      = np.array(list(iterable), dtype=float)
+        chunks = [c for c in np.array_split(x, self.processes) if len(c)]
+        return np.concatenate(self._pool.map(_evaluate_chunk, chunks))
+
+def optimize(design, workers=-1, seed=None, **kwargs):
+    '''Maximize the figure of merit of a StackDesign (or FeasibleDesignSpace) with
+    differential evolution.
+
+    `workers` is the number of processes (-1 for all cores). With `workers=1` the search runs
+    in-process using scipy's vectorized mode. Extra keyword arguments go to
+    `differential_evolution`.'''
+    from scipy.optimize import differential_evolution, Bounds
+
+    bounds = Bounds(*design.bounds)
+    kwargs.setdefault("updating", "deferred")
+
+    if workers == 1:
+        return differential_evolution(design, bounds, vectorized=True, seed=seed, **kwargs)
+
+    with ParallelEvaluator(design, None if workers == -1 else workers) as evaluator:
+        return differential_evolution(design, bounds, workers=evaluator, seed=seed, **kwargs)
+
+def optimize_reduced(design, workers=-1, seed=None, **kwargs):
+    '''Like `optimize()`, but searches the design's FeasibleDesignSpace: free rib widths are
+    derived and spacings never exceed what their level can carry. The result's `x` holds the
+    full design parameters, `u` the reduced ones, and `active` the constraint that sets each
+    quantity.'''
+    space  = FeasibleDesignSpace(design)
+    result = optimize(space, workers=workers, seed=seed, **kwargs)
+
+    result.u      = result.x
+    result.x      = space.to_params(result.u)[0]
+    result.active = {name: values[0] for name, values in space.active_constraints(result.u).items()}
+    return result
+
+def minimize_gradient(design, x0=None, method="SLSQP", **kwargs):
+    '''Maximize the design's figure of merit with a gradient-based method, using the exact
+    gradient and the stress margins as inequality constraints.
+
+    The search runs in coordinates scaled to the unit box of the design's bounds; the
+    returned result's `x` is in meters. `x0` defaults to the middle of the bounds.
+
+    The optimizer may end a hair outside a stress limit, so the margins must reach
+    LIMIT_MARGIN rather than zero, and a final point that design.evaluate() still rejects is
+    reported with `success` False.'''
+    from scipy.optimize import minimize
+
+    lb, ub = (np.asarray(b, dtype=float) for b in design.bounds)
+    scale  = ub - lb
+
+    def to_params(u):
+        return lb + u * scale
+
+    def objective(u):
+        fom, grad = design.fom_and_gradient(to_params(u))
+        return -fom, -grad * scale
+
+    constraints = {
+        "type": "ineq",
+        "fun":  lambda u: design.constraints_and_jacobian(to_params(u))[0] - LIMIT_MARGIN,
+        "jac":  lambda u: design.constraints_and_jacobian(to_params(u))[1] * scale,
+    }
+
+    u0     = np.full(len(lb), 0.5) if x0 is None else (np.asarray(x0, dtype=float) - lb) / scale
+    result = minimize(objective, u0, jac=True, method=method, bounds=[(0, 1)] * len(lb), constraints=constraints, **kwargs)
+    result.x = to_params(result.x)
+
+    if result.success and not design.evaluate(result.x[None, :])[1][0]:
+        result.success = False
+        result.message = "The final design fails its stress check."
+    return result
+
+def two_layer_design(
+    materials,
+    prim_width  = 60e-6,
+    prim_length = 10.2e-3,
+    prim_thick  = 380e-6,
+    prim_mat    = "silicon",
+    tert_mat    = "polymer",
+    use_light   = True,
+    use_gas     = True,
+    energies    = OPT_ENERGIES,
+    name        = "",
+):
+    '''Template matching `make_two_layer_window` in example.py; parameter is the rib spacing.'''
+    return StackDesign(
+        beams    = [BeamSpec("Primary", materials[prim_mat], prim_thick, width=prim_width, length=prim_length, spacing_bounds=(100e-6, 2000e-6))],
+        membrane = MembraneSpec("Membrane", materials[tert_mat]),
+        coatings = _coatings(materials, use_light, use_gas),
+        energies = energies,
+        name     = name,
+    )
+
+def three_layer_design(
+    materials,
+    prim_width  = 60e-6,
+    prim_length = 10.2e-3,
+    prim_thick  = 380e-6,
+    sec_thick   = 45e-6,
+    prim_mat    = "silicon",
+    sec_mat     = "silicon",
+    tert_mat    = "polymer",
+    use_light   = True,
+    use_gas     = True,
+    energies    = OPT_ENERGIES,
+    name        = "",
+):
+    '''Template matching `make_three_layer_window` in example.py; parameters are the primary
+    spacing, secondary spacing and secondary width.'''
+    return StackDesign(
+        beams    = [
+            BeamSpec("Primary", materials[prim_mat], prim_thick, width=prim_width, length=prim_length, spacing_bounds=(100e-6, 2000e-6)),
+            BeamSpec("Secondary", materials[sec_mat], sec_thick, spacing_bounds=(1e-6, 200e-6), width_bounds=(5e-6, 30e-6)),
+        ],
+        membrane = MembraneSpec("Membrane", materials[tert_mat]),
+        coatings = _coatings(materials, use_light, use_gas),
+        energies = energies,
+        name     = name,
+    )
+
+def _coatings(materials, use_light, use_gas):
+    coatings = []
+    if use_light:
+        coatings.append(CoatingSpec("Light Block", materials["aluminum"], 30e-9))
+    if use_gas:
+        coatings.append(CoatingSpec("Gas Barrier", materials["boron"], 20e-9))
+    return coatings
+
+def example_designs(materials=None):
+    '''The four searches from example.py, keyed by name.'''
+    if materials is None:
+        materials = import_materials()
+
+    return {
+        "two_layer_polymer":   two_layer_design(materials, name="2-layer polymer"),
+        "three_layer_polymer": three_layer_design(materials, name="3-layer polymer"),
+        "two_layer_si3n4":     two_layer_design(materials, tert_mat="SiNx", use_gas=False, name="2-layer Si3N4"),
+        "three_layer_si3n4":   three_layer_design(materials, tert_mat="SiNx", use_gas=False, name="3-layer Si3N4"),
+    }
+
+def run_examples(workers=-1, seed=None, **kwargs):
+    '''Run all four example searches and return their results keyed by name.'''
+    return {name: optimize(design, workers=workers, seed=seed, **kwargs) for name, design in example_designs().items()}
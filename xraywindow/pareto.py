@@ -0,0 +1,211 @@
+'''Multi-objective search for the trade-off between transmission and strength.
+
+A single figure of merit hides the choice between letting light-element lines through and
+keeping a margin on the window's strength. `pareto_search()` keeps the objectives apart and
+returns the whole non-dominated front from a single run:
+
+    result = pareto_search(example_designs()["three_layer_polymer"], seed=0)
+    result.objectives["low energy"], result.objectives["safety factor"]
+
+By default the objectives are mean transmission at the Li, Be and B lines ("low energy"),
+the safety factor (smallest fail_stress / max_stress over the rib levels and membrane), and
+mean transmission at the O and Si lines ("high energy"). All of them are maximized. The
+transmission objectives are evaluated at the ELEMENT_LINES energies themselves, not
+interpolated from the design's coarser `energies`.
+
+The search is NSGA-II style. Each generation is evaluated as one batch through the
+StackDesign. Survivors are chosen by constrained non-dominated sorting, where any feasible
+design beats any infeasible one, and then by crowding distance. Every feasible
+non-dominated design found goes into a bounded archive.'''
+import numpy as np
+
+from xraywindow.weighting import WeightSet, ELEMENT_LINES
+
+def default_objectives(energies=None):
+    '''WeightSet with the default "low energy" and "high energy" profiles on `energies`, by
+    default exactly the line energies they use.'''
+    low  = [ELEMENT_LINES[e] for e in ("Li", "Be", "B")]
+    high = [ELEMENT_LINES[e] for e in ("O", "Si")]
+
+    weights = WeightSet(sorted(low + high) if energies is None else energies)
+    weights.add_lines("low energy", low, np.full(len(low), 1 / len(low)))
+    weights.add_lines("high energy", high, np.full(len(high), 1 / len(high)))
+    return weights
+
+def dominates(a, b):
+    '''Matrix d[i, j], true where row i of `a` dominates row j of `b` (all objectives
+    minimized).'''
+    a, b = a[:, None, :], b[None, :, :]
+    return np.all(a <= b, axis=2) & np.any(a < b, axis=2)
+
+def non_dominated_sort(F, violation=None):
+    '''Front index (0 is the non-dominated front) for each row of `F`, minimizing every
+    column. With `violation`, a feasible row (violation 0) beats any infeasible one, and
+    of two infeasible rows the one with the smaller violation wins.'''
+    F = np.asarray(F, dtype=float)
+    n = len(F)
+
+    dom = dominates(F, F)
+    if violation is not None:
+        violation = np.asarray(violation, dtype=float)
+        feasible  = violation <= 0
+        both      = feasible[:, None] & feasible[None, :]
+        dom       = np.where(both, dom, violation[:, None] < violation[None, :])
+
+    n_dominators = dom.sum(axis=0)
+    rank         = np.full(n, -1)
+    front        = 0
+    current      = np.flatnonzero(n_dominators == 0)
+    while len(current):
+        rank[current] = front
+        n_dominators -= dom[current].sum(axis=0)
+        n_dominators[current] = -1
+        current = np.flatnonzero(n_dominators == 0)
+        front  += 1
+    return rank
+
+def crowding_distance(F):
+    '''NSGA-II crowding distance of each row of `F` within its front. Points at either end
+    of any objective get inf.'''
+    F = np.asarray(F, dtype=float)
+    n, m = F.shape
+    if n <= 2:
+        return np.full(n, np.inf)
+
+    order    = np.argsort(F, axis=0)
+    sorted_F = np.take_along_axis(F, order, axis=0)
+    span     = sorted_F[-1] - sorted_F[0]
+    gaps     = np.zeros((n, m))
+    with np.errstate(invalid="ignore"):
+        gaps[1:-1] = (sorted_F[2:] - sorted_F[:-2]) / np.where(span > 0, span, 1)
+    gaps[[0, -1]] = np.inf
+    gaps[np.isnan(gaps)] = 0  # Objectives that are inf (undefined stress) carry no spacing
+
+    distance = np.zeros(n)
+    for k in range(m):
+        distance[order[:, k]] += gaps[:, k]
+    return distance
+
+def select(F, violation, n):
+    '''Indices of the `n` rows that survive: best fronts first, the last front cut by
+    crowding distance.'''
+    rank  = non_dominated_sort(F, violation)
+    crowd = np.zeros(len(F))
+    for r in np.unique(rank):
+        members        = rank == r
+        crowd[members] = crowding_distance(F[members])
+    return np.lexsort((-crowd, rank))[:n]
+
+class ParetoArchive:
+    '''Feasible non-dominated designs seen so far, at most `max_size` of them. When it is full,
+    the most crowded points are dropped first. Extremes of every objective are always kept.'''
+    def __init__(self, max_size=200):
+        self.max_size = max_size
+        self.x        = None
+        self.F        = None
+
+    def __len__(self):
+        return 0 if self.x is None else len(self.x)
+
+    def update(self, x, F):
+        if self.x is not None:
+            x = np.concatenate([self.x, x])
+            F = np.concatenate([self.F, F])
+
+        _, unique = np.unique(F, axis=0, return_index=True)
+        x, F      = x[unique], F[unique]
+        keep      = ~dominates(F, F).any(axis=0)
+        x, F      = x[keep], F[keep]
+
+        # Drop the most crowded point one at a time, so the spacing stays even
+        while len(x) > self.max_size:
+            drop = np.argmin(crowding_distance(F))
+            x, F = np.delete(x, drop, axis=0), np.delete(F, drop, axis=0)
+
+        self.x, self.F = x, F
+
+class ParetoResult:
+    '''Front found by `pareto_search()`. `x` holds the design parameters (one row per design)
+    and `objectives` maps each objective name to its values, in increasing order of the first
+    objective.'''
+    def __init__(self, x, objectives, nfev, nit):
+        self.x          = x
+        self.objectives = objectives
+        self.nfev       = nfev
+        self.nit        = nit
+
+    def __len__(self):
+        return len(self.x)
+
+    def __repr__(self):
+        return f"ParetoResult | {len(self)} designs | objectives: {', '.join(self.objectives)} | nfev: {self.nfev}"
+
+class ParetoProblem:
+    '''Objectives of a StackDesign for a Pareto search: every profile of `weights` (a
+    WeightSet, evaluated on its own energies) and the safety factor, all to be maximized.'''
+    def __init__(self, design, weights=None):
+        self.design  = design
+        self.weights = default_objectives() if weights is None else weights
+        self.names   = self.weights.names[:1] + ["safety factor"] + self.weights.names[1:]
+
+        # Transmission on the weights' energies, which need not be the design's
+        same = self.weights.energy.shape == design.energies.shape and np.all(self.weights.energy == design.energies)
+        self._spectra = design if same else design.on_energies(self.weights.energy)
+
+    def evaluate(self, params):
+        '''Objectives to minimize (the negated values), (n_candidates, n_objectives), and
+        the constraint violation, `max(0, 1 - safety factor)` (inf where undefined).'''
+        scores = self.weights.evaluate(self._spectra.transmission(params))
+        safety = self.design.safety_factor(params)
+
+        F         = -np.column_stack([scores[:, :1], safety, scores[:, 1:]])
+        violation = np.where(np.isnan(safety), np.inf, np.maximum(0, 1 - safety))
+        F[~np.isfinite(F)] = np.inf
+        return F, violation
+
+def pareto_search(design, weights=None, pop_size=100, generations=100, archive_size=200, mutation=0.5, recombination=0.9, seed=None):
+    '''Search for the Pareto front of a StackDesign (see the module docstring).
+
+    Offspring come from DE/rand/1/bin variation in the unit box of the design's bounds, with
+    `mutation` and `recombination` as in scipy's differential evolution. `weights` is a WeightSet
+    with one maximized objective per profile (see `default_objectives`), on any energies
+    within the design's x-ray tables.'''
+    problem = ParetoProblem(design, weights)
+    rng     = np.random.default_rng(seed)
+    lb, ub  = (np.asarray(b, dtype=float) for b in design.bounds)
+    archive = ParetoArchive(archive_size)
+
+    def evaluate(u):
+        F, violation = problem.evaluate(lb + u * (ub - lb))
+        feasible     = violation <= 0
+        archive.update(u[feasible], F[feasible])
+        return F, violation
+
+    u            = rng.uniform(size=(pop_size, len(lb)))
+    F, violation = evaluate(u)
+    nfev         = pop_size
+
+    for _ in range(generations):
+        # DE/rand/1/bin: three distinct donors per child, at least one gene from the mutant
+        donors = np.argsort(rng.uniform(size=(pop_size, pop_size)), axis=1)[:, :3]
+        mutant = u[donors[:, 0]] + mutation * (u[donors[:, 1]] - u[donors[:, 2]])
+        cross  = rng.uniform(size=u.shape) < recombination
+        cross[np.arange(pop_size), rng.integers(len(lb), size=pop_size)] = True
+        child  = np.clip(np.where(cross, mutant, u), 0, 1)
+
+        F_child, violation_child = evaluate(child)
+        nfev += pop_size
+
+        u         = np.concatenate([u, child])
+        F         = np.concatenate([F, F_child])
+        violation = np.concatenate([violation, violation_child])
+        keep      = select(F, violation, pop_size)
+        u, F, violation = u[keep], F[keep], violation[keep]
+
+    if len(archive):
+        order = np.argsort(-archive.F[:, 0])
+        x, F  = lb + archive.x[order] * (ub - lb), archive.F[order]
+    else:
+        x, F  = np.zeros((0, len(lb))), np.zeros((0, len(problem.names)))
+
+    return ParetoResult(x, {name: -F[:, k] for k, name in enumerate(problem.names)}, nfev, generations)
@@ -1,18 +1,37 @@
+import multiprocessing
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
-import pandas as pd
+from matplotlib.collections import LineCollection
 
-ELEMENTS            = pd.DataFrame(columns=["Element", "Energy"])
-ELEMENTS["Element"] = pd.Series(["Li", "Be", "B", "C", "N", "O", "Si"])
-ELEMENTS["Energy"]  = pd.Series([54.33, 108.5, 183.3, 277, 392.4, 524.9, 1739.9])
-# ELEMENTS["Element"] = pd.Series(["Li", "Be", "B", "C", "N", "O", "F", "Na", "Mg", "Al", "Si"])
-# ELEMENTS["Energy"]  = pd.Series([54.33, 108.5, 183.3, 277, 392.4, 524.9, 676.8, 1040.98, 1253.6, 1486.7, 1739.9])
-ELEMENTS            = ELEMENTS.set_index("Element")
+from xraywindow.weighting import ELEMENT_LINES
+
+_ELEMENTS = None
+
+def _elements():
+    '''DataFrame of element line energies, built on first use so importing this module does
+    not need pandas.'''
+    global _ELEMENTS
+    if _ELEMENTS is None:
+        import pandas as pd
+
+        elements            = pd.DataFrame(columns=["Element", "Energy"])
+        elements["Element"] = pd.Series(list(ELEMENT_LINES.keys()))
+        elements["Energy"]  = pd.Series(list(ELEMENT_LINES.values()))
+        # elements["Element"] = pd.Series(["Li", "Be", "B", "C", "N", "O", "F", "Na", "Mg", "Al", "Si"])
+        # elements["Energy"]  = pd.Series([54.33, 108.5, 183.3, 277, 392.4, 524.9, 676.8, 1040.98, 1253.6, 1486.7, 1739.9])
+        _ELEMENTS           = elements.set_index("Element")
+    return _ELEMENTS
+
+def __getattr__(name):
+    if name == "ELEMENTS":
+        return _elements()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Add vertical lines for common elements
 def add_elem_lines(
     ax         = None, 
-    elements   = ELEMENTS, 
+    elements   = None, 
     colors     = [0,0,0,0.4], 
     ymin       = -1, 
     ymax       = 1, 
@@ -22,13 +41,15 @@ def add_elem_lines(
 ):
     if ax is None:
         ax = plt.gca()
+    if elements is None:
+        elements = _elements()
         
-    query_str = f"Energy > {min_energy} and Energy < {max_energy}"
+    shown = elements[(elements["Energy"] > min_energy) & (elements["Energy"] < max_energy)]
     
-    ax.vlines("Energy", ymin, ymax, colors=colors, data=elements.query(query_str), label=None)
+    ax.vlines("Energy", ymin, ymax, colors=colors, data=shown, label=None)
     
-    for e in elements.query(query_str).iterrows():
-        ax.text(e[1]["Energy"], ymax*1.03, e[0], rotation="vertical", horizontalalignment="center", fontsize=fontsize)
+    for name, energy in zip(shown.index, shown["Energy"]):
+        ax.text(energy, ymax*1.03, name, rotation="vertical", horizontalalignment="center", fontsize=fontsize)
         
     return ax
         
@@ -49,7 +70,9 @@ def plot_transmission(
     max_energy = 1200,
     use_grid   = True,
     ax         = None,
-    line_kws   = {}
+    line_kws   = {},
+    legend     = True,
+    tight      = True,
 ):
     """
     Plot one or more transmission spectra
@@ -65,9 +88,13 @@ def plot_transmission(
     labels : list of str
         List of strings containing labels for data. Must be in the same order as data.
         
+    legend, tight : bool
+        Draw the legend and call tight_layout(). Turn these off when drawing many plots and
+        do both once at the end.
     
+    For hundreds of spectra, `plot_spectra` is much faster.
     """
-    if type(data) == pd.DataFrame:
+    if not isinstance(data, (list, tuple)):
         data = [data]
         
     if ax is None:
@@ -97,7 +124,8 @@ def plot_transmission(
     if not use_ylog:
         ymin = ymin - ymax*0.05
     
-    ax.legend()
+    if legend:
+        ax.legend()
     
     # Add vertical lines for common elements
     if add_lines:
@@ -127,5 +155,109 @@ def plot_transmission(
     if use_grid:
         ax.grid(axis='y')
     
-    plt.tight_layout()
-    return ax
\ No newline at end of file
+    if tight:
+        plt.tight_layout()
+    return ax
+
+def downsample_minmax(x, y, n_bins):
+    '''Reduce traces sampled on `x` (ascending) to the minimum and maximum of `y` (one row per
+    trace) in each of `n_bins` equal bins of x. Every peak and dip stays visible at a display
+    width of about `n_bins` pixels. Returns x (2 points per non-empty bin) and y (n_traces,
+    len(x)). Traces with fewer than 2 * `n_bins` points are returned as they are.'''
+    x = np.asarray(x, dtype=float)
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    if len(x) <= 2 * n_bins:
+        return x, y
+
+    edges  = np.linspace(x[0], x[-1], n_bins + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1]))
+    starts = starts[starts < len(x)]
+
+    lo      = np.minimum.reduceat(y, starts, axis=1)
+    hi      = np.maximum.reduceat(y, starts, axis=1)
+    centers = np.add.reduceat(x, starts) / np.diff(np.append(starts, len(x)))
+
+    # Draw each bin as a vertical stroke from its minimum to its maximum
+    x_out = np.repeat(centers, 2)
+    y_out = np.stack([lo, hi], axis=2).reshape(len(y), -1)
+    return x_out, y_out
+
+def plot_spectra(energy, transmission, ax=None, colors=None, label=None, max_bins="auto", autoscale=True, **line_kws):
+    '''Draw many spectra as one LineCollection.
+
+    `transmission` is a 2-D block (one spectrum per row) on the shared `energy` grid, or a
+    list of 1-D arrays with `energy` a matching list. Each trace is reduced with
+    `downsample_minmax` to `max_bins` bins: by default one per pixel of the axes' width, or
+    None to draw every point. `colors` is one color or one per trace; other keywords go to
+    the LineCollection. Returns the collection.'''
+    if ax is None:
+        ax = plt.gca()
+    if max_bins == "auto":
+        max_bins = max(int(ax.bbox.width), 1)
+
+    if isinstance(energy, (list, tuple)) and len(energy) and np.ndim(energy[0]) == 1:
+        energy = [np.asarray(e, dtype=float) for e in energy]
+        blocks = [np.atleast_2d(t) for t in transmission]
+    else:
+        energy = [np.asarray(energy, dtype=float)]
+        blocks = [np.atleast_2d(transmission)]
+
+    segments = []
+    for x, y in zip(energy, blocks):
+        if max_bins is not None:
+            x, y = downsample_minmax(x, y, max_bins)
+        segments.extend(np.stack(np.broadcast_arrays(x, row), axis=1) for row in y)
+
+    collection = LineCollection(segments, colors=colors, label=label, **line_kws)
+    ax.add_collection(collection)
+    if autoscale:
+        ax.autoscale_view()
+    return collection
+
+def _render(task):
+    '''Render one figure off-screen and save it; see `render_many`.'''
+    from matplotlib.figure import Figure
+
+    task     = dict(task)
+    filename = task.pop("filename")
+    figsize  = task.pop("figsize", (6, 4))
+    dpi      = task.pop("dpi", 100)
+    title    = task.pop("title", None)
+    xlim     = task.pop("xlim", None)
+    ylim     = task.pop("ylim", None)
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    ax  = fig.add_subplot()
+    plot_spectra(task.pop("energy"), task.pop("transmission"), ax=ax, **task)
+
+    ax.set_xlabel("Energy (eV)")
+    ax.set_ylabel("Transmission")
+    if xlim is not None:
+        ax.set_xlim(*xlim)
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+    if title is not None:
+        ax.set_title(title)
+
+    fig.tight_layout()
+    fig.savefig(filename)
+    return filename
+
+def render_many(tasks, workers=1):
+    '''Render figures to files without a display, one figure per task, spread over
+    `workers` processes (0 for one per CPU).
+
+    Each task is a dict with "filename", "energy" and "transmission" (as for
+    `plot_spectra`), optionally "title", "xlim", "ylim", "figsize", "dpi" and any other
+    `plot_spectra` keywords. Returns the filenames written.
+
+    Workers are spawned rather than forked, so they never inherit the parent's pyplot
+    state or GUI backend; scripts that call this with several workers need an
+    `if __name__ == "__main__":` guard.'''
+    tasks   = list(tasks)
+    workers = workers if workers > 0 else multiprocessing.cpu_count()
+    if workers == 1 or len(tasks) <= 1:
+        return [_render(task) for task in tasks]
+
+    with multiprocessing.get_context("spawn").Pool(min(workers, len(tasks))) as pool:
+        return pool.map(_render, tasks)
@@ -0,0 +1,290 @@
+import copy
+import numpy as np
+
+from xraywindow.engine     import AttenuationEngine
+from xraywindow.mechanical import (
+    MechanicalWindow, BeamLayer, RectangularMembraneLayer, BeamLayerArray, RectangularMembraneLayerArray, TEST_PRESSURE,
+)
+from xraywindow.instrument import instrumented
+
+# Element lines (eV) used as the default transmission figure of merit
+OPT_ENERGIES = [54.3, 108.5, 183.3, 277, 392.4, 524.9, 676.8, 1041, 1740]
+
+class BeamSpec:
+    '''One level of rib support in a StackDesign. Spacing is always a design parameter and
+    width is one too when left as None. The first level needs a length; every later level
+    spans the spacing of the level below it. Bounds, (lower, upper) in meters, are only
+    needed for searches.'''
+    def __init__(self, name, material, height, width=None, length=None, spacing_bounds=None, width_bounds=None):
+        self.name           = name
+        self.material       = material
+        self.height         = height
+        self.width          = width
+        self.length         = length
+        self.spacing_bounds = spacing_bounds
+        self.width_bounds   = width_bounds
+
+class MembraneSpec:
+    '''Membrane closing the top rib level. Its width is the spacing of the last rib level and
+    its thickness is the minimum that survives the pressure, times `margin`.'''
+    def __init__(self, name, material, margin=1.01):
+        self.name     = name
+        self.material = material
+        self.margin   = margin
+
+class CoatingSpec:
+    '''Unsupported film of fixed thickness, e.g. a light block or gas barrier.'''
+    def __init__(self, name, material, thickness):
+        self.name      = name
+        self.material  = material
+        self.thickness = thickness
+
+class StackDesign:
+    '''Array form of a window built from rib levels, a membrane and fixed coatings.
+
+    A design is evaluated for a whole population of parameter vectors at once, without
+    building any per-candidate objects. Parameters are, for each rib level in order, the
+    spacing followed by the width (if the level's width is free).
+
+    The figure of merit is `weights @ T(energies)`; by default the plain sum of the
+    transmission at `energies`. See xraywindow.weighting for source/detector weighting.
+
+    Designs pickle without their x-ray tables, which are fetched again from the registry on
+    first use, so they are cheap to send to worker processes.'''
+    def __init__(self, beams, membrane, coatings=(), energies=OPT_ENERGIES, pressure=TEST_PRESSURE, name="", weights=None):
+        if beams[0].length is None:
+            raise ValueError("The first rib level needs a length.")
+
+        self.name     = name
+        self.beams    = list(beams)
+        self.membrane = membrane
+        self.coatings = list(coatings)
+        self.pressure = pressure
+        self.energies = np.asarray(energies, dtype=float)
+        self.weights  = np.ones(len(self.energies)) if weights is None else np.asarray(weights, dtype=float)
+
+        self._engine = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_engine"] = None
+        return state
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            materials    = [b.material for b in self.beams] + [self.membrane.material] + [c.material for c in self.coatings]
+            self._engine = AttenuationEngine([m.get_xray_data() for m in materials], self.energies)
+        return self._engine
+
+    def on_energies(self, energies, weights=None):
+        '''Copy of the design evaluated on other `energies` (with `weights`, the plain sum by
+        default). The copy shares the layer specs but builds its own engine.'''
+        design          = copy.copy(self)
+        design.energies = np.asarray(energies, dtype=float)
+        design.weights  = np.ones(len(design.energies)) if weights is None else np.asarray(weights, dtype=float)
+        design._engine  = None
+        return design
+
+    @property
+    def bounds(self):
+        '''(lower, upper) lists for every parameter, taken from the BeamSpecs.'''
+        bounds = []
+        for beam in self.beams:
+            bounds.append(beam.spacing_bounds)
+            if beam.width is None:
+                bounds.append(beam.width_bounds)
+
+        if any(b is None for b in bounds):
+            raise ValueError("Every free parameter needs bounds for a search.")
+        return [b[0] for b in bounds], [b[1] for b in bounds]
+
+    @property
+    def param_names(self):
+        names = []
+        for beam in self.beams:
+            names.append(f"{beam.name} spacing")
+            if beam.width is None:
+                names.append(f"{beam.name} width")
+        return names
+
+    @property
+    def n_params(self):
+        return len(self.param_names)
+
+    def _param_columns(self):
+        '''Parameter column of each level's spacing and width (None for a fixed width).'''
+        columns, col = [], 0
+        for beam in self.beams:
+            if beam.width is None:
+                columns.append((col, col + 1))
+                col += 2
+            else:
+                columns.append((col, None))
+                col += 1
+        return columns
+
+    def _unpack(self, params):
+        '''Split a (n_candidates, n_params) array into per-level spacing and width columns.'''
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        if params.shape[1] != self.n_params:
+            raise ValueError(f"Expected {self.n_params} parameters per candidate, got {params.shape[1]}.")
+
+        spacings, widths = [], []
+        col = 0
+        for beam in self.beams:
+            spacings.append(params[:, col])
+            col += 1
+            if beam.width is None:
+                widths.append(params[:, col])
+                col += 1
+            else:
+                widths.append(np.full(len(params), beam.width, dtype=float))
+        return spacings, widths
+
+    def _arrays(self, params):
+        '''Array layers for every rib level and the membrane (at its derived thickness).'''
+        spacings, widths = self._unpack(params)
+
+        ribs   = []
+        length = self.beams[0].length
+        for beam, s, w in zip(self.beams, spacings, widths):
+            ribs.append(BeamLayerArray(beam.name, beam.material, s, w, length, beam.height, self.pressure))
+            length = s
+
+        # Membrane spans the last rib spacing at its minimum thickness
+        membrane           = RectangularMembraneLayerArray(self.membrane.name, self.membrane.material, width=spacings[-1], pressure=self.pressure)
+        membrane.thickness = membrane.calc_min_thickness() * self.membrane.margin
+        membrane.calc_stress()
+        return ribs, membrane
+
+    def stack(self, params):
+        '''Return thickness, open area (both (n_candidates, n_layers)) and the feasibility mask.'''
+        ribs, membrane = self._arrays(params)
+        n              = len(membrane)
+        feasible       = ~membrane.failure()
+
+        thickness, open_area = [], []
+        for layer in ribs:
+            feasible &= ~layer.failure()
+            thickness.append(layer.xray_thickness())
+            open_area.append(layer.open_area())
+
+        thickness.append(membrane.xray_thickness())
+        open_area.append(membrane.open_area())
+
+        for coating in self.coatings:
+            thickness.append(np.full(n, coating.thickness, dtype=float))
+            open_area.append(np.zeros(n))
+
+        return np.stack(thickness, axis=1), np.stack(open_area, axis=1), feasible
+
+    def safety_factor(self, params):
+        '''Smallest `fail_stress / max_stress` over the rib levels and the membrane for every
+        candidate; a design is feasible when this is at least 1.'''
+        ribs, membrane = self._arrays(params)
+        return np.min([layer.fail_stress / layer.max_stress for layer in ribs + [membrane]], axis=0)
+
+    def transmission(self, params):
+        '''Transmission block of shape (n_candidates, n_energies).'''
+        thickness, open_area, _ = self.stack(params)
+        return self.engine.transmission(thickness, open_area)
+
+    @instrumented
+    def evaluate(self, params):
+        '''Return the figure of merit and the feasibility mask for every candidate in `params`.'''
+        thickness, open_area, feasible = self.stack(params)
+        fom = self.engine.transmission(thickness, open_area) @ self.weights
+        return fom, feasible
+
+    def evaluate_profiles(self, params, weight_set):
+        '''Score every candidate against every profile of a WeightSet compiled on this
+        design's `energies`, giving (n_candidates, n_profiles).'''
+        return weight_set.evaluate(self.transmission(params))
+
+    def fom_and_gradient(self, p):
+        '''Figure of merit and its exact gradient with respect to the parameters, for a single
+        parameter vector `p`.'''
+        spacings, widths = self._unpack(p)
+        thickness, open_area, _ = self.stack(p)
+
+        trans, d_thickness, d_open_area = self.engine.transmission_and_jacobian(thickness[0], open_area[0])
+        d_thickness = d_thickness @ self.weights
+        d_open_area = d_open_area @ self.weights
+
+        grad   = np.zeros(self.n_params)
+        length = self.beams[0].length
+        for k, (beam, s, w, (s_col, w_col)) in enumerate(zip(self.beams, spacings, widths, self._param_columns())):
+            d_oa = BeamLayerArray(beam.name, beam.material, s, w, length, beam.height, self.pressure).open_area_gradient()
+            grad[s_col] += d_open_area[k] * d_oa["spacing"][0]
+            if w_col is not None:
+                grad[w_col] += d_open_area[k] * d_oa["width"][0]
+            length = s
+
+        # The membrane's width, and so its minimum thickness, follows the last rib spacing
+        membrane  = RectangularMembraneLayerArray(self.membrane.name, self.membrane.material, width=spacings[-1], pressure=self.pressure)
+        _, dt_dw  = membrane.min_thickness_and_gradient()
+        grad[self._param_columns()[-1][0]] += d_thickness[len(self.beams)] * dt_dw[0] * self.membrane.margin
+
+        return trans @ self.weights, grad
+
+    def constraints_and_jacobian(self, p):
+        '''Stress margins `1 - max_stress/fail_stress` (one per rib level, then the membrane;
+        feasible when all are >= 0) and their Jacobian, for a single parameter vector `p`.'''
+        spacings, widths = self._unpack(p)
+        columns          = self._param_columns()
+        n_con            = len(self.beams) + 1
+
+        margin = np.zeros(n_con)
+        jac    = np.zeros((n_con, self.n_params))
+
+        length = self.beams[0].length
+        for k, (beam, s, w, (s_col, w_col)) in enumerate(zip(self.beams, spacings, widths, columns)):
+            ribs        = BeamLayerArray(beam.name, beam.material, s, w, length, beam.height, self.pressure)
+            sigma, grad = ribs.stress_and_gradient()
+            fail        = beam.material.stress
+
+            margin[k]     = 1 - sigma[0] / fail
+            jac[k, s_col] = -grad["spacing"][0] / fail
+            if w_col is not None:
+                jac[k, w_col] = -grad["width"][0] / fail
+            if k > 0:
+                jac[k, columns[k - 1][0]] = -grad["length"][0] / fail
+            length = s
+
+        membrane           = RectangularMembraneLayerArray(self.membrane.name, self.membrane.material, width=spacings[-1], pressure=self.pressure)
+        t, dt_dw           = membrane.min_thickness_and_gradient()
+        membrane.thickness = t * self.membrane.margin
+        sigma, grad        = membrane.stress_and_gradient()
+        fail               = self.membrane.material.stress
+
+        margin[-1]              = 1 - sigma[0] / fail
+        jac[-1, columns[-1][0]] = -(grad["width"][0] + grad["thickness"][0] * dt_dw[0] * self.membrane.margin) / fail
+
+        return margin, jac
+
+    def __call__(self, x):
+        '''Objective for `scipy.optimize.differential_evolution(..., vectorized=True)`, which
+        passes candidates as columns. Infeasible candidates score 0.'''
+        x = np.asarray(x, dtype=float)
+        fom, feasible = self.evaluate(x.T if x.ndim == 2 else x[None, :])
+        score = np.where(feasible, -fom, 0.0)
+        return score if x.ndim == 2 else score[0]
+
+    def to_mechanical_window(self, p):
+        '''Build the MechanicalWindow for a single parameter vector.'''
+        spacings, widths = self._unpack(p)
+        thickness, _, _  = self.stack(p)
+
+        mech_win = MechanicalWindow()
+        length   = self.beams[0].length
+        for beam, s, w in zip(self.beams, spacings, widths):
+            mech_win.add_layer(BeamLayer(beam.name, beam.material, s[0], w[0], length, beam.height, self.pressure))
+            length = s[0]
+
+        mech_win.add_layer(RectangularMembraneLayer(
+            self.membrane.name, self.membrane.material, spacings[-1][0], thickness[0, len(self.beams)], self.pressure,
+        ))
+        for coating in self.coatings:
+            mech_win.add_layer(RectangularMembraneLayer(coating.name, coating.material, thickness=coating.thickness, pressure=self.pressure))
+        return mech_win
@@ -0,0 +1,136 @@
+import os
+import threading
+from collections import OrderedDict
+
+from xraywindow.xray_data import XRayData, xray_data_filename
+from xraywindow.bundle    import load_bundle, default_bundle_dir
+from xraywindow.compress  import CompressedXRayData
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+class _PendingLoad:
+    '''A load in progress; other threads asking for the same key wait on it.'''
+    def __init__(self):
+        self.done   = threading.Event()
+        self.result = None
+        self.error  = None
+
+class XRayDataRegistry:
+    '''Process-wide, thread-safe cache of XRayData objects.
+
+    Entries are keyed by the resolved data file path, its modification time and the material
+    name, so an edited .csv is picked up automatically. Each key is loaded at most once, even
+    when many threads ask for it at the same time, and the least recently used entries are
+    evicted once the cached tables exceed `max_bytes`. Tables come from a compiled bundle
+    (see xraywindow.bundle) when one is available. With `compress_tol`, every table is held
+    as a CompressedXRayData within that tolerance (see xraywindow.compress).'''
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, compress_tol=None):
+        self.max_bytes    = max_bytes
+        self.compress_tol = compress_tol
+
+        self._lock    = threading.Lock()
+        self._entries = OrderedDict()
+        self._pending = {}
+
+        self.hits      = 0
+        self.misses    = 0
+        self.waits     = 0  # Requests that waited for another thread's load of the same key
+        self.evictions = 0
+
+    def key(self, material_name, xray_data_dir=None):
+        filename = os.path.realpath(xray_data_filename(material_name, xray_data_dir))
+        return (filename, os.stat(filename).st_mtime_ns, material_name)
+
+    def get(self, material_name, xray_data_dir=None):
+        '''Return the shared XRayData for `material_name`, loading it if necessary.'''
+        key = self.key(material_name, xray_data_dir)
+
+        with self._lock:
+            xray_data = self._entries.get(key)
+            if xray_data is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return xray_data
+
+            pending = self._pending.get(key)
+            owner   = pending is None
+            if owner:
+                self.misses += 1
+                pending = self._pending[key] = _PendingLoad()
+            else:
+                self.waits += 1
+
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            pending.result = self._load(material_name, xray_data_dir, key[0])
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+                if pending.error is None:
+                    self._insert(key, pending.result)
+            pending.done.set()
+
+        return pending.result
+
+    def _load(self, material_name, xray_data_dir, filename):
+        '''Load from a compiled bundle when it is up to date, otherwise from the .csv file.'''
+        bundle = load_bundle(default_bundle_dir(xray_data_dir))
+        if bundle is not None and bundle.is_current(material_name, filename):
+            xray_data = bundle.xray_data(material_name)
+        else:
+            xray_data = XRayData(material_name, xray_data_dir)
+
+        if self.compress_tol is not None:
+            xray_data = CompressedXRayData.compress(xray_data, self.compress_tol)
+        return xray_data
+
+    def _insert(self, key, xray_data):
+        '''Add an entry and evict stale versions and least recently used entries. Caller holds the lock.'''
+        filename, _, material_name = key
+        for old in [k for k in self._entries if k[0] == filename and k[2] == material_name]:
+            del self._entries[old]
+
+        self._entries[key] = xray_data
+
+        # Sizes change as tables cache attenuation grids, so total them once per insert
+        total = self.nbytes
+        while len(self._entries) > 1 and total > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            total     -= evicted.nbytes
+            self.evictions += 1
+
+    @property
+    def nbytes(self):
+        return sum(xray_data.nbytes for xray_data in self._entries.values())
+
+    def stats(self):
+        '''Return hit/miss/wait/eviction counts and the current size of the registry.'''
+        with self._lock:
+            return {
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "waits":     self.waits,
+                "evictions": self.evictions,
+                "entries":   len(self._entries),
+                "nbytes":    self.nbytes,
+            }
+
+    def clear(self):
+        '''Drop every cached entry and reset the statistics.'''
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.waits = self.evictions = 0
+
+REGISTRY = XRayDataRegistry()
+
+def get_xray_data(material_name, xray_data_dir=None):
+    '''Fetch XRayData for `material_name` from the process-wide registry.'''
+    return REGISTRY.get(material_name, xray_data_dir)
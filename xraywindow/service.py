@@ -0,0 +1,327 @@
+'''Long-running transmission service that keeps material tables and engines resident.
+
+Start it once (it listens on localhost only):
+
+    python -m xraywindow.service 8765
+
+and send it one JSON object per line:
+
+    {"id": 1, "stack": [{"material": "silicon", "thickness": 1e-7},
+                        {"material": "aluminum", "thickness": 3e-8, "open_area": 0.2}],
+     "output": "fom", "energies": [277, 524.9], "weights": [1, 1]}
+
+The service answers each line with one JSON object carrying the same "id". Its body is
+{"transmission": [...]} for "output": "spectrum" (the default) or {"fom": ...}, the
+`weights`-weighted sum of the transmission (summed transmission by default). Values that
+are not finite are sent as null. Failed requests get {"error": "..."}. "energies" defaults
+to the service's grid, 10 to 9999 eV. Materials must be ones the service was given or tables
+in its x-ray data directory; other names are rejected, never turned into file paths.
+
+Requests that arrive within `batch_delay` of each other are evaluated together, in a worker
+thread so that the event loop keeps serving other connections. The stacks with the same
+materials and energies go through an AttenuationEngine as a single batch. Engines are kept
+between requests, so repeated stacks pay no set-up cost.
+
+    client = ServiceClient(port=8765)           # or InProcessClient() in tests and notebooks
+    client.transmission(window)                 # an XRayWindow, or a list of layer dicts
+    client.fom(window, energies=OPT_ENERGIES)'''
+import os
+import abc
+import glob
+import json
+import socket
+import asyncio
+from collections        import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from xraywindow.engine    import AttenuationEngine, DEFAULT_ENERGY
+from xraywindow.registry  import get_xray_data
+from xraywindow.xray_data import grid_key, xray_data_filename
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+class TransmissionService:
+    '''Evaluates stack requests (see the module docstring) in vectorized batches. `materials`
+    maps names to Material objects (e.g. from import_materials()), which lets requests use
+    compound recipes; other names must have a table in `xray_data_dir` and are looked up in
+    the x-ray data registry.'''
+    def __init__(self, energies=DEFAULT_ENERGY, materials=None, batch_delay=0.002, max_batch=4096, max_engines=64, xray_data_dir=None):
+        self.energies      = np.asarray(energies, dtype=float)
+        self.materials     = dict(materials or {})
+        self.batch_delay   = batch_delay
+        self.max_batch     = max_batch
+        self.max_engines   = max_engines
+        self.xray_data_dir = xray_data_dir
+
+        # Names of the tables on disk, so request strings never reach a file path unchecked
+        pattern      = xray_data_filename("*", xray_data_dir)
+        self._tables = {os.path.splitext(os.path.basename(f))[0] for f in glob.glob(pattern)}
+
+        self._engines  = OrderedDict()
+        self._queue    = []
+        self._timer    = None
+        self._batches  = set()  # Batches being evaluated, referenced until done
+        self._executor = ThreadPoolExecutor(max_workers=1)  # One batch at a time keeps the engine cache consistent
+
+        self.requests = 0
+        self.batches  = 0
+
+    def knows(self, name):
+        '''Whether requests may use material `name`.'''
+        return name in self.materials or name in self._tables
+
+    def xray_data(self, name):
+        material = self.materials.get(name)
+        if material is not None:
+            return material.get_xray_data()
+        if name not in self._tables:
+            raise KeyError(f"Unknown material '{name}'.")
+        return get_xray_data(name, self.xray_data_dir)
+
+    def engine(self, materials, energies):
+        '''AttenuationEngine for a tuple of material names on `energies`, kept for reuse.'''
+        key    = (materials, grid_key(energies))
+        engine = self._engines.get(key)
+        if engine is None:
+            engine = self._engines[key] = AttenuationEngine([self.xray_data(m) for m in materials], energies)
+            while len(self._engines) > self.max_engines:
+                self._engines.popitem(last=False)
+        else:
+            self._engines.move_to_end(key)
+        return engine
+
+    def _parse(self, request):
+        stack = request.get("stack")
+        if not stack:
+            raise ValueError("A request needs a non-empty 'stack'.")
+
+        output = request.get("output", "spectrum")
+        if output not in ("spectrum", "fom"):
+            raise ValueError(f"Unknown output '{output}'.")
+
+        energies = self.energies if request.get("energies") is None else np.asarray(request["energies"], dtype=float)
+        if energies.ndim != 1 or len(energies) == 0:
+            raise ValueError("'energies' must be a non-empty list of numbers.")
+
+        weights = request.get("weights")
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)
+            if weights.shape != energies.shape:
+                raise ValueError("'weights' must have one entry per energy.")
+
+        materials = tuple(str(layer["material"]) for layer in stack)
+        unknown   = [m for m in materials if not self.knows(m)]
+        if unknown:
+            raise ValueError(f"Unknown material '{unknown[0]}'.")
+        thickness = [float(layer["thickness"]) for layer in stack]
+        open_area = [float(layer.get("open_area", 0)) for layer in stack]
+        return (materials, grid_key(energies)), energies, thickness, open_area, output, weights
+
+    def evaluate_many(self, requests):
+        '''Responses to a list of requests, evaluated one engine call per group of requests
+        that share materials and energies.'''
+        responses = [None] * len(requests)
+        groups    = {}
+        for i, request in enumerate(requests):
+            try:
+                key, *parsed = self._parse(request)
+            except (KeyError, TypeError, ValueError) as e:
+                responses[i] = {"error": f"{type(e).__name__}: {e}"}
+            else:
+                groups.setdefault(key, []).append((i, *parsed))
+
+        for (materials, _), members in groups.items():
+            energies = members[0][1]
+            try:
+                trans = self.engine(materials, energies).transmission(
+                    np.array([m[2] for m in members]), np.array([m[3] for m in members]),
+                )
+            except (KeyError, OSError, ValueError) as e:
+                for i, *_ in members:
+                    responses[i] = {"error": f"{type(e).__name__}: {e}"}
+                continue
+
+            for row, (i, _, _, _, output, weights) in zip(trans, members):
+                try:
+                    if output == "fom":
+                        responses[i] = {"fom": _json_value(row.sum() if weights is None else row @ weights)}
+                    else:
+                        responses[i] = {"transmission": _json_list(row)}
+                except (TypeError, ValueError) as e:
+                    responses[i] = {"error": f"{type(e).__name__}: {e}"}
+
+        for request, response in zip(requests, responses):
+            if isinstance(request, dict) and "id" in request:
+                response["id"] = request["id"]
+
+        self.requests += len(requests)
+        self.batches  += 1
+        return responses
+
+    async def submit(self, request):
+        '''Queue `request` for the next batch and wait for its response.'''
+        loop   = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((request, future))
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._queue = self._queue, []
+        if batch:
+            task = asyncio.ensure_future(self._evaluate_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _evaluate_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            responses = await loop.run_in_executor(self._executor, self.evaluate_many, [request for request, _ in batch])
+        except Exception as e:
+            responses = [{"error": f"{type(e).__name__}: {e}"}] * len(batch)
+
+        for (_, future), response in zip(batch, responses):
+            if not future.done():
+                future.set_result(response)
+
+    async def _answer(self, line, writer):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object.")
+        except ValueError as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        else:
+            response = await self.submit(request)
+
+        writer.write((json.dumps(response, allow_nan=False) + "\n").encode())
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        # Answer lines concurrently, so requests pipelined on one connection share batches
+        pending = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.ensure_future(self._answer(line, writer))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            await asyncio.gather(*pending)
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        '''Start listening and return the asyncio server (port 0 picks a free port).'''
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    def run(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        '''Serve until interrupted.'''
+        try:
+            asyncio.run(self.serve_forever(host, port))
+        finally:
+            self.close()
+
+    def close(self):
+        '''Stop the evaluation thread.'''
+        self._executor.shutdown(wait=False)
+
+def _json_value(x):
+    # JSON has no NaN or infinity
+    x = float(x)
+    return x if np.isfinite(x) else None
+
+def _json_list(row):
+    values = row.tolist()
+    if not np.isfinite(row).all():
+        values = [v if np.isfinite(v) else None for v in values]
+    return values
+
+def stack_request(window, output="spectrum", energies=None, weights=None):
+    '''Request for an XRayWindow, or a list of {"material", "thickness", "open_area"} dicts.'''
+    if hasattr(window, "layers"):
+        stack = [
+            {"material": layer.xray_data.material_name, "thickness": float(layer.thickness), "open_area": float(layer.open_area)}
+            for layer in window.layers
+        ]
+    else:
+        stack = list(window)
+
+    request = {"stack": stack, "output": output}
+    if energies is not None:
+        request["energies"] = np.asarray(energies, dtype=float).tolist()
+    if weights is not None:
+        request["weights"] = np.asarray(weights, dtype=float).tolist()
+    return request
+
+class _Client(abc.ABC):
+    '''Requests shared by the in-process and socket clients.'''
+    @abc.abstractmethod
+    def request(self, request):
+        '''Response (a dict) to one request.'''
+
+    def _checked(self, request):
+        response = self.request(request)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response
+
+    def transmission(self, window, energies=None):
+        '''Transmission spectrum of `window` on `energies` (the service's grid by default).
+        Values the service could not compute are NaN.'''
+        return np.array(self._checked(stack_request(window, "spectrum", energies))["transmission"], dtype=float)
+
+    def fom(self, window, energies=None, weights=None):
+        '''`weights`-weighted sum of the transmission of `window` at `energies`.'''
+        fom = self._checked(stack_request(window, "fom", energies, weights))["fom"]
+        return np.nan if fom is None else fom
+
+class InProcessClient(_Client):
+    '''Client that calls a TransmissionService in the same process, without a server.'''
+    def __init__(self, service=None):
+        self.service = TransmissionService() if service is None else service
+
+    def request(self, request):
+        return self.service.evaluate_many([request])[0]
+
+class ServiceClient(_Client):
+    '''Blocking client for a running service.'''
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=60):
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._file   = self._socket.makefile("rwb")
+
+    def request(self, request):
+        self._file.write((json.dumps(request) + "\n").encode())
+        self._file.flush()
+        return json.loads(self._file.readline())
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    import sys
+
+    from xraywindow.material import import_materials
+
+    TransmissionService(materials=import_materials()).run(port=int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT)
@@ -0,0 +1,295 @@
+'''Chunked, resumable parameter sweeps over MechanicalWindow templates.
+
+    sweep = Sweep(template, [
+        Axis(["Secondary.spacing", "Membrane.width"], np.linspace(20e-6, 200e-6, 100)),
+        Axis("Secondary.width", np.linspace(5e-6, 30e-6, 50)),
+        Axis("Membrane.material", [materials["polymer"], materials["SiNx"]]),
+        Axis("Light Block.thickness", [20e-9, 30e-9, 50e-9]),
+    ], derive_thickness={"Membrane": 1.01})
+
+    store = sweep.run("sweeps/secondary")   # picks up where it stopped if interrupted
+    best  = np.argmax(np.where(store.feasible, store.fom, -np.inf))
+    print(sweep.point(best))
+
+A sweep is the Cartesian product of its axes in C order (the last axis varies fastest). Points
+are evaluated one chunk at a time with the array layers and the AttenuationEngine, so memory
+use is set by the chunk size and not by the size of the grid. `Sweep.chunks()` yields the
+results of each chunk in turn, and `Sweep.run()` streams them into .npy files, recording its
+progress after every chunk.'''
+import os
+import json
+import math
+import numpy as np
+
+from xraywindow.engine     import AttenuationEngine
+from xraywindow.mechanical import RectangularMembraneLayer, layer_arrays, layer_attributes, checked_layers
+from xraywindow.population import OPT_ENERGIES
+
+class Axis:
+    '''One dimension of a sweep.
+
+    `targets` is a "Layer.attribute" string, or a list of them that all take the axis value
+    (e.g. a rib spacing and the width of the membrane it supports, or the spacing of one rib
+    level and the length of the next). An axis over `material` attributes is categorical and
+    its values are Material objects.'''
+    def __init__(self, targets, values, name=None):
+        if isinstance(targets, str):
+            targets = [targets]
+
+        self.targets = [tuple(t.rsplit(".", 1)) for t in targets]
+        if any(len(t) != 2 for t in self.targets):
+            raise ValueError(f"Targets must look like 'Layer.attribute', got {targets}.")
+
+        materials = [attr == "material" for _, attr in self.targets]
+        if any(materials) and not all(materials):
+            raise ValueError("A material axis cannot also drive numeric attributes.")
+
+        self.categorical = all(materials)
+        self.values      = list(values) if self.categorical else np.asarray(values, dtype=float)
+        self.name        = name if name is not None else targets[0]
+
+    def __len__(self):
+        return len(self.values)
+
+    def labels(self):
+        '''JSON-friendly axis values: material names or floats.'''
+        if self.categorical:
+            return [m.name for m in self.values]
+        return self.values.tolist()
+
+class Sweep:
+    '''Sweep of a MechanicalWindow template over a grid of layer parameters.
+
+    Every point gets a figure of merit (`weights @ T(energies)`, by default the sum of the
+    transmission at `energies`), the maximum stress in each layer and a feasibility flag.
+    With `spectra` the transmission at `energies` is kept too. Membranes named in
+    `derive_thickness` are set to their minimum thickness times the given margin at every
+    point, as in StackDesign. Membranes without a width (unsupported films such as coatings)
+    are not checked for failure.
+
+    Chunks hold `chunk_size` points, by default as many as fit in about `max_memory` bytes.'''
+    def __init__(self, template, axes, energies=OPT_ENERGIES, weights=None, derive_thickness=None, spectra=False, max_memory=64*2**20, chunk_size=None):
+        self.layers           = list(template.layers)
+        self.axes             = list(axes)
+        self.energies         = np.asarray(energies, dtype=float)
+        self.weights          = np.ones(len(self.energies)) if weights is None else np.asarray(weights, dtype=float)
+        self.derive_thickness = dict(derive_thickness or {})
+        self.spectra          = spectra
+
+        names = [layer.name for layer in self.layers]
+        if len(set(names)) != len(names):
+            raise ValueError("Layer names must be unique to be swept.")
+        self._index = {name: i for i, name in enumerate(names)}
+
+        driven = set()
+        for axis in self.axes:
+            for layer_name, attr in axis.targets:
+                layer = self._layer(layer_name)
+                if attr not in layer_attributes(layer) + ("material",):
+                    raise ValueError(f"{type(layer).__name__} '{layer_name}' has no sweepable attribute '{attr}'.")
+                driven.add((layer_name, attr))
+        for layer_name in self.derive_thickness:
+            if not isinstance(self._layer(layer_name), RectangularMembraneLayer):
+                raise ValueError(f"Only membrane thickness can be derived, not that of '{layer_name}'.")
+
+        self._checked = checked_layers(self.layers, driven)
+
+        self.shape    = tuple(len(axis) for axis in self.axes)
+        self.n_points = math.prod(self.shape)
+
+        if chunk_size is None:
+            per_point  = 8 * (len(self.energies) * (3 if spectra else 2) + 12 * len(self.layers) + 2 * len(self.axes))
+            chunk_size = max_memory // per_point
+        self.chunk_size = max(1, int(chunk_size))
+
+        self._engines = {}
+
+    def _layer(self, name):
+        if name not in self._index:
+            raise ValueError(f"The template has no layer named '{name}'.")
+        return self.layers[self._index[name]]
+
+    def _engine(self, materials):
+        '''Engine for one combination of layer materials, built once per sweep.'''
+        key = tuple(m.name for m in materials)
+        if key not in self._engines:
+            self._engines[key] = AttenuationEngine([m.get_xray_data() for m in materials], self.energies)
+        return self._engines[key]
+
+    def point(self, i):
+        '''Axis values at flat index `i`, keyed by axis name.'''
+        idx = np.unravel_index(i, self.shape)
+        return {axis.name: axis.values[j] for axis, j in zip(self.axes, idx)}
+
+    def evaluate(self, start, stop):
+        '''Results for flat indices `start` to `stop`, as a dict of arrays: "fom", "feasible",
+        "stress" (n_points, n_layers) and, with `spectra`, "transmission" (n_points, n_energy).'''
+        idx = np.unravel_index(np.arange(start, stop), self.shape)
+        n   = stop - start
+
+        values = {}
+        for axis, i in zip(self.axes, idx):
+            if not axis.categorical:
+                for layer_name, attr in axis.targets:
+                    values[self._index[layer_name], attr] = axis.values[i]
+
+        # Points are grouped by their combination of materials, which share one engine
+        categorical = [k for k, axis in enumerate(self.axes) if axis.categorical]
+        if categorical:
+            combos, group = np.unique(np.stack([idx[k] for k in categorical], axis=1), axis=0, return_inverse=True)
+            group         = group.ravel()
+        else:
+            combos, group = np.zeros((1, 0), dtype=int), np.zeros(n, dtype=int)
+
+        result = {
+            "fom":      np.empty(n),
+            "feasible": np.empty(n, dtype=bool),
+            "stress":   np.empty((n, len(self.layers))),
+        }
+        if self.spectra:
+            result["transmission"] = np.empty((n, len(self.energies)))
+
+        for g, combo in enumerate(combos):
+            rows      = np.flatnonzero(group == g)
+            materials = [layer.material for layer in self.layers]
+            for k, j in zip(categorical, combo):
+                for layer_name, _ in self.axes[k].targets:
+                    materials[self._index[layer_name]] = self.axes[k].values[j]
+
+            thickness, open_area, stress, feasible = self._stack(rows, values, materials)
+            trans = self._engine(materials).transmission(thickness, open_area)
+
+            result["fom"][rows]      = trans @ self.weights
+            result["feasible"][rows] = feasible
+            result["stress"][rows]   = stress
+            if self.spectra:
+                result["transmission"][rows] = trans
+
+        return result
+
+    def _stack(self, rows, values, materials):
+        '''Thickness, open area and stress of every layer, and the feasibility mask, for the
+        given rows of a chunk.'''
+        n         = len(rows)
+        thickness = np.empty((n, len(self.layers)))
+        open_area = np.empty((n, len(self.layers)))
+        stress    = np.empty((n, len(self.layers)))
+        feasible  = np.ones(n, dtype=bool)
+
+        arrays = layer_arrays(self.layers, {key: v[rows] for key, v in values.items()}, materials, self.derive_thickness)
+        for i, array in enumerate(arrays):
+            thickness[:, i] = array.xray_thickness()
+            open_area[:, i] = array.open_area()
+            stress[:, i]    = array.max_stress
+            if self._checked[i]:
+                feasible &= ~array.failure()
+
+        return thickness, open_area, stress, feasible
+
+    def chunks(self, start=0):
+        '''Yield `(start, stop, results)` for each chunk from flat index `start` onwards.'''
+        for lo in range(start, self.n_points, self.chunk_size):
+            hi = min(lo + self.chunk_size, self.n_points)
+            yield lo, hi, self.evaluate(lo, hi)
+
+    def meta(self):
+        '''Description of the sweep, stored with its results to check that a resumed run is
+        the same sweep. Layers are described in full (see MechanicalWindowLayer.design), so a
+        template whose fixed dimensions, material properties or x-ray data changed does not
+        resume.'''
+        return {
+            "shape":    list(self.shape),
+            "axes":     [{"name": a.name, "targets": [".".join(t) for t in a.targets], "values": a.labels()} for a in self.axes],
+            "layers":   [_layer_meta(layer) for layer in self.layers],
+            "energies": self.energies.tolist(),
+            "weights":  self.weights.tolist(),
+            "derive_thickness": self.derive_thickness,
+            "spectra":  self.spectra,
+        }
+
+    def _outputs(self):
+        outputs = {
+            "fom":      (np.float64, (self.n_points,)),
+            "feasible": (np.bool_,   (self.n_points,)),
+            "stress":   (np.float64, (self.n_points, len(self.layers))),
+        }
+        if self.spectra:
+            outputs["transmission"] = (np.float64, (self.n_points, len(self.energies)))
+        return outputs
+
+    def run(self, directory, resume=True):
+        '''Evaluate the sweep into `directory` and return a SweepStore over the results.
+
+        Results go to one .npy file per output, written chunk by chunk through memory maps.
+        meta.json records the sweep and how many points are done; with `resume`, a directory
+        holding part of the same sweep is continued rather than started again.'''
+        os.makedirs(directory, exist_ok=True)
+        meta      = json.loads(json.dumps(self.meta()))
+        meta_file = os.path.join(directory, "meta.json")
+
+        done = 0
+        mode = "w+"
+        if resume and os.path.exists(meta_file):
+            with open(meta_file, encoding="utf-8") as f:
+                stored = json.load(f)
+            done = stored.pop("done")
+            if stored != meta:
+                raise ValueError(f"{directory} holds results of a different sweep.")
+            mode = "r+"
+
+        arrays = {
+            name: np.lib.format.open_memmap(os.path.join(directory, f"{name}.npy"), mode=mode, dtype=dtype, shape=shape if mode == "w+" else None)
+            for name, (dtype, shape) in self._outputs().items()
+        }
+        if mode == "w+":
+            _write_meta(meta_file, dict(meta, done=0))
+
+        for start, stop, result in self.chunks(done):
+            for name, array in arrays.items():
+                array[start:stop] = result[name]
+                array.flush()
+            _write_meta(meta_file, dict(meta, done=stop))
+
+        del arrays
+        return SweepStore(directory)
+
+def _layer_meta(layer):
+    # Unset dimensions are NaN, which JSON would store but never compare equal to
+    design = {key: None if isinstance(v, float) and np.isnan(v) else v for key, v in layer.design().items()}
+    return dict(design, name=layer.name)
+
+def _write_meta(filename, meta):
+    # Replace atomically so an interrupted run never leaves a half-written progress record
+    tmp = filename + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, filename)
+
+class SweepStore:
+    '''Results written by Sweep.run(), memory-mapped read-only. Outputs are flat arrays over
+    the sweep's points; `grid(name)` reshapes one to the axes.'''
+    def __init__(self, directory):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        self.directory = directory
+        self.shape     = tuple(self.meta["shape"])
+        self.n_points  = math.prod(self.shape)
+        self.done      = self.meta["done"]
+        self.energies  = np.array(self.meta["energies"])
+
+        self.fom      = np.load(os.path.join(directory, "fom.npy"), mmap_mode="r")
+        self.feasible = np.load(os.path.join(directory, "feasible.npy"), mmap_mode="r")
+        self.stress   = np.load(os.path.join(directory, "stress.npy"), mmap_mode="r")
+        self.transmission = None
+        if self.meta["spectra"]:
+            self.transmission = np.load(os.path.join(directory, "transmission.npy"), mmap_mode="r")
+
+    @property
+    def complete(self):
+        return self.done == self.n_points
+
+    def grid(self, name):
+        '''Output `name` shaped as the sweep's axes (plus any trailing output axis).'''
+        array = getattr(self, name)
+        return array.reshape(self.shape + array.shape[1:])
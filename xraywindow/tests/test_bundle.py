@@ -0,0 +1,32 @@
+import os
+import shutil
+import numpy as np
+from xraywindow.bundle    import compile_bundle, load_bundle
+from xraywindow.registry  import XRayDataRegistry
+from xraywindow.xray_data import XRayData
+
+def test_bundle_matches_csv(tmp_path):
+    bundle_dir = compile_bundle(bundle_dir=str(tmp_path))
+    bundle     = load_bundle(bundle_dir)
+    bundled    = bundle.xray_data("silicon")
+    csv        = XRayData("silicon")
+
+    assert isinstance(bundled.energies.base, np.memmap) or isinstance(bundled.energies, np.memmap)
+    assert np.array_equal(bundled.energies, csv.energies)
+    assert np.array_equal(bundled.transmissions, csv.transmissions)
+    assert bundled.thickness == csv.thickness
+    assert "ap3_data" not in bundle  # Not a material table
+    assert bundle.materials()["TestMat"].modulus == 123.456e9
+
+def test_registry_prefers_current_bundle(tmp_path):
+    shutil.copy(os.path.join("data", "xray", "test_xray_data.csv"), tmp_path)
+    compile_bundle(xray_data_dir=str(tmp_path))
+
+    xray_data = XRayDataRegistry().get("test_xray_data", str(tmp_path))
+    assert xray_data.transmission(10, 100e-9) == 0.1
+    assert isinstance(xray_data.energies.base, np.memmap) or isinstance(xray_data.energies, np.memmap)
+
+    # Editing the .csv makes the bundle stale
+    os.utime(tmp_path / "test_xray_data.csv", ns=(0, 0))
+    xray_data = XRayDataRegistry().get("test_xray_data", str(tmp_path))
+    assert not isinstance(xray_data.energies, np.memmap)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from xraywindow.cache      import ResultCache, design_key
+from xraywindow.instrument import profile
+from xraywindow.material   import import_materials
+from xraywindow.mechanical import MechanicalWindow, BeamLayer, RectangularMembraneLayer
+from xraywindow.population import OPT_ENERGIES
+
+def _mech_window(thickness=300e-9, names=("Primary", "Tertiary")):
+    materials = import_materials()
+    mech      = MechanicalWindow()
+    mech.add_layer(BeamLayer(names[0], materials["silicon"], 190e-6, 60e-6, 10.2e-3, 380e-6))
+    mech.add_layer(RectangularMembraneLayer(names[1], materials["polymer"], 190e-6, thickness))
+    return mech
+
+def test_design_key(monkeypatch):
+    assert design_key({"a": 1, "b": [1.5, "x"]}) == design_key({"b": [1.5, "x"], "a": 1})
+
+    # A new model version invalidates every key
+    key = design_key({"a": 1})
+    monkeypatch.setattr("xraywindow.cache.MODEL_VERSION", 2)
+    assert design_key({"a": 1}) != key
+    monkeypatch.undo()
+
+    base = _mech_window()
+    assert _mech_window(names=("A", "B")).design_key() == base.design_key()
+    assert _mech_window(thickness=301e-9).design_key() != base.design_key()
+    assert _mech_window().to_xray_window("other name").design_key() == base.to_xray_window().design_key()
+
+    # Pressure and the layer's material properties are part of the design
+    changed = _mech_window()
+    changed.layers[1].pressure *= 2
+    assert changed.design_key() != base.design_key()
+
+    layer = base.design()["layers"][0]
+    assert layer["type"] == "BeamLayer" and layer["material"] == "silicon" and layer["data"]
+
+def test_cached_results_skip_physics(tmp_path):
+    cache  = ResultCache(tmp_path / "results.sqlite")
+    window = _mech_window()
+
+    spectrum = cache.spectrum(window)
+    fom      = cache.fom(window, OPT_ENERGIES)
+    assert np.allclose(spectrum.transmission, window.to_xray_window().transmission())
+    assert fom == pytest.approx(window.to_xray_window().transmission(OPT_ENERGIES).sum())
+
+    # A new cache on the same file (e.g. the next run) answers without computing
+    cache = ResultCache(tmp_path / "results.sqlite")
+    with profile() as p:
+        assert np.array_equal(cache.spectrum(_mech_window(names=("A", "B"))).transmission, spectrum.transmission)
+        assert cache.fom(window, OPT_ENERGIES) == fom
+    assert "XRayWindow.transmission" not in p.calls
+    assert cache.stats()["hits"] == 2
+
+    assert cache.fom(window, OPT_ENERGIES, np.ones(len(OPT_ENERGIES)) / 2) == pytest.approx(fom / 2)
+
+def test_size_bounded_eviction(tmp_path):
+    cache = ResultCache(tmp_path / "results.sqlite", max_bytes=3000)
+    for i in range(5):
+        cache.put(f"k{i}", np.full(100, i, dtype=float))
+    cache.get("k2")
+    cache.put("k5", np.zeros(100))
+
+    assert cache.nbytes <= 3000
+    assert cache.get("k5") is not None and cache.get("k2") is not None
+    assert cache.get("k0") is None
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from xraywindow.compress  import CompressedXRayData, find_edges
+from xraywindow.engine    import AttenuationEngine
+from xraywindow.registry  import XRayDataRegistry
+from xraywindow.xray_data import XRayData, import_xray_data_csv
+
+@pytest.mark.parametrize("material_name", ["silicon", "polymer", "aluminum"])
+@pytest.mark.parametrize("tol", [1e-3, 1e-2])
+def test_transmission_within_tolerance(material_name, tol):
+    table   = XRayData(material_name)
+    compact = CompressedXRayData.compress(table, tol)
+    energy  = np.arange(10, 10000, 0.25)
+
+    assert compact.nbytes * 5 < table.nbytes
+    for thickness in np.geomspace(1e-9, 1e-3, 19):
+        assert np.abs(compact.transmission(energy, thickness) - table.transmission(energy, thickness)).max() <= tol
+
+def test_edges_found():
+    compact = CompressedXRayData.compress(XRayData("silicon"))
+    # Si L and K edges
+    assert np.any(np.abs(compact.edge_energies - 100) < 3)
+    assert np.any(np.abs(compact.edge_energies - 1839) < 3)
+
+    mu = np.array([10.0, 8.0, 6.0, 12.0, 11.0])
+    assert find_edges(mu).tolist() == [3]
+
+def test_table_round_trip(tmp_path):
+    table   = XRayData("boron")
+    compact = CompressedXRayData.compress(table, 1e-3)
+
+    energies, transmissions, thickness, density = compact.to_table()
+    assert np.array_equal(energies, table.energies)
+    assert np.abs(transmissions - table.transmissions).max() <= 1e-3
+    assert (thickness, density) == (table.thickness, table.density)
+
+    compact.to_csv(tmp_path / "boron.csv")
+    energies, transmissions, thickness, density = import_xray_data_csv("boron", tmp_path)
+    assert np.array_equal(energies, table.energies)
+    assert np.abs(transmissions - table.transmissions).max() <= 1e-3
+    assert (thickness, density) == (table.thickness, table.density)
+
+def test_engine_and_registry_accept_compressed():
+    registry = XRayDataRegistry(compress_tol=1e-3)
+    compact  = registry.get("silicon")
+    assert isinstance(compact, CompressedXRayData)
+
+    energy = np.linspace(100, 5000, 50)
+    exact  = AttenuationEngine([XRayData("silicon")], energy).transmission([[1e-6]])
+    approx = AttenuationEngine([compact], energy).transmission([[1e-6]])
+    assert np.abs(approx - exact).max() <= 1e-3
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from xraywindow.engine     import AttenuationEngine
+from xraywindow.mechanical import MechanicalWindow, BeamLayer, RectangularMembraneLayer
+from xraywindow.material   import Material
+
+def make_window():
+    silicon = Material("silicon", 150e9, 7000e6, 0.17)
+    polymer = Material("polymer", 9e9, 200e6, 0.22, 150e-9)
+
+    mech_win = MechanicalWindow()
+    mech_win.add_layer(BeamLayer("Primary", silicon, 190e-6, 60e-6, 10.2e-3, 380e-6))
+    mech_win.add_layer(RectangularMembraneLayer("Membrane", polymer, 190e-6, 300e-9))
+    return mech_win.to_xray_window()
+
+def test_engine_matches_layer_product():
+    """The engine should reproduce the layer-by-layer product of transmissions."""
+    window   = make_window()
+    energy   = np.arange(10, 10000)
+    expected = np.ones(len(energy))
+    for layer in window.layers:
+        expected *= layer.transmission(energy)
+
+    assert window.transmission(energy) == pytest.approx(expected, rel=1e-9)
+
+def test_engine_stack_block():
+    """A 2-D thickness matrix should give one transmission row per stack."""
+    window    = make_window()
+    engine    = AttenuationEngine.from_window(window, [54.3, 108.5, 1740])
+    thickness = [[L.thickness for L in window.layers], [0, 0]]
+    open_area = [L.open_area for L in window.layers]
+    block     = engine.transmission(thickness, open_area)
+
+    assert block.shape == (2, 3)
+    assert block[0] == pytest.approx(window.transmission([54.3, 108.5, 1740]))
+    assert block[1] == pytest.approx(np.ones(3))
+
+def test_attenuation_cached_per_grid():
+    """Windows on the same energy grid should only interpolate each material once."""
+    window = make_window()
+    first  = window.layers[0].xray_data.attenuation(np.arange(10, 100))
+    second = window.layers[0].xray_data.attenuation(np.arange(10, 100))
+    assert first is second
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from xraywindow.feasibility import FeasibleDesignSpace
+from xraywindow.mechanical  import BeamLayer
+from xraywindow.material    import Material
+from xraywindow.optimize    import example_designs
+
+def test_max_spacing_is_stress_limit():
+    silicon = Material("silicon", 150e9, 7000e6, 0.17)
+    beam    = BeamLayer("Primary", silicon, 190e-6, 60e-6, 10.2e-3, 380e-6)
+    limit   = BeamLayer("Primary", silicon, beam.calc_max_spacing(), 60e-6, 10.2e-3, 380e-6)
+    assert limit.max_stress == pytest.approx(silicon.stress)
+
+    narrowest = BeamLayer("Primary", silicon, 190e-6, beam.calc_min_width(), 10.2e-3, 380e-6)
+    assert narrowest.max_stress == pytest.approx(silicon.stress)
+
+def test_reduced_space_is_feasible():
+    design = example_designs()["three_layer_si3n4"]
+    space  = FeasibleDesignSpace(design)
+    u      = np.random.default_rng(0).uniform(0, 1, (1000, space.n_params))
+
+    _, feasible = space.evaluate(u)
+    assert space.n_params == design.n_params - 1
+    assert feasible.all()
+
+def test_active_constraints():
+    space  = FeasibleDesignSpace(example_designs()["three_layer_polymer"])
+    active = space.active_constraints([[1.0, 0.5]])
+
+    assert active["Primary spacing"][0] == "upper bound"
+    assert active["Secondary width"][0] in ("stress", "lower bound")
+    assert active["Membrane thickness"][0] in ("stress", "min thickness")
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from xraywindow.mechanical import BeamLayer, RectangularMembraneLayer
+from xraywindow.material   import Material
+from xraywindow.optimize   import example_designs, minimize_gradient
+
+def finite_difference(f, x, rel=1e-6):
+    x    = np.asarray(x, dtype=float)
+    cols = []
+    for i in range(len(x)):
+        h     = x[i] * rel
+        up    = x.copy(); up[i] += h
+        down  = x.copy(); down[i] -= h
+        cols.append((np.asarray(f(up)) - np.asarray(f(down))) / (2 * h))
+    return np.stack(cols, axis=-1)
+
+def test_layer_gradients():
+    silicon = Material("silicon", 150e9, 7000e6, 0.17)
+    beam    = BeamLayer("Primary", silicon, 190e-6, 60e-6, 10.2e-3, 380e-6)
+    _, grad = beam.stress_and_gradient()
+    fd      = finite_difference(lambda x: BeamLayer("Primary", silicon, *x).max_stress, [190e-6, 60e-6, 10.2e-3, 380e-6])
+    assert [grad[k] for k in ("spacing", "width", "length", "height")] == pytest.approx(fd, rel=1e-5)
+
+    film    = RectangularMembraneLayer("Membrane", silicon, 190e-6, 100e-9)
+    _, grad = film.stress_and_gradient()
+    fd      = finite_difference(lambda x: RectangularMembraneLayer("Membrane", silicon, *x).max_stress, [190e-6, 100e-9])
+    assert [grad["width"], grad["thickness"]] == pytest.approx(fd, rel=1e-5)
+
+def test_window_jacobian():
+    design = example_designs()["three_layer_polymer"]
+    window = design.to_mechanical_window([500e-6, 50e-6, 10e-6]).to_xray_window()
+    energy = [54.3, 277, 1740]
+    _, d_thickness, d_open_area = window.transmission_and_jacobian(energy)
+
+    def trans(x, attr):
+        for layer, value in zip(window.layers, x):
+            setattr(layer, attr, value)
+        return window.transmission(energy)
+
+    thickness = [L.thickness for L in window.layers]
+    assert d_thickness.T == pytest.approx(finite_difference(lambda x: trans(x, "thickness"), thickness), rel=1e-5, abs=1e-8)
+    trans(thickness, "thickness")
+
+    # Open areas can be zero, so step by an absolute amount
+    open_area = [L.open_area for L in window.layers]
+    h         = 1e-7
+    for i in range(len(window.layers)):
+        up   = list(open_area); up[i] += h
+        down = list(open_area); down[i] -= h
+        fd   = (trans(up, "open_area") - trans(down, "open_area")) / (2 * h)
+        assert d_open_area[i] == pytest.approx(fd, rel=1e-5, abs=1e-9)
+
+def test_design_gradients():
+    design = example_designs()["three_layer_polymer"]
+    p      = np.array([500e-6, 50e-6, 10e-6])
+
+    _, grad = design.fom_and_gradient(p)
+    assert grad == pytest.approx(finite_difference(lambda x: design.fom_and_gradient(x)[0], p), rel=1e-4)
+
+    _, jac = design.constraints_and_jacobian(p)
+    assert jac == pytest.approx(finite_difference(lambda x: design.constraints_and_jacobian(x)[0], p), rel=1e-4, abs=1e-6)
+
+@pytest.mark.parametrize("name", ["two_layer_polymer", "two_layer_si3n4", "three_layer_polymer", "three_layer_si3n4"])
+def test_minimize_gradient_feasible(name):
+    design = example_designs()[name]
+    result = minimize_gradient(design)
+
+    fom, feasible = design.evaluate(result.x[None, :])
+    assert result.success and feasible[0]
+    assert fom[0] == pytest.approx(-result.fun)
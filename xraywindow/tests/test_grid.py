@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from xraywindow.grid        import simplify, adaptive_grid
+from xraywindow.interpolate import LogInterpolator
+from xraywindow.material    import import_materials
+from xraywindow.mechanical  import MechanicalWindow, BeamLayer, RectangularMembraneLayer
+
+def _window(scale=1):
+    materials = import_materials()
+    mech      = MechanicalWindow()
+    mech.add_layer(BeamLayer("Primary", materials["silicon"], 190e-6, 60e-6, 10.2e-3, 380e-6))
+    mech.add_layer(RectangularMembraneLayer("Tertiary", materials["polymer"], 190e-6, 300e-9 * scale))
+    mech.add_layer(RectangularMembraneLayer("Light Block", materials["aluminum"], thickness=30e-9 * scale))
+    return mech.to_xray_window()
+
+def test_simplify():
+    x = np.linspace(0, 1, 101)
+    y = np.abs(x - 0.3)
+
+    # A kink is the only point a straight-line fit needs
+    assert simplify(x, y, 1e-9).tolist() == [0, 30, 100]
+    assert len(simplify(x, np.exp(5 * x), 1e-3)) > len(simplify(x, np.exp(5 * x), 1e-2))
+    assert len(simplify(x, np.exp(5 * x), np.inf, max_ratio=1.2)) >= 5 / np.log(1.2)
+
+@pytest.mark.parametrize("scale", [1, 10])
+def test_adaptive_spectrum_within_tolerance(scale):
+    window   = _window(scale)
+    fine     = np.arange(10, 9999, 0.5)
+    exact    = window.transmission(fine)
+    spectrum = window.spectrum(tol=1e-3)
+
+    assert len(spectrum.energy) < 4000
+    assert spectrum.energy[0] == 10 and spectrum.energy[-1] == 9999
+    assert np.abs(spectrum.interp_trans(fine) - exact).max() < 1e-3
+
+    default = window.spectrum()
+    assert spectrum.integrate(100, 5000) == pytest.approx(default.integrate(100, 5000), abs=1e-3 * 4900)
+
+def test_grid_cached_per_material_set():
+    layers = _window().layers
+    grid   = adaptive_grid([layer.xray_data for layer in layers], 1e-2)
+    assert adaptive_grid([layer.xray_data for layer in reversed(layers)], 1e-2) is grid
+    assert not grid.flags.writeable
+
+def test_grid_cache_holds_no_tables():
+    import gc
+    import weakref
+
+    from xraywindow.xray_data import XRayData
+
+    silicon = import_materials()["silicon"].get_xray_data()
+    copy    = XRayData.from_arrays("silicon copy", silicon.energies, silicon.transmissions, silicon.thickness, silicon.density)
+    ref     = weakref.ref(copy)
+    adaptive_grid([copy], 1e-2)
+    del copy
+    gc.collect()
+    assert ref() is None
+
+def test_empty_window_spectrum():
+    from xraywindow.transmission import XRayWindow
+
+    spectrum = XRayWindow().spectrum(range(10, 100), tol=1e-3)
+    assert len(spectrum.energy) == 90 and (spectrum.transmission == 1).all()
@@ -0,0 +1,54 @@
+import numpy as np
+
+from xraywindow import instrument
+from xraywindow.material   import import_materials
+from xraywindow.mechanical import BeamLayer, MechanicalWindow
+
+def test_profile_counts_hot_paths():
+    materials = import_materials()
+    with instrument.profile() as prof:
+        ribs = BeamLayer("Ribs", materials["silicon"], 500e-6, 60e-6, 10e-3, 380e-6)
+        ribs.calc_stress()
+        mech = MechanicalWindow()
+        mech.add_layer(ribs)
+        window = mech.to_xray_window()
+        window.spectrum().integrate(100, 1000)
+
+    calls = prof.to_dict()
+    assert calls["BeamLayer.calc_stress"]["calls"] >= 1
+    assert calls["MechanicalWindow.to_xray_window"]["calls"] == 1
+    assert calls["XRayWindow.spectrum"]["calls"] == 1
+    assert calls["XRaySpectrum.integrate"]["calls"] == 1
+    assert calls["XRayWindow built"]["calls"] == 1
+    assert calls["XRayWindow.spectrum"]["time"] >= calls["XRayWindow.transmission"]["time"] > 0
+
+def test_nothing_recorded_outside_profile():
+    materials = import_materials()
+    with instrument.profile() as prof:
+        pass
+    materials["silicon"].get_xray_data().transmission(np.array([100.0]), 1e-6)
+
+    assert not instrument.enabled()
+    assert prof.to_dict() == {}
+
+def test_diff():
+    before = instrument.Profile()
+    before.record("a", 1.0)
+    after = instrument.Profile()
+    after.record("a", 3.0, n=2)
+    after.record("b", 0.5)
+
+    diff = after.diff(before.to_dict())
+    assert diff["a"] == {"calls": 1, "time": 2.0}
+    assert diff["b"] == {"calls": 1, "time": 0.5}
+
+def test_profile_is_per_thread():
+    import threading
+
+    with instrument.profile() as prof:
+        other = threading.Thread(target=instrument.count, args=("other thread",))
+        other.start()
+        other.join()
+        instrument.count("this thread")
+
+    assert prof.to_dict() == {"this thread": {"calls": 1, "time": 0.0}}
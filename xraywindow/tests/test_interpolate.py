@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from xraywindow.interpolate import LogInterpolator
+
+def test_log_interpolation_matches_reference():
+    """Lookups on an uneven grid should match a binary-search log-linear interpolation."""
+    rng    = np.random.default_rng(0)
+    x      = np.cumsum(rng.uniform(0.5, 2.5, 500))
+    y      = np.exp(-rng.uniform(0, 5, 500))
+    interp = LogInterpolator(x, y)
+
+    e = np.concatenate([x, rng.uniform(x[0], x[-1], 2000)])
+    assert interp(e) == pytest.approx(np.exp(np.interp(e, x, np.log(y))), rel=1e-12)
+    assert interp.log(e) == pytest.approx(np.interp(e, x, np.log(y)), rel=1e-12)
+
+def test_exact_at_table_points():
+    x = np.linspace(10, 10000, 5000)
+    y = np.exp(-1000 / x)
+    assert np.array_equal(LogInterpolator(x, y)(x), y)
+
+def test_out_of_range():
+    interp = LogInterpolator([1, 2, 3], [0.1, 0.2, 0.3])
+    with pytest.raises(ValueError):
+        interp(0.5)
+    with pytest.raises(ValueError):
+        interp([2, 3.5])
+
+def test_nan_energy():
+    interp = LogInterpolator(np.linspace(10, 100, 50), np.linspace(0.1, 0.9, 50))
+    out    = interp([np.nan, 20.0])
+    assert np.isnan(out[0]) and out[1] == pytest.approx(interp(20.0))
+    assert np.isnan(interp.log(np.nan))
@@ -0,0 +1,46 @@
+import pickle
+import numpy as np
+import pytest
+from xraywindow.mechanical import BeamLayer, RectangularMembraneLayer, BeamLayerArray, RectangularMembraneLayerArray
+from xraywindow.material   import Material
+
+silicon = Material("silicon", 150e9, 7000e6, 0.17)
+polymer = Material("polymer", 9e9, 200e6, 0.22, 150e-9)
+
+def test_beam_array_matches_scalar():
+    spacing = np.array([100e-6, 500e-6, 2000e-6])
+    ribs    = BeamLayerArray("Primary", silicon, spacing, 60e-6, 10.2e-3, 380e-6)
+    ribs.calc_max_deflection()
+
+    for i, s in enumerate(spacing):
+        beam = BeamLayer("Primary", silicon, s, 60e-6, 10.2e-3, 380e-6)
+        assert ribs.max_stress[i] == pytest.approx(beam.max_stress)
+        assert ribs.max_deflection[i] == pytest.approx(beam.calc_max_deflection())
+        assert ribs.calc_max_spacing()[i] == pytest.approx(beam.calc_max_spacing())
+        assert ribs.open_area()[i] == pytest.approx(beam.open_area())
+        assert ribs.failure()[i] == beam.failure()
+
+def test_membrane_array_matches_scalar():
+    width = np.array([50e-6, 190e-6, 2000e-6])
+    films = RectangularMembraneLayerArray("Membrane", polymer, width, 300e-9)
+
+    for i, w in enumerate(width):
+        film = RectangularMembraneLayer("Membrane", polymer, w, 300e-9)
+        assert films.max_stress[i] == pytest.approx(film.max_stress)
+        assert films.calc_max_width()[i] == pytest.approx(film.calc_max_width())
+        assert films.calc_min_thickness()[i] == pytest.approx(film.calc_min_thickness())
+        assert films.failure()[i] == film.failure()
+
+def test_array_missing_parameters_fail():
+    """Missing dimensions give NaN limits and count as failed rather than raising."""
+    films = RectangularMembraneLayerArray("Membrane", polymer, [np.nan, 100e-6])
+    assert np.isnan(films.calc_min_thickness()[0])
+    assert films.failure().tolist() == [True, True]
+
+def test_layers_use_slots():
+    beam = BeamLayer("Primary", silicon, 190e-6, 60e-6, 10.2e-3, 380e-6)
+    assert not hasattr(beam, "__dict__")
+
+    # The ratio is kept in its own attribute, so the method stays callable
+    assert beam.slenderness_ratio() == pytest.approx(beam.slenderness)
+    assert pickle.loads(pickle.dumps(beam)).max_stress == beam.max_stress
@@ -0,0 +1,21 @@
+import pickle
+import numpy as np
+import pytest
+from xraywindow.optimize import example_designs, optimize
+
+def test_design_pickles_without_tables():
+    design = example_designs()["three_layer_polymer"]
+    params = np.array([[500e-6, 50e-6, 10e-6], [1900e-6, 190e-6, 5e-6]])
+    score  = design(params.T)
+
+    data = pickle.dumps(design)
+    assert len(data) < 10_000  # No x-ray tables or engine inside
+    assert pickle.loads(data)(params.T) == pytest.approx(score)
+
+def test_parallel_matches_vectorized():
+    design   = example_designs()["two_layer_polymer"]
+    serial   = optimize(design, workers=1, seed=1, maxiter=5, polish=False)
+    parallel = optimize(design, workers=2, seed=1, maxiter=5, polish=False)
+
+    assert parallel.x == pytest.approx(serial.x)
+    assert parallel.fun == pytest.approx(serial.fun)
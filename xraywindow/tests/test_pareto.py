@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from xraywindow.pareto    import non_dominated_sort, crowding_distance, dominates, pareto_search, ParetoProblem
+from xraywindow.weighting import ELEMENT_LINES
+from xraywindow.optimize  import example_designs
+
+def test_non_dominated_sort():
+    F = np.array([[1, 4], [2, 2], [4, 1], [3, 3], [5, 5], [2, 5]])
+    assert non_dominated_sort(F).tolist() == [0, 0, 0, 1, 2, 1]
+
+    # Any feasible row beats an infeasible one, whatever its objectives
+    violation = np.array([0, 0, 0, 0, 0.5, 0.1])
+    F[4]      = [0, 0]
+    assert non_dominated_sort(F, violation).tolist() == [0, 0, 0, 1, 3, 2]
+
+def test_crowding_distance():
+    F = np.array([[0.0, 3.0], [1.0, 2.0], [1.5, 1.5], [3.0, 0.0]])
+    d = crowding_distance(F)
+    assert np.isinf(d[[0, 3]]).all()
+    assert d[2] > d[1]
+
+def test_pareto_search_front():
+    design = example_designs()["three_layer_polymer"]
+    result = pareto_search(design, pop_size=40, generations=30, archive_size=50, seed=0)
+    F      = -np.column_stack(list(result.objectives.values()))
+
+    assert 10 < len(result) <= 50
+    assert not dominates(F, F).any()
+    assert (result.objectives["safety factor"] >= 1).all()
+    assert np.allclose(design.safety_factor(result.x), result.objectives["safety factor"])
+    assert np.all(np.diff(result.objectives["low energy"]) >= 0)
+
+def test_objectives_at_line_energies():
+    design  = example_designs()["three_layer_polymer"]
+    problem = ParetoProblem(design)
+    params  = np.array([[500e-6, 50e-6, 10e-6]])
+    F, _    = problem.evaluate(params)
+
+    window = design.to_mechanical_window(params[0]).to_xray_window()
+    lines  = [ELEMENT_LINES[e] for e in ("Li", "Be", "B")]
+    assert -F[0, 0] == pytest.approx(window.transmission(lines).mean(), rel=1e-12)
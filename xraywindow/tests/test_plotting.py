@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip("matplotlib")
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+from xraywindow.plotting import downsample_minmax, plot_spectra, plot_transmission, render_many
+
+def _spectra(n=20):
+    energy = np.arange(10, 10000, 1.0)
+    rng    = np.random.default_rng(0)
+    return energy, np.exp(-rng.uniform(0.1, 2, (n, 1)) * 1e3 / energy) * (1 + 0.01 * rng.standard_normal((n, len(energy))))
+
+def test_downsample_keeps_extremes():
+    energy, transmission = _spectra()
+    x, y = downsample_minmax(energy, transmission, 200)
+
+    assert len(x) <= 400 and y.shape == (len(transmission), len(x))
+    assert np.all(np.diff(x) >= 0)
+    assert np.array_equal(y.max(axis=1), transmission.max(axis=1))
+    assert np.array_equal(y.min(axis=1), transmission.min(axis=1))
+
+    # Short traces are left alone
+    x, y = downsample_minmax(energy[:100], transmission[:, :100], 200)
+    assert np.array_equal(x, energy[:100]) and np.array_equal(y, transmission[:, :100])
+
+def test_plot_spectra_single_artist():
+    energy, transmission = _spectra()
+    fig, ax = plt.subplots()
+    try:
+        collection = plot_spectra(energy, transmission, ax=ax)
+        assert list(ax.collections) == [collection] and not ax.lines
+        assert len(collection.get_segments()) == len(transmission)
+        assert len(collection.get_segments()[0]) <= 2 * ax.bbox.width
+
+        # Ragged traces on their own grids
+        plot_spectra([energy, energy[:500]], [transmission[0], transmission[1, :500]], ax=ax, max_bins=None)
+        assert len(ax.collections[1].get_segments()[1]) == 500
+    finally:
+        plt.close(fig)
+
+def test_plot_transmission_without_legend():
+    pd = pytest.importorskip("pandas")
+    energy, transmission = _spectra(2)
+    data = [pd.DataFrame({"Energy": energy, "Transmission": t}) for t in transmission]
+
+    fig, ax = plt.subplots()
+    try:
+        plot_transmission(data=data, labels=["a", "b"], ax=ax, legend=False, tight=False)
+        assert ax.get_legend() is None
+        assert len(ax.lines) == 2
+    finally:
+        plt.close(fig)
+
+def test_render_many(tmp_path):
+    energy, transmission = _spectra()
+    tasks = [
+        {"filename": tmp_path / f"spectra_{i}.png", "energy": energy, "transmission": transmission[i::2], "title": str(i)}
+        for i in range(2)
+    ]
+    written = render_many(tasks, workers=2)
+    assert written == [task["filename"] for task in tasks]
+    assert all(f.stat().st_size > 0 for f in written)
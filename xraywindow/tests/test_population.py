@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from xraywindow.mechanical import MechanicalWindow, BeamLayer, RectangularMembraneLayer
+from xraywindow.material   import import_materials
+from xraywindow.population import StackDesign, BeamSpec, MembraneSpec, CoatingSpec, OPT_ENERGIES
+
+materials = import_materials()
+
+def three_layer_design():
+    return StackDesign(
+        beams    = [
+            BeamSpec("Primary", materials["silicon"], 380e-6, width=60e-6, length=10.2e-3),
+            BeamSpec("Secondary", materials["silicon"], 45e-6),
+        ],
+        membrane = MembraneSpec("Membrane", materials["polymer"]),
+        coatings = [CoatingSpec("Light Block", materials["aluminum"], 30e-9)],
+    )
+
+def object_fom(p):
+    """Per-candidate reference, built the same way as `example.make_three_layer_window`."""
+    prim_spacing, sec_spacing, sec_width = p
+    prim = BeamLayer("Primary", materials["silicon"], prim_spacing, 60e-6, 10.2e-3, 380e-6)
+    sec  = BeamLayer("Secondary", materials["silicon"], sec_spacing, sec_width, prim_spacing, 45e-6)
+    tert = RectangularMembraneLayer("Membrane", materials["polymer"], width=sec_spacing)
+    tert.thickness = tert.calc_min_thickness()*1.01
+    tert.calc_stress()
+
+    mech_win = MechanicalWindow()
+    for layer in [prim, sec, tert, RectangularMembraneLayer("Light Block", materials["aluminum"], thickness=30e-9)]:
+        mech_win.add_layer(layer)
+
+    feasible = not (prim.failure() or sec.failure() or tert.failure())
+    return mech_win.to_xray_window().transmission(OPT_ENERGIES).sum(), feasible
+
+def test_population_matches_objects():
+    design = three_layer_design()
+    params = np.array([[500e-6, 50e-6, 10e-6], [1900e-6, 190e-6, 5e-6], [300e-6, 100e-6, 20e-6]])
+    fom, feasible = design.evaluate(params)
+
+    for p, f, ok in zip(params, fom, feasible):
+        expected, expected_ok = object_fom(p)
+        assert f == pytest.approx(expected, rel=1e-9)
+        assert ok == expected_ok
+
+def test_scipy_vectorized_layout():
+    """Columns are candidates in scipy's vectorized mode; infeasible candidates score 0."""
+    design = three_layer_design()
+    params = np.array([[500e-6, 50e-6, 10e-6], [1900e-6, 190e-6, 5e-6]])
+    fom, feasible = design.evaluate(params)
+
+    assert design(params.T) == pytest.approx(np.where(feasible, -fom, 0))
+    assert design(params[0]) == pytest.approx(-fom[0])
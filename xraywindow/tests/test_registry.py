@@ -0,0 +1,31 @@
+import threading
+from xraywindow.material import Material
+from xraywindow.registry import XRayDataRegistry, REGISTRY
+
+def test_materials_share_xray_data():
+    """Two Material objects for the same name should share one XRayData."""
+    first  = Material("silicon", 150e9, 7000e6, 0.17).get_xray_data()
+    second = Material("silicon", 150e9, 7000e6, 0.17).get_xray_data()
+    assert first is second
+    assert REGISTRY.stats()["hits"] >= 1
+
+def test_concurrent_load_once():
+    registry = XRayDataRegistry()
+    results  = []
+    threads  = [threading.Thread(target=lambda: results.append(registry.get("boron"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(r) for r in results}) == 1
+    assert registry.stats()["misses"] == 1
+
+def test_eviction_by_budget():
+    registry = XRayDataRegistry(max_bytes=1)
+    registry.get("boron")
+    registry.get("silicon")
+
+    stats = registry.stats()
+    assert stats["entries"] == 1
+    assert stats["evictions"] == 1
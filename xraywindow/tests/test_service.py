@@ -0,0 +1,122 @@
+import json
+import asyncio
+import threading
+import numpy as np
+import pytest
+
+from xraywindow.material   import import_materials
+from xraywindow.mechanical import MechanicalWindow, BeamLayer, RectangularMembraneLayer
+from xraywindow.population import OPT_ENERGIES
+from xraywindow.service    import TransmissionService, InProcessClient, ServiceClient, stack_request
+
+def _window(scale=1):
+    materials = import_materials()
+    mech      = MechanicalWindow()
+    mech.add_layer(BeamLayer("Primary", materials["silicon"], 190e-6, 60e-6, 10.2e-3, 380e-6))
+    mech.add_layer(RectangularMembraneLayer("Tertiary", materials["polymer"], 190e-6, 300e-9 * scale))
+    mech.add_layer(RectangularMembraneLayer("Light Block", materials["aluminum"], thickness=30e-9 * scale))
+    return mech.to_xray_window()
+
+def test_in_process_client_matches_window():
+    client = InProcessClient()
+    window = _window()
+
+    assert np.allclose(client.transmission(window), window.transmission())
+    assert client.fom(window, OPT_ENERGIES) == pytest.approx(window.transmission(OPT_ENERGIES).sum())
+
+    weights = np.arange(len(OPT_ENERGIES))
+    assert client.fom(window, OPT_ENERGIES, weights) == pytest.approx(window.transmission(OPT_ENERGIES) @ weights)
+
+def test_errors_reported_per_request():
+    service   = TransmissionService(materials=import_materials())
+    good      = dict(stack_request(_window(), "fom", OPT_ENERGIES), id=1)
+    responses = service.evaluate_many([good, {"id": 2, "stack": []}, {"id": 3, "stack": [{"material": "unobtainium", "thickness": 1e-7}]}])
+
+    assert [r["id"] for r in responses] == [1, 2, 3]
+    assert "fom" in responses[0]
+    assert "error" in responses[1] and "error" in responses[2]
+
+    # Bad weights fail their own request, not the batch sharing its stack
+    bad       = dict(good, id=4, weights=["a"] * len(OPT_ENERGIES))
+    responses = service.evaluate_many([good, bad])
+    assert "fom" in responses[0] and "error" in responses[1]
+
+    with pytest.raises(ValueError):
+        InProcessClient(service).fom([{"material": "silicon"}])
+
+    # Names outside the loaded materials and the data directory never reach a file path
+    traversal = {"id": 5, "stack": [{"material": "../../x", "thickness": 1e-7}]}
+    assert "Unknown material" in service.evaluate_many([traversal])[0]["error"]
+
+    # JSON has no infinity, so an infinite figure of merit is sent as null
+    weights  = np.full(len(OPT_ENERGIES), np.inf)
+    response = service.evaluate_many([stack_request(_window(), "fom", OPT_ENERGIES, weights)])[0]
+    assert response["fom"] is None and json.dumps(response, allow_nan=False)
+
+    # Compound recipes from materials.yml
+    assert InProcessClient(service).fom([{"material": "B4C", "thickness": 1e-7}], OPT_ENERGIES) > 0
+
+def test_server_batches_concurrent_requests():
+    service  = TransmissionService(batch_delay=0.05)
+    requests = [dict(stack_request(_window(1 + i / 10), "fom", OPT_ENERGIES), id=i) for i in range(20)]
+
+    async def main():
+        server = await service.start(port=0)
+        port   = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write("".join(json.dumps(r) + "\n" for r in requests).encode() + b"not json\n")
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(len(requests) + 1)]
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses
+
+    responses = asyncio.run(main())
+    by_id     = {r["id"]: r["fom"] for r in responses if "id" in r}
+    assert sum("error" in r for r in responses) == 1
+
+    expected = InProcessClient().service.evaluate_many(requests)
+    assert [by_id[i] for i in range(20)] == pytest.approx([r["fom"] for r in expected])
+    assert service.requests == 20 and service.batches < 20
+
+def test_blocking_client():
+    service = TransmissionService()
+    ready   = threading.Event()
+    state   = {}
+
+    def serve():
+        async def main():
+            server = await service.start(port=0)
+            state["port"], state["loop"], state["server"] = server.sockets[0].getsockname()[1], asyncio.get_running_loop(), server
+            ready.set()
+            async with server:
+                try:
+                    await server.serve_forever()
+                except asyncio.CancelledError:
+                    pass
+        asyncio.run(main())
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    try:
+        window = _window()
+        with ServiceClient(port=state["port"]) as client:
+            assert np.allclose(client.transmission(window, OPT_ENERGIES), window.transmission(OPT_ENERGIES))
+    finally:
+        state["loop"].call_soon_threadsafe(state["server"].close)
+        thread.join(10)
+
+def test_batches_evaluated_off_the_event_loop():
+    service  = TransmissionService(materials=import_materials())
+    threads  = []
+    original = service.evaluate_many
+    service.evaluate_many = lambda requests: threads.append(threading.current_thread()) or original(requests)
+
+    async def main():
+        return await service.submit(stack_request(_window(), "fom", OPT_ENERGIES))
+
+    assert "fom" in asyncio.run(main())
+    assert threads and threads[0] is not threading.main_thread()
+    service.close()
@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import xraywindow.material, xraywindow.mechanical, xraywindow.transmission, xraywindow.population
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("pandas", "scipy", "matplotlib", "yaml") if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+# Generous guard; the core modules import in well under this with only NumPy loaded
+MAX_IMPORT_SECONDS = 1.0
+
+def test_core_import_is_light():
+    """Importing the core physics modules should not pull in pandas, scipy, matplotlib or yaml."""
+    out = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True, check=True).stdout
+    elapsed, _, heavy = out.strip().partition(" ")
+
+    assert heavy == ""
+    assert float(elapsed) < MAX_IMPORT_SECONDS
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from xraywindow.sweep      import Sweep, Axis
+from xraywindow.material   import import_materials
+from xraywindow.mechanical import MechanicalWindow, BeamLayer, RectangularMembraneLayer
+from xraywindow.optimize   import two_layer_design
+
+def _template(materials, membrane="polymer"):
+    mech = MechanicalWindow()
+    mech.add_layer(BeamLayer("Primary", materials["silicon"], 190e-6, 60e-6, 10.2e-3, 380e-6))
+    mech.add_layer(RectangularMembraneLayer("Membrane", materials[membrane], width=190e-6))
+    mech.add_layer(RectangularMembraneLayer("Light Block", materials["aluminum"], thickness=30e-9))
+    mech.add_layer(RectangularMembraneLayer("Gas Barrier", materials["boron"], thickness=20e-9))
+    return mech
+
+def _sweep(materials, **kwargs):
+    axes = [
+        Axis(["Primary.spacing", "Membrane.width"], np.linspace(100e-6, 2000e-6, 40)),
+        Axis("Membrane.material", [materials["polymer"], materials["SiNx"]]),
+        Axis("Light Block.thickness", [30e-9, 60e-9]),
+    ]
+    return Sweep(_template(materials), axes, derive_thickness={"Membrane": 1.01}, **kwargs)
+
+def test_sweep_matches_stack_design():
+    materials = import_materials()
+    sweep     = _sweep(materials, chunk_size=7)
+    chunks    = list(sweep.chunks())
+    fom       = np.concatenate([c["fom"] for _, _, c in chunks]).reshape(sweep.shape)
+    feasible  = np.concatenate([c["feasible"] for _, _, c in chunks]).reshape(sweep.shape)
+
+    assert len(chunks) == -(-sweep.n_points // 7)
+    for m, name in enumerate(["polymer", "SiNx"]):
+        design = two_layer_design(materials, tert_mat=name)
+        ref_fom, ref_feasible = design.evaluate(sweep.axes[0].values[:, None])
+        assert fom[:, m, 0] == pytest.approx(ref_fom)
+        assert (feasible[:, m, 0] == ref_feasible).all()
+
+    # Thicker light block only absorbs more
+    assert (fom[:, :, 1] < fom[:, :, 0]).all()
+
+def test_run_resumes(tmp_path):
+    materials = import_materials()
+    full      = _sweep(materials, chunk_size=16, spectra=True).run(tmp_path / "full")
+
+    class Interrupted(Sweep):
+        def chunks(self, start=0):
+            for i, chunk in enumerate(Sweep.chunks(self, start)):
+                if i == 2:
+                    raise KeyboardInterrupt
+                yield chunk
+
+    interrupted = _sweep(materials, chunk_size=16, spectra=True)
+    interrupted.__class__ = Interrupted
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.run(tmp_path / "partial")
+
+    sweep   = _sweep(materials, chunk_size=10, spectra=True)
+    calls   = []
+    sweep.evaluate = lambda lo, hi: calls.append(lo) or Sweep.evaluate(sweep, lo, hi)
+    resumed = sweep.run(tmp_path / "partial")
+
+    assert calls[0] == 32
+    assert resumed.complete
+    assert np.allclose(resumed.fom, full.fom, rtol=1e-12)
+    assert np.allclose(resumed.transmission, full.transmission, rtol=1e-12)
+    assert resumed.grid("stress").shape == (40, 2, 2, 4)
+
+    with pytest.raises(ValueError):
+        _sweep(materials, spectra=False).run(tmp_path / "partial")
+
+    # A template with different fixed dimensions is a different sweep
+    changed = _sweep(materials, spectra=True)
+    changed.layers[0].height = 300e-6
+    with pytest.raises(ValueError):
+        changed.run(tmp_path / "partial")
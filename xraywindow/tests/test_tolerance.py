@@ -0,0 +1,70 @@
+import math
+import numpy as np
+import pytest
+
+from xraywindow.tolerance  import tolerance_analysis, Tolerance
+from xraywindow.material   import import_materials
+from xraywindow.mechanical import MechanicalWindow, BeamLayer, RectangularMembraneLayer
+from xraywindow.population import OPT_ENERGIES
+
+def _window(stress_ratio=0.9):
+    materials = import_materials()
+    silicon   = materials["silicon"]
+
+    # Spacing that puts the ribs at `stress_ratio` of the failure stress
+    ribs         = BeamLayer("Primary", silicon, 190e-6, 60e-6, 10.2e-3, 380e-6)
+    ribs.spacing = (ribs.spacing + ribs.width) * stress_ratio * silicon.stress / ribs.calc_stress() - ribs.width
+    ribs.calc_stress()
+
+    membrane = RectangularMembraneLayer("Membrane", materials["polymer"], width=ribs.spacing)
+    membrane.thickness = membrane.calc_min_thickness() * 2
+    membrane.calc_stress()
+
+    mech = MechanicalWindow()
+    for layer in (ribs, membrane, RectangularMembraneLayer("Light Block", materials["aluminum"], thickness=30e-9)):
+        mech.add_layer(layer)
+    return mech
+
+def test_nominal_window():
+    mech   = _window()
+    result = tolerance_analysis(mech, [], batch_size=1000, min_samples=1000)
+
+    assert result.converged
+    assert result.failure_probability == 0
+    assert result.fom_mean == pytest.approx(mech.to_xray_window().transmission(np.array(OPT_ENERGIES)).sum())
+    assert result.fom_std == pytest.approx(0, abs=1e-6)
+
+def test_failure_probability_matches_normal_cdf():
+    tols   = [Tolerance("Primary.fail_stress", 0.1, relative=True, clip=10)]
+    result = tolerance_analysis(_window(0.9), tols, batch_size=50_000, min_samples=200_000, failure_atol=2e-3, seed=1)
+
+    # Fails when fail_stress drops below 0.9 of nominal, one standard deviation down
+    expected = 0.5 * (1 + math.erf((0.9 - 1) / 0.1 / math.sqrt(2)))
+    assert result.converged
+    assert result.failure_probability == pytest.approx(expected, abs=5 * result.failure_stderr)
+    assert len(result.fom) == result.n_samples
+
+def test_workers_reproduce_serial():
+    tols   = [Tolerance("Primary.width", 2e-6), Tolerance("Membrane.thickness", 0.05, relative=True, distribution="uniform")]
+    serial = tolerance_analysis(_window(), tols, batch_size=5000, max_samples=20_000, workers=1, seed=3, keep_samples=False)
+    pooled = tolerance_analysis(_window(), tols, batch_size=5000, max_samples=20_000, workers=2, seed=3, keep_samples=False)
+    assert serial.n_samples == pooled.n_samples == 20_000
+    assert serial.fom_mean == pytest.approx(pooled.fom_mean, rel=1e-12)
+
+def test_stopping_point_independent_of_workers():
+    tols    = [Tolerance("Primary.width", 2e-6)]
+    kwargs  = dict(batch_size=2000, min_samples=4000, failure_atol=0.05, fom_rtol=0.1, seed=5)
+    serial  = tolerance_analysis(_window(), tols, workers=1, **kwargs)
+    pooled  = tolerance_analysis(_window(), tols, workers=3, **kwargs)
+    assert serial.converged and serial.n_samples == pooled.n_samples == 4000
+    assert np.array_equal(serial.fom, pooled.fom)
+    assert serial.fom_std == pytest.approx(np.std(serial.fom), rel=1e-9)
+
+def test_thin_layer_never_negative():
+    tols   = [Tolerance("Light Block.thickness", 1.0, relative=True)]
+    result = tolerance_analysis(_window(), tols, batch_size=5000, min_samples=5000, max_samples=5000, seed=2)
+
+    # About one sample in six would otherwise have a negative thickness; those now lose the layer
+    bare = _window()
+    bare.layers[2].thickness = 0
+    assert result.fom.max() == pytest.approx(bare.to_xray_window().transmission(np.array(OPT_ENERGIES)).sum())
@@ -1,5 +1,10 @@
+import numpy as np
+import pytest
+from xraywindow.transmission import XRaySpectrum
 from xraywindow.mechanical import MechanicalWindow, BeamLayer, RectangularMembraneLayer
 from xraywindow.material   import Material
+from xraywindow.engine     import AttenuationEngine
+from xraywindow.instrument import profile
 
 def test_membrane_transmission():
     silicon    = Material("silicon", 150e9, 7000e6, 0.17)
@@ -7,4 +12,116 @@ def test_membrane_transmission():
     xray_layer = membrane.to_xray_window_layer()
 
     # Transmission should not be the same at vastly different energies
-    assert xray_layer.transmission(50) != xray_layer.transmission(5000)
\ No newline at end of file
+    assert xray_layer.transmission(50) != xray_layer.transmission(5000)
+
+def test_spectrum_integration():
+    energy   = np.arange(10, 101, dtype=float)
+    spectrum = XRaySpectrum(energy, energy / 100)
+
+    # The spectrum is linear, so the piecewise-linear integral is exact
+    assert spectrum.integrate(20.5, 30.25) == pytest.approx((30.25**2 - 20.5**2) / 200)
+    assert spectrum.integrate() == pytest.approx((100**2 - 10**2) / 200)
+    assert spectrum.integrate_bands([10, 20, 55.5]) == pytest.approx([1.5, (55.5**2 - 20**2) / 200])
+    assert spectrum.integrate([10, 20], [20, 55.5]) == pytest.approx([1.5, (55.5**2 - 20**2) / 200])
+
+    # Point sums interpolate the same piecewise-linear spectrum
+    assert spectrum.integrate(energies=[20.5, 55.25]) == pytest.approx(0.7575)
+    assert (spectrum.min_energy, spectrum.max_energy) == (10, 100)
+
+def test_spectra_share_energy_grid():
+    silicon = Material("silicon", 150e9, 7000e6, 0.17)
+    window  = MechanicalWindow()
+    window.add_layer(RectangularMembraneLayer("Membrane", silicon, 100e-6, 100e-9))
+    window  = window.to_xray_window()
+
+    first, second = window.spectrum(), window.spectrum()
+    compact       = window.spectrum(dtype=np.float32)
+    assert first.energy is second.energy is compact.energy
+    assert not hasattr(first, "__dict__")
+
+    assert compact.transmission.dtype == np.float32
+    assert compact.transmission.nbytes == first.transmission.nbytes // 2
+    assert compact.integrate(100, 1000) == pytest.approx(first.integrate(100, 1000), rel=1e-6)
+
+def _reference(window, energy):
+    return AttenuationEngine.from_window(window, energy).transmission(
+        [layer.thickness for layer in window.layers], [layer.open_area for layer in window.layers],
+    )
+
+def test_incremental_transmission():
+    silicon  = Material("silicon", 150e9, 7000e6, 0.17)
+    polymer  = Material("polymer", 9e9, 200e6, 0.22)
+    aluminum = Material("aluminum", 25e9, 190e6, 0.3)
+
+    mech = MechanicalWindow()
+    mech.add_layer(BeamLayer("Primary", silicon, 190e-6, 60e-6, 10.2e-3, 380e-6))
+    mech.add_layer(RectangularMembraneLayer("Membrane", polymer, 190e-6, 300e-9))
+    mech.add_layer(RectangularMembraneLayer("Light Block", aluminum, thickness=30e-9))
+    window = mech.to_xray_window().track_edits()
+    energy = np.arange(10, 10000, dtype=float)
+
+    with profile() as p:
+        first = window.transmission()
+        assert np.array_equal(window.transmission(), first)
+    assert p.calls["XRayWindowLayer evaluated"] == 3
+
+    # Changing one layer, again and again, evaluates only that layer
+    with profile() as p:
+        for t in [310e-9, 320e-9, 330e-9]:
+            window.layers[1].thickness = t
+            assert np.allclose(window.transmission(), _reference(window, energy), rtol=1e-12, atol=0)
+        window.layers[0].open_area = 0.5
+        assert np.allclose(window.transmission(), _reference(window, energy), rtol=1e-12, atol=0)
+    assert p.calls["XRayWindowLayer evaluated"] == 4
+
+    # Adding a layer evaluates just the new one
+    gas = RectangularMembraneLayer("Gas Barrier", Material("boron", 400e9, 3.6e9, 0.17), thickness=20e-9).to_xray_window_layer()
+    with profile() as p:
+        window.add_layer(gas)
+        assert np.allclose(window.transmission(), _reference(window, energy), rtol=1e-12, atol=0)
+        window.layers.pop(0)
+        assert np.allclose(window.transmission(), _reference(window, energy), rtol=1e-12, atol=0)
+    assert p.calls["XRayWindowLayer evaluated"] == 1
+
+    # Results handed out are copies, and scalar energies still give scalars
+    window.transmission()[:] = 0
+    assert window.transmission().min() > 0
+    assert np.ndim(window.transmission(277.0)) == 0
+
+    # Cleared results are rebuilt from scratch
+    window.clear_cache()
+    assert window.cache_nbytes == 0
+    with profile() as p:
+        window.transmission()
+    assert p.calls["XRayWindowLayer evaluated"] == len(window.layers)
+
+def test_windows_retain_no_results():
+    import gc
+    import tracemalloc
+
+    silicon = Material("silicon", 150e9, 7000e6, 0.17)
+    polymer = Material("polymer", 9e9, 200e6, 0.22)
+    mech    = MechanicalWindow()
+    mech.add_layer(BeamLayer("Primary", silicon, 190e-6, 60e-6, 10.2e-3, 380e-6))
+    mech.add_layer(RectangularMembraneLayer("Membrane", polymer, 190e-6, 300e-9))
+
+    windows = [mech.to_xray_window() for _ in range(50)]
+    windows[0].spectrum()  # Material attenuation on the default grid is cached once, shared
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for window in windows:
+        window.transmission()
+        window.spectrum(dtype=np.float32)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    assert retained / len(windows) < 1024
+
+    # Tracking windows keep at most MAX_GRIDS grids of per-layer results
+    tracked = mech.to_xray_window().track_edits()
+    for n in range(6):
+        tracked.transmission(range(10, 1000 + n))
+    assert tracked.cache_nbytes <= tracked.MAX_GRIDS * (len(tracked.layers) + 2) * 1000 * 8
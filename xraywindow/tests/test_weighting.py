@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from xraywindow.optimize  import example_designs
+from xraywindow.weighting import WeightSet, line_weights, band_weights
+
+def test_line_weights_interpolate():
+    energy = np.arange(10, 100, dtype=float)
+    trans  = np.linspace(0, 1, len(energy))
+    lines  = [12.5, 54.33]
+    assert line_weights(energy, lines) @ trans == pytest.approx(np.interp(lines, energy, trans).sum())
+
+def test_band_weights_partial_intervals():
+    energy = np.arange(0, 11, dtype=float)
+    # Integral of f(E) = E from 2.5 to 7.25 (exact for a linear function)
+    assert band_weights(energy, 2.5, 7.25) @ energy == pytest.approx((7.25**2 - 2.5**2) / 2)
+    assert band_weights(energy) @ np.ones(len(energy)) == pytest.approx(10)
+
+def test_weighted_design_evaluation():
+    design  = example_designs()["two_layer_polymer"]
+    weights = WeightSet(design.energies)
+    weights.add_lines("lines", design.energies)
+    weights.add_band("detector", 100, 1000, source=lambda e: 1 / e, detector=([0, 500, 2000], [0.2, 0.9, 0.9]), normalize=True)
+
+    params   = np.array([[200e-6], [1000e-6]])
+    fom, _   = design.evaluate(params)
+    profiles = design.evaluate_profiles(params, weights)
+
+    assert profiles.shape == (2, 2)
+    assert profiles[:, 0] == pytest.approx(fom)
+    assert np.all((profiles[:, 1] > 0) & (profiles[:, 1] < 1))
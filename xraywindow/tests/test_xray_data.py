@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from xraywindow.xray_data import *
 
@@ -20,5 +21,18 @@ def test_xray_data_transmission():
 def test_xray_data_transmission_interpolation():
     mat = "test_xray_data"
     xd  = XRayData(mat)
-    # Transmission at 10.5 eV should be 0.105 for 100 nm
-    assert xd.transmission(10.5, 100e-9) == pytest.approx(0.105)
\ No newline at end of file
+    # Interpolation is linear in log-transmission, so at 10.5 eV the transmission
+    # through 100 nm is the geometric mean of 0.10 and 0.11
+    assert xd.transmission(10.5, 100e-9) == pytest.approx((0.10 * 0.11)**0.5)
+def test_attenuation_cache_bounded():
+    xd = XRayData("silicon")
+    for e in range(100, 100 + 3 * MAX_CACHED_GRIDS):
+        xd.attenuation([float(e)])
+    assert len(xd._attenuation_cache) == MAX_CACHED_GRIDS
+
+    # The most recently used grid stays
+    grid = np.arange(10, 10000, dtype=float)
+    mu   = xd.attenuation(grid)
+    for e in range(MAX_CACHED_GRIDS - 1):
+        xd.attenuation([200.0 + e])
+    assert xd.attenuation(grid) is mu
@@ -0,0 +1,216 @@
+'''Monte Carlo yield analysis of a MechanicalWindow under manufacturing variation.
+
+    result = tolerance_analysis(mech_win, [
+        Tolerance("Primary.width", 2e-6),                       # normal, sigma in meters
+        Tolerance("Primary.height", 0.02, relative=True),       # etch depth, 2 %
+        Tolerance("Membrane.thickness", 0.05, relative=True),
+        Tolerance("Primary.fail_stress", 0.1, relative=True),   # batch-to-batch strength
+    ], seed=0)
+    result.failure_probability, result.quantile([0.05, 0.5, 0.95])
+
+Samples are drawn in batches. Each batch goes through the array layers and the
+AttenuationEngine in one vectorized pass. Sampling stops when the standard errors of the
+failure probability and of the mean figure of merit reach their tolerances. With
+`workers`, the batches of each round are spread over a process pool. The figure of merit
+statistics are combined batch by batch (Chan et al.'s pairwise update), so its standard
+deviation does not lose precision to cancellation however many samples are drawn.'''
+import multiprocessing
+import numpy as np
+
+from xraywindow.engine     import AttenuationEngine
+from xraywindow.population import OPT_ENERGIES
+from xraywindow.mechanical import layer_arrays, layer_attributes, checked_layers
+
+class Tolerance:
+    '''Random variation of one layer attribute ("Layer.attribute"; geometry or fail_stress,
+    modulus, poisson) around its nominal value. `spread` is the standard deviation of a
+    "normal" distribution or the half-width of a "uniform" one, in the attribute's units or,
+    if `relative`, as a fraction of the nominal value. A normal distribution is cut off at
+    `clip` spreads either side, and samples never go below zero, since every attribute that
+    can vary is a positive quantity. A thin layer with a wide spread therefore sometimes
+    vanishes rather than taking a negative thickness.'''
+    def __init__(self, target, spread, distribution="normal", relative=False, clip=4):
+        if distribution not in ("normal", "uniform"):
+            raise ValueError(f"Unknown distribution '{distribution}'.")
+
+        self.layer_name, self.attribute = target.rsplit(".", 1)
+        self.target       = target
+        self.spread       = spread
+        self.distribution = distribution
+        self.relative     = relative
+        self.clip         = clip
+
+    def sample(self, rng, nominal, n):
+        spread = self.spread * nominal if self.relative else self.spread
+        if self.distribution == "normal":
+            z = np.clip(rng.standard_normal(n), -self.clip, self.clip)
+        else:
+            z = rng.uniform(-1, 1, n)
+        return np.maximum(nominal + spread * z, 0)
+
+class ToleranceResult:
+    '''Outcome of a tolerance analysis. `fom` holds the figure of merit of every sample (when
+    kept) and `failed` whether each one failed.'''
+    def __init__(self, n_samples, n_failed, fom_mean, fom_std, fom=None, failed=None, converged=False):
+        self.n_samples  = n_samples
+        self.n_failed   = n_failed
+        self.fom        = fom
+        self.failed     = failed
+        self.converged  = converged
+        self.fom_mean   = fom_mean
+        self.fom_std    = fom_std
+
+    @property
+    def failure_probability(self):
+        return self.n_failed / self.n_samples
+
+    @property
+    def failure_stderr(self):
+        return _proportion_stderr(self.n_failed, self.n_samples)
+
+    @property
+    def fom_stderr(self):
+        return self.fom_std / np.sqrt(self.n_samples)
+
+    def quantile(self, q, survivors=False):
+        '''Quantiles of the figure of merit over all samples, or only over those that held.'''
+        if self.fom is None:
+            raise ValueError("Samples were not kept; run with keep_samples=True.")
+        return np.quantile(self.fom[~self.failed] if survivors else self.fom, q)
+
+    def __repr__(self):
+        return (
+            f"ToleranceResult | {self.n_samples} samples | P(fail) {self.failure_probability:.4g} ± {self.failure_stderr:.2g} | "
+            f"FOM {self.fom_mean:.4g} ± {self.fom_std:.2g}{'' if self.converged else ' | not converged'}"
+        )
+
+def _proportion_stderr(k, n):
+    # Never report zero uncertainty just because no failure has been seen yet
+    p = k / n
+    return np.sqrt(max(p * (1 - p), 1 / n) / n)
+
+def _combine(n, mean, m2, values):
+    '''Count, mean and sum of squared deviations of a sample of size `n` extended by
+    `values` (Chan, Golub and LeVeque's pairwise update).'''
+    n_new  = len(values)
+    total  = n + n_new
+    m_new  = values.mean()
+    delta  = m_new - mean
+    mean  += delta * n_new / total
+    m2    += ((values - m_new)**2).sum() + delta**2 * n * n_new / total
+    return total, mean, m2
+
+class ToleranceSampler:
+    '''Draws and evaluates batches of perturbed windows. It pickles without its engine, so it
+    can be sent to worker processes.'''
+    def __init__(self, window, tolerances, energies=OPT_ENERGIES, weights=None):
+        self.layers     = list(window.layers)
+        self.tolerances = list(tolerances)
+        self.energies   = np.asarray(energies, dtype=float)
+        self.weights    = np.ones(len(self.energies)) if weights is None else np.asarray(weights, dtype=float)
+
+        index = {layer.name: i for i, layer in enumerate(self.layers)}
+        self._targets = []
+        for tol in self.tolerances:
+            if tol.layer_name not in index:
+                raise ValueError(f"The window has no layer named '{tol.layer_name}'.")
+            layer = self.layers[index[tol.layer_name]]
+            if tol.attribute not in layer_attributes(layer):
+                raise ValueError(f"{type(layer).__name__} '{layer.name}' has no attribute '{tol.attribute}' to vary.")
+            self._targets.append((index[tol.layer_name], tol.attribute, getattr(layer, tol.attribute)))
+
+        self._checked = checked_layers(self.layers)
+        self._engine  = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_engine"] = None
+        return state
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = AttenuationEngine([layer.material.get_xray_data() for layer in self.layers], self.energies)
+        return self._engine
+
+    def __call__(self, n, seed=None):
+        '''Figure of merit and failure mask for `n` random windows.'''
+        rng     = np.random.default_rng(seed)
+        columns = {}
+        for tol, (i, attr, nominal) in zip(self.tolerances, self._targets):
+            columns[i, attr] = tol.sample(rng, nominal, n)
+
+        arrays   = layer_arrays(self.layers, columns)
+        failed   = np.zeros(n, dtype=bool)
+        for array, checked in zip(arrays, self._checked):
+            if checked:
+                failed |= array.failure()
+
+        thickness = np.column_stack([np.broadcast_to(a.xray_thickness(), n) for a in arrays])
+        open_area = np.column_stack([np.broadcast_to(a.open_area(), n) for a in arrays])
+        fom       = self.engine.transmission(thickness, open_area) @ self.weights
+        return fom, failed
+
+def _evaluate_batch(args):
+    sampler, n, seed = args
+    return sampler(n, seed)
+
+def tolerance_analysis(
+    window,
+    tolerances,
+    energies      = OPT_ENERGIES,
+    weights       = None,
+    batch_size    = 100_000,
+    min_samples   = 100_000,
+    max_samples   = 10_000_000,
+    failure_atol  = 1e-3,
+    fom_rtol      = 1e-4,
+    workers       = 1,
+    keep_samples  = True,
+    seed          = None,
+):
+    '''Sample `window` (a MechanicalWindow) with each Tolerance applied independently, and
+    return a ToleranceResult.
+
+    The figure of merit is `weights @ T(energies)` (by default the summed transmission at
+    `energies`) and a sample fails if any supported layer is overstressed. Sampling stops once
+    at least `min_samples` are drawn and the standard error of the failure probability is
+    below `failure_atol` and that of the mean figure of merit below `fom_rtol` times the mean,
+    or at `max_samples`. With `workers` > 1, each round evaluates that many batches on a
+    process pool. Every batch has its own seed spawned from `seed`, and the stopping rule is
+    checked after each batch in order, discarding any batches of the round beyond the one
+    that converged. The result therefore does not depend on the number of workers.'''
+    sampler = ToleranceSampler(window, tolerances, energies, weights)
+    seeds   = np.random.SeedSequence(seed)
+    workers = workers if workers > 0 else multiprocessing.cpu_count()
+    pool    = multiprocessing.get_context().Pool(workers) if workers > 1 else None
+
+    n, n_failed, fom_mean, fom_m2 = 0, 0, 0.0, 0.0
+    kept_fom, kept_failed = [], []
+    converged = False
+    try:
+        while n < max_samples and not converged:
+            sizes = [min(batch_size, max_samples - n - k * batch_size) for k in range(workers)]
+            tasks = [(sampler, size, s) for size, s in zip(sizes, seeds.spawn(workers)) if size > 0]
+            for fom, failed in (pool.map(_evaluate_batch, tasks) if pool else map(_evaluate_batch, tasks)):
+                n, fom_mean, fom_m2 = _combine(n, fom_mean, fom_m2, fom)
+                n_failed += int(failed.sum())
+                if keep_samples:
+                    kept_fom.append(fom)
+                    kept_failed.append(failed)
+
+                fom_err   = np.sqrt(fom_m2 / n / n)
+                converged = n >= min_samples and _proportion_stderr(n_failed, n) <= failure_atol and fom_err <= fom_rtol * abs(fom_mean)
+                if converged:
+                    break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return ToleranceResult(
+        n, n_failed, fom_mean, np.sqrt(fom_m2 / n),
+        fom       = np.concatenate(kept_fom) if keep_samples else None,
+        failed    = np.concatenate(kept_failed) if keep_samples else None,
+        converged = converged,
+    )
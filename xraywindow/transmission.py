@@ -1,55 +1,96 @@
 import numpy as np
-import pandas as pd
-import scipy.integrate as integrate
-from scipy.interpolate import interp1d
+
+from xraywindow.engine      import AttenuationEngine, energy_grid
+from xraywindow.xray_data   import grid_key
+from xraywindow.grid        import adaptive_grid
+from xraywindow.interpolate import LogInterpolator
+from xraywindow.instrument  import instrumented, count
+from xraywindow.cache       import design_key
 
 #from xraywindow.mechanical import BeamLayer
 
 class XRaySpectrum:
-    '''X-ray spectrum information.'''
-    def __init__(self, energy=None, transmission=None, spectrum=None):
+    '''X-ray spectrum information.
+
+    `energy` is kept as given when it is already a float array, so spectra built on one grid
+    share it rather than each holding a copy. `dtype` sets how the transmission is stored,
+    e.g. np.float32 to halve its size. `min_energy` and `max_energy` are the ends of the
+    spectrum.'''
+    __slots__ = ("energy", "transmission", "min_energy", "max_energy", "_interp_trans", "_cumulative")
+
+    def __init__(self, energy=None, transmission=None, spectrum=None, dtype=float):
         if spectrum is not None:
             energy       = spectrum[:, 0]
             transmission = spectrum[:, 1]
             
-        self.energy       = np.array(energy)
-        self.transmission = np.array(transmission)
-        
-        self.interp_trans = interp1d(self.energy, self.transmission)
+        self.energy       = np.asarray(energy, dtype=float)
+        self.transmission = np.asarray(transmission, dtype=dtype)
+
+        self.min_energy = self.energy[0]
+        self.max_energy = self.energy[-1]
         
-        self.last_integration = None
-        self.min_energy       = -np.inf
-        self.max_energy       = np.inf
+        self._interp_trans = None  # Built on the first query
+        self._cumulative   = None  # Built on the first integration
+    
+    @property
+    def interp_trans(self):
+        '''Interpolator over the spectrum, built on first use.'''
+        if self._interp_trans is None:
+            self._interp_trans = LogInterpolator(self.energy, self.transmission)
+        return self._interp_trans
     
     def spectrum(self):
         return np.stack([self.energy, self.transmission]).T
     
     def df(self):
+        import pandas as pd
         df = pd.DataFrame(columns=['Energy', 'Transmission'], data=self.spectrum())
         return df
     
-    def integrate(self, min_energy=-np.inf, max_energy=np.inf, energies=None):
-        # Check if we need to integrate again
-        #if self.last_integration is not None and self.min_energy == min_energy and self.max_energy == max_energy:
-        #    return self.last_integration
+    def cumulative(self, energy):
+        '''Integral of the transmission from the first energy up to `energy` (clipped to the
+        spectrum), treating the spectrum as piecewise linear. Uses a prefix-sum index built on
+        first use, so each query costs one binary search.'''
+        e, t = self.energy, self.transmission
+        if self._cumulative is None:
+            self._cumulative = np.concatenate([[0.0], np.cumsum(np.diff(e) * (t[1:] + t[:-1]) / 2, dtype=float)])
         
-        if energies is None:
-            self.min_energy, self.max_energy = min_energy, max_energy
-            e = self.energy[(self.energy >= min_energy) & (self.energy <= max_energy)]
-            t = self.transmission[(self.energy >= min_energy) & (self.energy <= max_energy)]
-            
-            self.last_integration = integrate.simps(t, e)
-        else: # Assume energies is a list
-            e = energies
-            t = self.interp_trans(e)
-            
-            self.last_integration = t.sum()   
+        energy = np.clip(np.asarray(energy, dtype=float), e[0], e[-1])
+        j      = np.clip(np.searchsorted(e, energy, side="right") - 1, 0, len(e) - 2)
+        dx     = energy - e[j]
+        slope  = (t[j + 1] - t[j]) / (e[j + 1] - e[j])
         
-        return self.last_integration
+        return self._cumulative[j] + dx * (t[j] + slope * dx / 2)
+    
+    @instrumented
+    def integrate(self, min_energy=-np.inf, max_energy=np.inf, energies=None):
+        '''Integrate the transmission between `min_energy` and `max_energy` (eV), including
+        partial intervals at either end. Both may be arrays to integrate many ranges at once.
+        If `energies` is given, return the sum of the transmission at those energies instead,
+        interpolated linearly like the integrals.'''
+        if energies is None:
+            return self.cumulative(max_energy) - self.cumulative(min_energy)
+
+        energies = np.asarray(energies, dtype=float)
+        if np.any(energies < self.min_energy) or np.any(energies > self.max_energy):
+            raise ValueError("A value in energies is outside the spectrum.")
+
+        return np.interp(energies, self.energy, self.transmission).sum()
+    
+    def integrate_bands(self, edges):
+        '''Integrals over consecutive bands, [edges[0], edges[1]], [edges[1], edges[2]], ...'''
+        return np.diff(self.cumulative(edges))
 
 class XRayWindowLayer:
-    '''Class that represents a layer in an x-ray window.'''
+    '''Class that represents a layer in an x-ray window. `version` goes up whenever the
+    material, thickness or open area changes, so windows know to re-evaluate the layer.'''
+    __slots__ = ("layer_name", "xray_data", "thickness", "open_area", "mat_name", "mech_layer", "version")
+
+    # Attributes that change the layer's transmission
+    _TRACKED = frozenset(("xray_data", "thickness", "open_area"))
+
     def __init__(self, layer_name, xray_data, thickness, open_area, mech_layer, mat_name=""):
+        self.version    = 0
         self.layer_name = layer_name
         self.xray_data  = xray_data
         # TODO: Old method used microns for distance. We're using meters. Fix to be consistent (use meters).
@@ -58,15 +99,40 @@ class XRayWindowLayer:
         self.mat_name   = mat_name
         self.mech_layer = mech_layer
         
+    def __setattr__(self, name, value):
+        if name in self._TRACKED:
+            object.__setattr__(self, "version", getattr(self, "version", 0) + 1)
+        object.__setattr__(self, name, value)
+
     # def transmission(self, energy):
     #     '''Calculates sum of transmission through material and open area.'''
     #     return (1 - self.open_area) * self.xray_data.transmission(energy, self.thickness) + self.open_area
 
+    @instrumented
     def transmission(self, energy):
         '''Calculates sum of transmission through material and open area.'''
         # TODO: Vectorize 'energy'!
         return (1 - self.open_area) * self.xray_data.transmission(energy, self.thickness) + self.open_area
     
+    def transmission_on_grid(self, energy):
+        '''Transmission on an energy grid (a float array) from the material's cached
+        attenuation on that grid.'''
+        count("XRayWindowLayer evaluated")
+        trans = np.exp(-self.thickness * self.xray_data.attenuation(energy))
+        if self.open_area:
+            trans = (1 - self.open_area) * trans + self.open_area
+        return trans
+    
+    def design(self):
+        '''Canonical description of the layer: material, x-ray data version, thickness and
+        open area.'''
+        return {
+            "material":  self.xray_data.material_name,
+            "data":      self.xray_data.version,
+            "thickness": float(self.thickness),
+            "open_area": float(self.open_area),
+        }
+
     def thick_str(self, t = None):
         if t is None:
             t   = self.thickness*1e6
@@ -83,14 +149,43 @@ class XRayWindowLayer:
     def __repr__(self):
         return f"{self.layer_name} ({self.mat_name}):\t{self.thick_str()} | OA {self.open_area*100:4.1f}%"
 
+class _GridCache:
+    '''Per-layer transmission of a window on one energy grid, with the versions of the
+    layers they were computed from, the total, and the product of all layers but one.'''
+    __slots__ = ("energy", "layers", "versions", "factors", "total", "rest_index", "rest")
+
+    def __init__(self, energy):
+        self.energy     = energy
+        self.layers     = ()
+        self.versions   = []
+        self.factors    = []
+        self.total      = None
+        self.rest_index = None
+        self.rest       = None
+
 class XRayWindow:
     '''Class that represents a collection of layers that together make up an 
-    x-ray window.'''
+    x-ray window.
+
+    By default a window keeps nothing between transmission() calls. After `track_edits()`,
+    transmission on each energy grid is kept per layer, and when layers change (through their
+    attributes, or by adding, removing or replacing them) only those layers are evaluated
+    again. When the same single layer keeps changing, as in a one-layer sweep, the product of
+    all the other layers is kept too, so each step costs one layer evaluation. That costs
+    (n_layers + 2) arrays per grid, so it is meant for windows that are edited repeatedly,
+    not for windows that are only kept around.'''
+    __slots__ = ("layers", "name", "plot", "line_color", "_grids")
+
+    # Energy grids whose per-layer results are kept by a window that tracks edits
+    MAX_GRIDS = 4
+
     def __init__(self):
         self.layers = []
         self.name = ""
         self.plot = True  # Set to false if this window shouldn't be plotted
         self.line_color = None # Line color for plot
+        self._grids = None  # Per-grid results, once track_edits() is called
+        count("XRayWindow built")
         return
     
     def add_layer(self, layer):
@@ -117,24 +212,135 @@ class XRayWindow:
     #         total *= layer.transmission(energy)
     #     return total
     
+    def design(self):
+        '''Canonical description of the window, independent of names and plot settings.'''
+        return {"type": "XRayWindow", "layers": [layer.design() for layer in self.layers]}
+
+    def design_key(self):
+        '''Hash of `design()`: equal for windows that transmit the same.'''
+        return design_key(self.design())
+
+    def track_edits(self):
+        '''Keep per-layer results between transmission() calls, so that later calls only
+        evaluate the layers changed since (see the class docstring). Returns the window.'''
+        if self._grids is None:
+            self._grids = {}
+        return self
+
+    def clear_cache(self):
+        '''Drop the results kept by track_edits(); the window keeps tracking edits.'''
+        if self._grids is not None:
+            self._grids.clear()
+
+    @property
+    def cache_nbytes(self):
+        '''Memory held by results kept between transmission() calls.'''
+        if not self._grids:
+            return 0
+        arrays = []
+        for cache in self._grids.values():
+            arrays += [f for f in cache.factors if f is not None] + [cache.total, cache.rest]
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    @instrumented
     def transmission(self, energy=range(10, 10000)):
-        '''Calculates the transmission of the x-ray window stack as a fraction.'''
-        if isinstance(energy, int):
-            total = 1
+        '''Calculates the transmission of the x-ray window stack as a fraction. With
+        track_edits(), only layers changed since the last call on the same grid are
+        evaluated again.'''
+        grid   = energy_grid(energy)
+        energy = np.atleast_1d(grid)
+        if self._grids is None:
+            total = self._product(energy)
         else:
-            total = np.ones(len(energy))
-        
+            total = self._total(energy).copy()
+
+        if grid.ndim == 0:
+            return total[0]
+        return total
+
+    def _product(self, energy):
+        total = np.ones(len(energy))
         for layer in self.layers:
-            total *= layer.transmission(energy)
+            total *= layer.transmission_on_grid(energy)
         return total
 
-    def spectrum(self, energy=range(10,10000)):
-        '''Return the transmission spectrum of the window. Energy should be in eV.'''
+    def _grid_cache(self, energy):
+        # Shared read-only grids (see energy_grid) are recognized without hashing them
+        for key, cache in self._grids.items():
+            if cache.energy is energy and not energy.flags.writeable:
+                break
+        else:
+            key   = grid_key(energy)
+            cache = self._grids.get(key) or _GridCache(energy)
+
+        self._grids.pop(key, None)
+        self._grids[key] = cache
+        while len(self._grids) > self.MAX_GRIDS:
+            del self._grids[next(iter(self._grids))]
+        return cache
+
+    def _total(self, energy):
+        cache = self._grid_cache(energy)
+
+        layers   = tuple(self.layers)
+        versions = [layer.version for layer in layers]
+        if len(layers) != len(cache.layers) or any(a is not b for a, b in zip(layers, cache.layers)):
+            # Layers added, removed or replaced: keep what still matches position by position
+            old = {id(layer): (v, f) for layer, v, f in zip(cache.layers, cache.versions, cache.factors)}
+            cache.factors    = [old[id(layer)][1] if id(layer) in old and old[id(layer)][0] == v else None for layer, v in zip(layers, versions)]
+            cache.versions   = [v if f is not None else None for v, f in zip(versions, cache.factors)]
+            cache.layers     = layers
+            cache.total      = None
+            cache.rest_index = None
+
+        changed = [i for i, v in enumerate(versions) if cache.versions[i] != v]
+        if not changed and cache.total is not None:
+            return cache.total
+
+        for i in changed:
+            cache.factors[i]  = layers[i].transmission_on_grid(energy)
+            cache.versions[i] = versions[i]
+
+        if len(changed) == 1 and cache.total is not None and len(layers) > 1:
+            i = changed[0]
+            if cache.rest_index != i:
+                cache.rest_index = i
+                cache.rest       = np.prod([f for j, f in enumerate(cache.factors) if j != i], axis=0)
+            cache.total = cache.rest * cache.factors[i]
+        else:
+            cache.rest_index = None
+            cache.total      = np.prod(cache.factors, axis=0) if layers else np.ones(len(energy))
+
+        return cache.total
+
+    def transmission_and_jacobian(self, energy=range(10, 10000)):
+        '''Transmission and its derivatives with respect to each layer's thickness and open
+        area, each of shape (n_layers, n_energy).'''
+        engine = AttenuationEngine.from_window(self, np.atleast_1d(energy))
+        return engine.transmission_and_jacobian(
+            [layer.thickness for layer in self.layers],
+            [layer.open_area for layer in self.layers],
+        )
+
+    @instrumented
+    def spectrum(self, energy=range(10,10000), dtype=float, tol=None):
+        '''Return the transmission spectrum of the window. Energy should be in eV. Spectra
+        over equal ranges share one energy array; `dtype` sets the storage of the
+        transmission (see XRaySpectrum).
+
+        With `tol`, the spectrum is instead sampled on an adaptive grid spanning `energy`,
+        dense only where the layers' materials need it, so that interpolating or integrating
+        it stays within about `tol` of the transmission (see xraywindow.grid). A window
+        without layers transmits everything and keeps the plain grid.'''
         #return energy,list(map(self.transmission, energy))
         #return list(zip(list(energy),list(map(self.transmission, energy))))
         #trans    = list(map(self.transmission, energy))
+        energy = energy_grid(energy)
+        if tol is not None and self.layers:
+            energy = adaptive_grid([layer.xray_data for layer in self.layers], tol, energy[0], energy[-1])
+
         trans = self.transmission(energy)
-        return XRaySpectrum(list(energy), trans)
+        return XRaySpectrum(energy, trans, dtype=dtype)
         #return np.stack([np.array(energy), trans]).T
         
     def __repr__(self):
@@ -277,4 +483,4 @@ class XRayWindow:
     #     ax.axis('scaled')
     #     ax.axis('off')
 
-    #     return ax
\ No newline at end of file
+    #     return ax
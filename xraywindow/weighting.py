@@ -0,0 +1,116 @@
+'''Source- and detector-weighted figures of merit, precompiled onto an energy grid.
+
+A figure of merit is a linear functional of the transmission spectrum, so it can be written
+as a weight vector on the grid the transmission is evaluated on. A WeightSet builds those
+vectors once (quadrature, source spectrum, detector efficiency and all). After that, scoring
+any number of windows against any number of profiles is a single matrix product with no
+masking, resampling or Simpson call.'''
+import numpy as np
+
+# Characteristic lines (eV) of the light elements a window is usually judged by
+ELEMENT_LINES = {"Li": 54.33, "Be": 108.5, "B": 183.3, "C": 277, "N": 392.4, "O": 524.9, "Si": 1739.9}
+
+def _resample(curve, energy):
+    '''Evaluate a weighting curve on `energy`. `curve` is None (no weighting), a callable of
+    energy, or an (energies, values) pair which is interpolated linearly and is zero outside
+    its range.'''
+    if curve is None:
+        return np.ones(len(energy))
+    if callable(curve):
+        return np.asarray(curve(energy), dtype=float) * np.ones(len(energy))
+
+    e, v = (np.asarray(c, dtype=float) for c in curve)
+    return np.interp(energy, e, v, left=0, right=0)
+
+def line_weights(energy, lines, intensities=None):
+    '''Weights w such that w @ T equals the sum of intensity * T(line) with T interpolated
+    linearly between grid points.'''
+    energy = np.asarray(energy, dtype=float)
+    lines  = np.atleast_1d(np.asarray(lines, dtype=float))
+    if intensities is None:
+        intensities = np.ones(len(lines))
+
+    if np.any(lines < energy[0]) or np.any(lines > energy[-1]):
+        raise ValueError("Every line must lie within the energy grid.")
+
+    j    = np.clip(np.searchsorted(energy, lines, side="right") - 1, 0, len(energy) - 2)
+    frac = (lines - energy[j]) / (energy[j + 1] - energy[j])
+
+    weights = np.zeros(len(energy))
+    np.add.at(weights, j, (1 - frac) * intensities)
+    np.add.at(weights, j + 1, frac * intensities)
+    return weights
+
+def band_weights(energy, min_energy=-np.inf, max_energy=np.inf):
+    '''Quadrature weights w such that w @ f is the integral, from `min_energy` to
+    `max_energy`, of the linear interpolant of f sampled on `energy`. Partial intervals at
+    either end are included exactly.'''
+    energy = np.asarray(energy, dtype=float)
+    x0, x1 = energy[:-1], energy[1:]
+    h      = x1 - x0
+
+    lo = np.clip(min_energy, x0, x1)
+    hi = np.clip(max_energy, x0, x1)
+    hi = np.maximum(hi, lo)
+
+    weights = np.zeros(len(energy))
+    weights[:-1] += ((x1 - lo)**2 - (x1 - hi)**2) / (2 * h)
+    weights[1:]  += ((hi - x0)**2 - (lo - x0)**2) / (2 * h)
+    return weights
+
+class WeightSet:
+    '''A set of named weight profiles compiled onto one energy grid.'''
+    def __init__(self, energy):
+        self.energy  = np.asarray(energy, dtype=float)
+        self.names   = []
+        self._rows   = []
+        self._matrix = None
+
+    def add(self, name, weights):
+        '''Add a precomputed weight vector.'''
+        weights = np.asarray(weights, dtype=float)
+        if weights.shape != self.energy.shape:
+            raise ValueError(f"Weights must have shape {self.energy.shape}, got {weights.shape}.")
+
+        self.names.append(name)
+        self._rows.append(weights)
+        self._matrix = None
+        return self
+
+    def add_lines(self, name, lines=None, intensities=None, detector=None):
+        '''Transmission summed over emission lines (default: ELEMENT_LINES), each scaled by
+        its intensity and the detector efficiency at that line.'''
+        if lines is None:
+            lines = list(ELEMENT_LINES.values())
+
+        lines       = np.atleast_1d(np.asarray(lines, dtype=float))
+        intensities = np.ones(len(lines)) if intensities is None else np.asarray(intensities, dtype=float)
+        intensities = intensities * _resample(detector, lines)
+        return self.add(name, line_weights(self.energy, lines, intensities))
+
+    def add_band(self, name, min_energy=-np.inf, max_energy=np.inf, source=None, detector=None, normalize=False):
+        '''Integral of source * detector * transmission over an energy band. With `normalize`
+        the weights sum to one, giving a source-weighted mean transmission.'''
+        weights = band_weights(self.energy, min_energy, max_energy) * _resample(source, self.energy) * _resample(detector, self.energy)
+        if normalize:
+            weights = weights / weights.sum()
+        return self.add(name, weights)
+
+    @property
+    def matrix(self):
+        '''Weights as a (n_profiles, n_energy) matrix.'''
+        if self._matrix is None:
+            self._matrix = np.stack(self._rows) if self._rows else np.zeros((0, len(self.energy)))
+        return self._matrix
+
+    def __getitem__(self, name):
+        return self.matrix[self.names.index(name)]
+
+    def evaluate(self, transmission):
+        '''Score transmission spectra on this grid, (..., n_energy), against every profile,
+        giving (..., n_profiles).'''
+        return np.asarray(transmission) @ self.matrix.T
+
+    def evaluate_window(self, window):
+        '''Score an XRayWindow against every profile.'''
+        return self.evaluate(window.transmission(self.energy))
@@ -1,14 +1,41 @@
 import os
-from scipy.interpolate import interp1d
-import pandas as pd
+import hashlib
+import numpy as np
+
+from xraywindow.interpolate import LogInterpolator
+from xraywindow.instrument  import instrumented
+
+# Energy grids whose attenuation each material keeps; the least recently used are dropped
+MAX_CACHED_GRIDS = 16
 
 class XRayData:
     '''This object holds the x-ray transmission data for a given material. It 
     can calculate the transmission at a specified energy and material thickness.'''
-    def __init__(self, material_name):
-        self.energies, self.transmissions, self.thickness, self.density = import_xray_data_csv(material_name)
+    def __init__(self, material_name, xray_data_dir=None):
+        energies, transmissions, thickness, density = import_xray_data_csv(material_name, xray_data_dir)
+        self._setup(material_name, energies, transmissions, thickness, density)
+
+    @classmethod
+    def from_arrays(cls, material_name, energies, transmissions, thickness, density):
+        '''Build XRayData from existing arrays (e.g. a memory-mapped bundle) without copying them.'''
+        xray_data = cls.__new__(cls)
+        xray_data._setup(material_name, energies, transmissions, thickness, density)
+        return xray_data
+
+    def _setup(self, material_name, energies, transmissions, thickness, density):
+        self._init_state(material_name, thickness, density)
+        self.energies, self.transmissions = energies, transmissions
+        self.interp_trans = LogInterpolator(self.energies, self.transmissions)
+
+    def _init_state(self, material_name, thickness, density):
+        '''State every XRayData has, however its table is held. Subclasses that do not load a
+        table call this instead of __init__.'''
         self.material_name = material_name
-        self.interp_trans = interp1d(self.energies, self.transmissions)
+        self.thickness     = thickness
+        self.density       = density
+
+        # Attenuation coefficients already resampled onto an energy grid, keyed by grid
+        self._attenuation_cache = {}
 
     # def transmission(self, energy, thickness):
     #     '''Calculate the transmission of the material with `thickness` and `energy`.'''
@@ -31,23 +58,94 @@ class XRayData:
 
     #     return T ** (thickness / self.thickness)
 
+    @instrumented
     def transmission(self, energy, thickness):
         '''Use the interpolated transmission values to estimate the transmission at a certain energy
         through a given material thickness.
         TODO: Use this interpolated method instead of what I currently do in `transmission()`'''
         return self.interp_trans(energy) ** (thickness / self.thickness)
 
+    # Content hash of the data, computed on first use (see `version`)
+    _version = None
+
+    @property
+    def version(self):
+        '''Short hash of the table contents, thickness and density. It changes whenever the
+        data does, so results derived from the table can be keyed on it.'''
+        if self._version is None:
+            self._version = self._content_hash()
+        return self._version
+
+    def _content_hash(self):
+        h = hashlib.blake2b(digest_size=8)
+        h.update(np.ascontiguousarray(self.energies, dtype=float).tobytes())
+        h.update(np.ascontiguousarray(self.transmissions, dtype=float).tobytes())
+        h.update(np.array([self.thickness, self.density], dtype=float).tobytes())
+        return h.hexdigest()
+
+    @property
+    def nbytes(self):
+        '''Approximate memory held by the tables and cached attenuation grids.'''
+        return self.energies.nbytes + self.transmissions.nbytes + sum(mu.nbytes for mu in self._attenuation_cache.values())
+
+    @instrumented
+    def attenuation(self, energy):
+        '''Linear attenuation coefficient (1/m) at each of `energy`, i.e. -ln(T)/thickness.
+        Results are cached for the last few energy grids, so repeated windows on the same
+        grid only interpolate once per material.'''
+        energy = np.asarray(energy, dtype=float)
+        return self._cached_attenuation(energy, lambda: -self.interp_trans.log(energy) / self.thickness)
+
+    def _cached_attenuation(self, energy, compute):
+        '''`compute()` for `energy`, kept for the MAX_CACHED_GRIDS most recently used grids.'''
+        key   = grid_key(energy)
+        cache = self._attenuation_cache
+        mu    = cache.pop(key, None)
+        if mu is None:
+            mu = compute()
+            mu.setflags(write=False)
+        cache[key] = mu
+        while len(cache) > MAX_CACHED_GRIDS:
+            del cache[next(iter(cache))]
+        return mu
+
+def grid_key(energy):
+    '''Hashable key that identifies an energy grid by its contents.'''
+    energy = np.ascontiguousarray(energy, dtype=float)
+    return (energy.shape, hashlib.blake2b(energy.tobytes(), digest_size=16).digest())
+
+# One read-only copy of each distinct table energy grid. Every table in data/xray has the same
+# grid, so tables derived from them (compressed, compounds) can all share one.
+_SHARED_GRIDS = {}
+
+def shared_grid(energy):
+    '''The shared read-only copy of the energy grid `energy`.'''
+    key = grid_key(energy)
+    if key not in _SHARED_GRIDS:
+        grid = np.array(energy, dtype=float)
+        grid.flags.writeable = False
+        _SHARED_GRIDS[key] = grid
+    return _SHARED_GRIDS[key]
+
+def xray_data_filename(material_name, xray_data_dir = None):
+    '''Path of the .csv file holding the x-ray data for `material_name`.'''
+    if xray_data_dir is None:
+        xray_data_dir = os.path.join("data", "xray")
+
+    return os.path.join(xray_data_dir, material_name + ".csv")
+
+@instrumented
 def import_xray_data_csv(material_name, xray_data_dir = None):
     '''Load the x-ray data from the appropriate .csv file.
     Expected columns: Energy, Transmission, Density, Thickness
     Energy should be in eV, Transmission should be a number less than 1,
     Thickness should be in meters, and density should be in kg/m^3.'''
-    if xray_data_dir is None:
-        xray_data_dir = os.path.join("data", "xray")
-
-    filename = os.path.join(xray_data_dir, material_name + ".csv")
-    df       = pd.read_csv(filename)
+    filename = xray_data_filename(material_name, xray_data_dir)
+    with open(filename, encoding="utf-8") as f:
+        columns = [c.strip() for c in f.readline().split(",")]
+        data    = np.loadtxt(f, delimiter=",", ndmin=2)
 
-    return df["Energy"].values, df["Transmission"].values, df["Thickness"].values[0], df["Density"].values[0]
+    col = {name: data[:, columns.index(name)] for name in ("Energy", "Transmission", "Thickness", "Density") if name in columns}
+    return col["Energy"], col["Transmission"], col["Thickness"][0], col["Density"][0]
 
-    
\ No newline at end of file
+    